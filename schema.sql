@@ -20,11 +20,90 @@ CREATE TABLE IF NOT EXISTS prices_snapshots (
   scroll_pos REAL,
   confidence REAL,
   hash_row TEXT,
+  ts_ms INTEGER,                    -- epoch em ms (UTC); use nas consultas por tempo
+  canonical_item_id INTEGER,        -- items.item_id do nome lido (src/storage/names.py); NULL = não resolvido
   FOREIGN KEY (run_id) REFERENCES runs(run_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_prices_item_time ON prices_snapshots(item_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_prices_item_view_ts ON prices_snapshots(item_name, source_view, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_prices_ts ON prices_snapshots(ts_ms);
 CREATE INDEX IF NOT EXISTS idx_prices_source ON prices_snapshots(source_view);
+CREATE INDEX IF NOT EXISTS idx_prices_canon_view_ts ON prices_snapshots(canonical_item_id, source_view, ts_ms);
+-- dedup na gravação (INSERT OR IGNORE): mesma linha no mesmo run/lista entra uma vez
+CREATE UNIQUE INDEX IF NOT EXISTS ux_prices_run_view_hash ON prices_snapshots(run_id, source_view, hash_row);
+
+-- linhas que dedup="changed" não gravou por repetirem o último valor do nível:
+-- ponteiro para a linha gravada (ref_run_id, source_view, hash_row), para que
+-- rebuild-aggregates reproduza os agregados incrementais
+CREATE TABLE IF NOT EXISTS snapshot_repeats (
+  run_id      INTEGER NOT NULL,
+  source_view TEXT NOT NULL,
+  hash_row    TEXT NOT NULL,
+  ref_run_id  INTEGER NOT NULL,
+  ts_ms       INTEGER NOT NULL,
+  PRIMARY KEY (run_id, source_view, hash_row)
+) WITHOUT ROWID;
+
+-- === AGREGADOS DO BOOK (src/storage/aggregates.py; atualizados a cada flush) ===
+-- última observação (linhas de um run) por item/lista
+CREATE TABLE IF NOT EXISTS book_latest (
+  item_name         TEXT NOT NULL,
+  source_view       TEXT NOT NULL,
+  canonical_item_id INTEGER,
+  run_id            INTEGER,
+  best_price        REAL NOT NULL,                    -- menor na BUY_LIST, maior na SELL_LIST
+  depth_qty         INTEGER,                          -- soma de qty_visible da observação
+  levels            INTEGER NOT NULL,                 -- linhas (níveis de preço) da observação
+  ts_ms             INTEGER NOT NULL,
+  PRIMARY KEY (item_name, source_view)
+);
+CREATE INDEX IF NOT EXISTS idx_book_latest_canon ON book_latest(canonical_item_id);
+
+-- OHLC do melhor preço por intervalo (bucket_ms = início do intervalo, epoch ms)
+CREATE TABLE IF NOT EXISTS book_ohlc_5m (
+  item_name TEXT NOT NULL, source_view TEXT NOT NULL, bucket_ms INTEGER NOT NULL,
+  canonical_item_id INTEGER,
+  open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL,
+  depth_qty INTEGER, samples INTEGER NOT NULL, last_run_id INTEGER, last_ts_ms INTEGER NOT NULL,
+  PRIMARY KEY (item_name, source_view, bucket_ms)
+);
+CREATE TABLE IF NOT EXISTS book_ohlc_1h (
+  item_name TEXT NOT NULL, source_view TEXT NOT NULL, bucket_ms INTEGER NOT NULL,
+  canonical_item_id INTEGER,
+  open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL,
+  depth_qty INTEGER, samples INTEGER NOT NULL, last_run_id INTEGER, last_ts_ms INTEGER NOT NULL,
+  PRIMARY KEY (item_name, source_view, bucket_ms)
+);
+CREATE TABLE IF NOT EXISTS book_ohlc_1d (
+  item_name TEXT NOT NULL, source_view TEXT NOT NULL, bucket_ms INTEGER NOT NULL,
+  canonical_item_id INTEGER,
+  open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL,
+  depth_qty INTEGER, samples INTEGER NOT NULL, last_run_id INTEGER, last_ts_ms INTEGER NOT NULL,
+  PRIMARY KEY (item_name, source_view, bucket_ms)
+);
+CREATE INDEX IF NOT EXISTS idx_book_ohlc_5m_bucket ON book_ohlc_5m(bucket_ms);
+CREATE INDEX IF NOT EXISTS idx_book_ohlc_1h_bucket ON book_ohlc_1h(bucket_ms);
+CREATE INDEX IF NOT EXISTS idx_book_ohlc_1d_bucket ON book_ohlc_1d(bucket_ms);
+
+-- Sinais de flip/refino sobre o book_latest (recalculados por inteiro; ver src/analysis/signals.py)
+CREATE TABLE IF NOT EXISTS signals (
+  kind              TEXT NOT NULL,                    -- 'flip' | 'refine'
+  item_name         TEXT NOT NULL,                    -- no refino: o item bruto
+  refined           TEXT NOT NULL DEFAULT '',         -- no refino: o item refinado ('' no flip)
+  canonical_item_id INTEGER,
+  buy_price         REAL,                             -- flip: bid; refine: ask do bruto
+  sell_price        REAL,                             -- flip: ask; refine: bid do refinado
+  net_spread        REAL NOT NULL,                    -- lucro por unidade após taxas
+  margin            REAL,                             -- net_spread / custo
+  tradable_qty      REAL,
+  expected_profit   REAL,                             -- net_spread * tradable_qty
+  score             REAL,                             -- margem ponderada por liquidez e idade
+  detail            TEXT,                             -- JSON (receita do refino)
+  book_ts_ms        INTEGER,                          -- observação mais velha usada
+  computed_ms       INTEGER NOT NULL,
+  PRIMARY KEY (kind, item_name, refined)
+);
+CREATE INDEX IF NOT EXISTS idx_signals_score ON signals(kind, score DESC);
 
 CREATE TABLE IF NOT EXISTS actions_log (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,10 +113,12 @@ CREATE TABLE IF NOT EXISTS actions_log (
   details TEXT,
   success INTEGER DEFAULT 1,
   notes TEXT,
+  ts_ms INTEGER,                    -- epoch em ms (UTC)
   FOREIGN KEY (run_id) REFERENCES runs(run_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_actions_ts ON actions_log(ts);
+CREATE INDEX IF NOT EXISTS idx_actions_ts_ms ON actions_log(ts_ms);
 CREATE INDEX IF NOT EXISTS idx_actions_run ON actions_log(run_id);
 
 -- Catálogo de itens (para categorias, tags e organização de coletas)
@@ -95,9 +176,12 @@ CREATE TABLE IF NOT EXISTS my_orders_snapshots (
   side         TEXT NOT NULL CHECK (side IN ('BUY','SELL')),
   price        REAL NOT NULL,
   qty_remaining INTEGER,
-  settlement   TEXT
+  settlement   TEXT,
+  ts_ms        INTEGER,                                -- epoch em ms (UTC)
+  canonical_item_id INTEGER                            -- items.item_id do nome lido
 );
 CREATE INDEX IF NOT EXISTS idx_my_orders_snapshots ON my_orders_snapshots(ts, item_name, side);
+CREATE INDEX IF NOT EXISTS idx_my_orders_snapshots_ts_ms ON my_orders_snapshots(ts_ms);
 
 -- === INVENTÁRIO (por local) ===
 CREATE TABLE IF NOT EXISTS inventory (
@@ -107,3 +191,21 @@ CREATE TABLE IF NOT EXISTS inventory (
   updated_at TEXT NOT NULL DEFAULT (datetime('now')),
   PRIMARY KEY (item_name, location)
 );
+
+-- === MÉTRICAS (spans de tempo agregados por run; ver src/utils/timing.py) ===
+CREATE TABLE IF NOT EXISTS metrics (
+  id        INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts_ms     INTEGER NOT NULL,                          -- fim do run (epoch ms)
+  run_id    INTEGER,
+  name      TEXT NOT NULL,                             -- ex.: 'ocr.batch.numeric', 'job.collect_watchlist'
+  count     INTEGER NOT NULL,
+  total_ms  REAL NOT NULL,
+  min_ms    REAL,
+  max_ms    REAL,
+  p50_ms    REAL,
+  p95_ms    REAL,
+  p99_ms    REAL,
+  FOREIGN KEY (run_id) REFERENCES runs(run_id)
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_name_ts ON metrics(name, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_metrics_run ON metrics(run_id);
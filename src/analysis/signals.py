@@ -0,0 +1,243 @@
+"""Flip and refine signals over the latest order book, in one vectorized pass.
+
+The latest observation of every item (``book_latest``, see
+:mod:`src.storage.aggregates`) is pivoted into NumPy arrays, one slot per
+item, holding the best ask (``BUY_LIST``, offers you buy from), the best bid
+(``SELL_LIST``, orders you sell to), their depths and ages. Every signal is
+then plain array arithmetic over the whole catalog:
+
+``flip``
+    buy order at the bid, sell order at the ask. The net spread per unit is
+    ``ask·(1 − sales_tax − setup_fee) − bid·(1 + setup_fee)``, the margin is
+    that over the buy cost, and the tradable quantity is
+    ``min(ask depth, bid depth, max_units)``.
+``refine``
+    for each recipe in ``signals.yaml`` (``ratio`` raw units → 1 refined),
+    selling the refined output to the bid against selling the raw item to the
+    bid, per raw unit.
+
+``score = margin · log1p(tradable) · freshness`` weights the margin by
+liquidity; freshness halves every ``half_life_minutes`` of book age. Rows
+with a margin of at least ``min_margin`` replace the ``signals`` table
+(:func:`compute_signals`, also run by the ``signals`` job and
+``python -m src.main signals``).
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import time
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+import yaml
+
+from ..storage.db import transaction
+from ..utils.timing import span, timed
+
+BASE = Path(__file__).resolve().parents[2]
+DEFAULT_CONFIG = BASE / "config" / "signals.yaml"
+
+# lados do book (aggregates.BEST_IS_MIN): BUY_LIST = ask, SELL_LIST = bid
+ASK_VIEW, BID_VIEW = "BUY_LIST", "SELL_LIST"
+KINDS = ("flip", "refine")
+
+# pivot por item feito no próprio SQLite (a PK já agrupa por item_name)
+_BOOK_SQL = f"""
+    SELECT item_name, MAX(canonical_item_id),
+           MAX(CASE WHEN source_view = '{ASK_VIEW}' THEN best_price END),
+           MAX(CASE WHEN source_view = '{ASK_VIEW}' THEN depth_qty END),
+           MAX(CASE WHEN source_view = '{ASK_VIEW}' THEN ts_ms END),
+           MAX(CASE WHEN source_view = '{BID_VIEW}' THEN best_price END),
+           MAX(CASE WHEN source_view = '{BID_VIEW}' THEN depth_qty END),
+           MAX(CASE WHEN source_view = '{BID_VIEW}' THEN ts_ms END)
+    FROM book_latest
+    WHERE ts_ms >= ?
+    GROUP BY item_name
+    ORDER BY item_name
+"""
+
+_INSERT_SQL = """
+    INSERT INTO signals (kind, item_name, refined, canonical_item_id, buy_price, sell_price, net_spread, margin,
+                         tradable_qty, expected_profit, score, detail, book_ts_ms, computed_ms)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+
+class Book(NamedTuple):
+    """Latest book of the whole catalog, one array slot per item (``nan`` = side not seen)."""
+
+    items: np.ndarray  # nomes (str), ordenados
+    item_ids: np.ndarray
+    ask: np.ndarray
+    ask_depth: np.ndarray
+    bid: np.ndarray
+    bid_depth: np.ndarray
+    ts_ms: np.ndarray  # observação mais velha entre os dois lados
+
+
+def load_config(path: str | Path | None = None) -> Dict:
+    with open(path or DEFAULT_CONFIG, "r", encoding="utf-8") as fh:
+        return yaml.safe_load(fh) or {}
+
+
+@timed("signals.load")
+def load_book(con, since_ms: int = 0) -> Book:
+    """Pivot ``book_latest`` into per-item arrays; sides older than ``since_ms`` are left out."""
+    rows = con.execute(_BOOK_SQL, (since_ms,)).fetchall()
+    if not rows:
+        return Book(np.array([], dtype=str), *(np.empty(0) for _ in range(6)))
+    names, *cols = zip(*rows)
+    item_ids, ask, ask_depth, ask_ts, bid, bid_depth, bid_ts = (np.array(c, dtype=float) for c in cols)
+    return Book(np.array(names), item_ids, ask, ask_depth, bid, bid_depth, np.fmin(ask_ts, bid_ts))
+
+
+def _freshness(ts_ms: np.ndarray, now_ms: int, half_life_min: float) -> np.ndarray:
+    age_min = np.maximum(0.0, (now_ms - ts_ms) / 60_000.0)
+    return np.exp2(-age_min / max(half_life_min, 1e-9))
+
+
+def _depth(depth: np.ndarray) -> np.ndarray:
+    # profundidade desconhecida (coluna qty não lida) conta como 1 unidade
+    return np.where(np.isnan(depth), 1.0, depth)
+
+
+def _fees(cfg: Dict) -> tuple:
+    fees = cfg.get("fees") or {}
+    return float(fees.get("sales_tax", 0.0)), float(fees.get("setup_fee", 0.0))
+
+
+def _score(margin, tradable, ts_ms, now_ms: int, cfg: Dict) -> np.ndarray:
+    fresh = _freshness(ts_ms, now_ms, float(cfg.get("half_life_minutes", 60)))
+    return margin * np.log1p(tradable) * fresh
+
+
+def flip_signals(book: Book, cfg: Dict, now_ms: int) -> Dict[str, np.ndarray]:
+    """Buy at the bid, sell at the ask, for every item with both sides."""
+    tax, setup = _fees(cfg)
+    buy_cost = book.bid * (1.0 + setup)
+    net = book.ask * (1.0 - tax - setup) - buy_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(buy_cost > 0, net / buy_cost, np.nan)
+    tradable = np.minimum(
+        np.minimum(_depth(book.ask_depth), _depth(book.bid_depth)), float(cfg.get("max_units", np.inf))
+    )
+    return {
+        "item": np.arange(len(book.items)),
+        "buy": book.bid,
+        "sell": book.ask,
+        "net": net,
+        "margin": margin,
+        "tradable": tradable,
+        "expected": net * tradable,
+        "score": _score(margin, tradable, book.ts_ms, now_ms, cfg),
+        "ts": book.ts_ms,
+    }
+
+
+def _slots(book: Book, names: List[str]) -> np.ndarray:
+    """Index of each name in ``book.items`` (-1 when absent)."""
+    if not len(book.items) or not names:
+        return np.full(len(names), -1)
+    names = np.array(names, dtype=str)
+    idx = np.minimum(np.searchsorted(book.items, names), len(book.items) - 1)
+    return np.where(book.items[idx] == names, idx, -1)
+
+
+def refine_signals(book: Book, cfg: Dict, now_ms: int) -> Dict[str, np.ndarray]:
+    """Refine-vs-raw per recipe: gain per raw unit of refining before selling.
+
+    Recipes whose raw or refined item is not in the book are skipped. Also
+    returns ``buy_and_refine``: the gain of buying the raw item at the ask to
+    refine it.
+    """
+    # uma linha por (bruto, refinado): receita repetida no yaml vale a última
+    recipes = list({(r["raw"], r["refined"]): r for r in cfg.get("refine") or []}.values())
+    raw = _slots(book, [r["raw"] for r in recipes])
+    refined = _slots(book, [r["refined"] for r in recipes])
+    ok = (raw >= 0) & (refined >= 0)
+    raw, refined = raw[ok], refined[ok]
+    ratio = np.array([float(r.get("ratio", 1)) for r in recipes], dtype=float)[ok]
+    craft = np.array([float(r.get("cost", 0.0)) for r in recipes], dtype=float)[ok]
+    tax, _setup = _fees(cfg)
+
+    raw_value = book.bid[raw] * (1.0 - tax)
+    refined_value = (book.bid[refined] * (1.0 - tax) - craft) / ratio
+    net = refined_value - raw_value
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(raw_value > 0, net / raw_value, np.nan)
+    # quanto bruto a demanda (bid) do refinado absorve
+    tradable = np.minimum(_depth(book.bid_depth[refined]) * ratio, float(cfg.get("max_units", np.inf)))
+    ts = np.fmin(book.ts_ms[raw], book.ts_ms[refined])
+    return {
+        "item": raw,
+        "buy": book.ask[raw],
+        "sell": book.bid[refined],
+        "net": net,
+        "margin": margin,
+        "tradable": tradable,
+        "expected": net * tradable,
+        "score": _score(margin, tradable, ts, now_ms, cfg),
+        "ts": ts,
+        "refined": refined,
+        "ratio": ratio,
+        "buy_and_refine": refined_value - book.ask[raw],
+    }
+
+
+def _rows(kind: str, book: Book, sig: Dict[str, np.ndarray], min_margin: float, now_ms: int) -> List[tuple]:
+    """``signals`` rows for the entries with a margin of at least ``min_margin``.
+
+    ``nan`` goes to SQLite as-is: it is stored as NULL.
+    """
+    keep = np.flatnonzero(sig["margin"] >= min_margin)
+    item = sig["item"][keep]
+    names = book.items[item].tolist()
+    ids = [None if i != i else int(i) for i in book.item_ids[item].tolist()]
+    ts = [None if t != t else int(t) for t in sig["ts"][keep].tolist()]
+    if kind == "refine":
+        refined = book.items[sig["refined"][keep]].tolist()
+        detail = [
+            json.dumps({"ratio": q, "buy_and_refine": None if b != b else round(b, 4)})
+            for q, b in zip(sig["ratio"][keep].tolist(), sig["buy_and_refine"][keep].tolist())
+        ]
+    else:
+        refined = [""] * len(keep)
+        detail = [None] * len(keep)
+    values = zip(*(sig[k][keep].tolist() for k in ("buy", "sell", "net", "margin", "tradable", "expected", "score")))
+    return [
+        (kind, name, r, iid, *v, d, t, now_ms)
+        for name, r, iid, v, d, t in zip(names, refined, ids, values, detail, ts)
+    ]
+
+
+def compute_signals(con, cfg: Dict | None = None, now_ms: int | None = None) -> Dict[str, int]:
+    """Recompute every signal from ``book_latest`` and replace the ``signals`` table.
+
+    Returns the number of rows written per kind.
+    """
+    cfg = load_config() if cfg is None else cfg
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    stale_ms = int(float(cfg.get("stale_minutes") or 0) * 60_000)
+    min_margin = float(cfg.get("min_margin", 0.0))
+    book = load_book(con, now_ms - stale_ms if stale_ms else 0)
+    with span("signals.compute"):
+        rows = {
+            "flip": _rows("flip", book, flip_signals(book, cfg, now_ms), min_margin, now_ms),
+            "refine": _rows("refine", book, refine_signals(book, cfg, now_ms), min_margin, now_ms),
+        }
+    with span("signals.write"), transaction(con):
+        con.execute("DELETE FROM signals")
+        for kind in KINDS:
+            con.executemany(_INSERT_SQL, rows[kind])
+    return {kind: len(rows[kind]) for kind in KINDS}
+
+
+def top_signals(con, kind: str = "flip", limit: int = 20) -> List[tuple]:
+    """Best stored signals of ``kind`` by score."""
+    return con.execute(
+        """SELECT item_name, refined, buy_price, sell_price, net_spread, margin, tradable_qty, expected_profit, score
+           FROM signals WHERE kind = ? ORDER BY score DESC LIMIT ?""",
+        (kind, limit),
+    ).fetchall()
@@ -0,0 +1,11 @@
+"""Throughput benchmarks for the scan pipeline, run against recorded frames.
+
+    python -m src.bench FIXTURE_DIR [--engines configured,tesseract] [--repeat 3]
+
+See :mod:`src.bench.suite` for the scenarios and the JSON result format.
+"""
+
+from .stats import StageTimer, peak_rss_mb
+from .suite import compare, run_bench, save_result
+
+__all__ = ["StageTimer", "compare", "peak_rss_mb", "run_bench", "save_result"]
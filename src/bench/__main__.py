@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import typer
+
+from .suite import ENGINE_VARIANTS, compare, run_bench, save_result
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(
+    fixture: str = typer.Argument(..., help="sessão gravada (events.jsonl) ou pasta de replay (manifest.json)"),
+    engines: str = typer.Option("configured", help=f"variantes de OCR, sep. por vírgula: {','.join(ENGINE_VARIANTS)}"),
+    source_view: str = typer.Option("BUY_LIST", help="BUY_LIST ou SELL_LIST"),
+    repeat: int = typer.Option(3, help="passadas completas sobre a fixture"),
+    scenarios: str = typer.Option(
+        "stages,scan_once,scan_my_orders,collect_watchlist", help="cenários, sep. por vírgula"
+    ),
+    items: str = typer.Option("Bench Item", help="itens do collect_watchlist simulado (sep. por vírgula)"),
+    out: str = typer.Option("", help="arquivo JSON de saída (padrão: bench_results/<data>-<commit>.json)"),
+    baseline: str = typer.Option("", help="JSON de uma execução anterior para comparar"),
+):
+    """Mede latência por estágio (p50/p95/p99), linhas/s e pico de RSS; salva em JSON."""
+    result = run_bench(
+        fixture,
+        engines=[e.strip() for e in engines.split(",") if e.strip()],
+        source_view=source_view,
+        repeat=repeat,
+        scenarios=[s.strip() for s in scenarios.split(",") if s.strip()],
+        items=[i.strip() for i in items.split(",") if i.strip()],
+    )
+    path = save_result(result, out or None)
+
+    for name, st in result["stages"].items():
+        typer.echo(
+            f"{name:32s} n={st['n']:<5d} p50={st['p50_ms']:9.3f}ms "
+            f"p95={st['p95_ms']:9.3f}ms p99={st['p99_ms']:9.3f}ms"
+        )
+    for key, value in result["throughput"].items():
+        typer.echo(f"{key:32s} {value}")
+    typer.echo(f"{'peak_rss_mb':32s} {result['peak_rss_mb']}")
+    typer.echo(f"resultado: {path}")
+
+    if baseline:
+        base = json.loads(Path(baseline).read_text(encoding="utf-8"))
+        typer.echo(f"\ncomparação com {baseline} ({base['meta'].get('commit')}):")
+        for line in compare(base, result):
+            typer.echo(line)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,65 @@
+"""Latency samples per stage, percentiles and peak memory."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import contextmanager
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+class StageTimer:
+    """Collect wall-clock samples (seconds) per named stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.samples[name].append(seconds)
+
+    def total(self, name: str) -> float:
+        return float(sum(self.samples.get(name, ())))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """``{stage: {n, total_s, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}``."""
+        out: Dict[str, Dict[str, float]] = {}
+        for name, values in sorted(self.samples.items()):
+            arr = np.asarray(values, dtype=np.float64) * 1000.0
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            out[name] = {
+                "n": int(arr.size),
+                "total_s": round(float(arr.sum()) / 1000.0, 6),
+                "mean_ms": round(float(arr.mean()), 4),
+                "p50_ms": round(float(p50), 4),
+                "p95_ms": round(float(p95), 4),
+                "p99_ms": round(float(p99), 4),
+                "max_ms": round(float(arr.max()), 4),
+            }
+        return out
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB (``None`` if unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 2**20, 2)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB; macOS, bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 2)
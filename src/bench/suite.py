@@ -0,0 +1,311 @@
+"""Benchmark scenarios over recorded frames.
+
+Fixtures are either a recorded session (``events.jsonl``, see
+``src.capture.session``) or a replay directory (``manifest.json``, see
+``src.capture.backends``). Nothing touches the real screen or
+``data/market.db``: captures come from the fixture and writes go to a
+temporary database.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import hashlib
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import yaml
+
+from src.capture.backends import CaptureBackend, ReplayBackend, set_backend
+from src.capture.calibrate import relative_rect
+from src.capture.session import SessionReplayBackend
+from src.ocr import extract
+from src.ocr.engine import _as_rgb, clear_engines, get_engine
+from src.storage import db
+
+from .stats import StageTimer, peak_rss_mb
+
+BASE = Path(__file__).resolve().parents[2]
+CFG_OCR = BASE / "config" / "ocr.yaml"
+CFG_UI = BASE / "config" / "ui_profiles.yaml"
+CFG_ACTIONS = BASE / "config" / "actions.yaml"
+CFG_CAPTURE = BASE / "config" / "capture.yaml"
+
+# variantes de engine: o que muda em ocr.yaml para cada uma
+ENGINE_VARIANTS = {
+    "configured": {},
+    "paddle": {"engine_order": ["paddle", "tesseract"]},
+    "tesseract": {"engine_order": ["tesseract"]},
+}
+
+
+# ---------- fixtures ----------
+def fixture_factory(path: Path | str) -> tuple[Callable[[], CaptureBackend], int]:
+    """Return ``(make_backend, n_pages)`` for a fixture directory."""
+    path = Path(path)
+    if (path / "events.jsonl").exists():
+        probe = SessionReplayBackend(path)
+        return (lambda: SessionReplayBackend(path)), len(probe.inputs) + 1
+    if (path / "manifest.json").exists():
+        probe = ReplayBackend(path)
+        return (lambda: ReplayBackend(path)), len(probe.frames)
+    raise FileNotFoundError(f"{path}: nem events.jsonl nem manifest.json")
+
+
+def _engine_configs(names: Sequence[str], workdir: Path) -> Dict[str, str]:
+    """Write one ocr.yaml per engine variant (cache off: mede o engine, não o cache)."""
+    with open(CFG_OCR, "r", encoding="utf-8") as fh:
+        base_cfg = yaml.safe_load(fh)
+    paths: Dict[str, str] = {}
+    for name in names:
+        if name not in ENGINE_VARIANTS:
+            raise ValueError(f"engine desconhecido: {name!r} (use {sorted(ENGINE_VARIANTS)})")
+        cfg = {**base_cfg, **ENGINE_VARIANTS[name], "cache": {"enabled": False}}
+        tess = dict(cfg.get("tesseract") or {})
+        if tess.get("path") and not Path(tess["path"]).exists():
+            # caminho do Windows em outra máquina: usa o tesseract do PATH
+            tess.pop("path")
+            cfg["tesseract"] = tess
+        path = workdir / f"ocr-{name}.yaml"
+        path.write_text(yaml.safe_dump(cfg, allow_unicode=True), encoding="utf-8")
+        paths[name] = str(path)
+    return paths
+
+
+def _list_geometry(source_view: str):
+    """Same zone/columns/rows/segmentation choice as ``scan_once``."""
+    prof = next(iter(extract._load_ui_cfg(str(CFG_UI))["profiles"].values()))
+    zone, cols, rows_per_page = extract._book_layout(prof, source_view)
+    return zone, cols, rows_per_page, prof.get("row_segmentation", "profile")
+
+
+# ---------- cenários ----------
+def bench_stages(timer: StageTimer, make_backend, n_pages: int, engines: Dict[str, str],
+                 source_view: str, repeat: int) -> None:
+    """Time capture, row segmentation, preprocessing, OCR per engine/kind, parse_price, dedup and insert."""
+    cap_cfg = extract._load_capture_cfg(str(CFG_CAPTURE))
+    zone, cols, rows_per_page, seg_mode = _list_geometry(source_view)
+    con = db.ensure_db()
+    for _ in range(repeat):
+        # um run por repetição: o índice único não descarta as linhas da anterior
+        run_id = db.new_run(con, mode="bench", notes="stages")
+        backend = make_backend()
+        set_backend(backend)
+        for page in range(n_pages):
+            with timer.stage("capture"):
+                window_info, base_size = extract._capture_target(cap_cfg)
+                lx, ly, lw, lh = relative_rect(zone, base_size)
+                frame, origin = extract.grab_page_frame(
+                    window_info, base_size, (lx, ly, lw, lh), cap_cfg.get("frame_scope", "zone")
+                )
+
+            with timer.stage("segment"):
+                bands = extract._page_bands(frame, origin, (lx, ly, lw, lh), rows_per_page, seg_mode)
+            by_kind: Dict[str, List] = {}
+            for i, y, h in bands:
+                for name in ("price", "name", "qty"):
+                    if name not in cols:
+                        continue
+                    rect = extract._column_rect(lx, lw, cols[name], ly + y, h)
+                    by_kind.setdefault(cols[name].get("kind", "text"), []).append((i, name, rect))
+
+            reads: Dict[tuple, tuple] = {}
+            for eng_name, cfg_path in engines.items():
+                engine = get_engine(cfg_path)
+                prepared: Dict = {}
+                for kind, cells in by_kind.items():
+                    with timer.stage(f"preprocess.{eng_name}"):
+                        crops = [
+                            _as_rgb(c)
+                            for c in extract.cell_views(
+                                engine, frame, origin, [r for _, _, r in cells], kind, prepared
+                            )
+                        ]
+                    with timer.stage(f"ocr.{eng_name}.{kind}"):
+                        results = engine.recognize_batch(crops, kind=kind)
+                    reads.update({(i, name): res for (i, name, _), res in zip(cells, results)})
+
+            rows = []
+            for i, _, _ in bands:
+                price_txt, conf = reads.get((i, "price"), ("", 0.0))
+                with timer.stage("parse_price"):
+                    price = extract.parse_price(price_txt)
+                if price is None:
+                    continue
+                rows.append({
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "source_view": source_view,
+                    "item_name": " ".join(reads.get((i, "name"), ("", 0.0))[0].split()),
+                    "price": price,
+                    "qty_visible": extract.parse_qty(reads.get((i, "qty"), ("", 0.0))[0]),
+                    "page_index": page,
+                    "scroll_pos": float(i),
+                    "confidence": conf,
+                })
+
+            # dedup: hash_row + consulta ao último valor observado (modo "changed")
+            with timer.stage("dedup"):
+                for r in rows:
+                    r["hash_row"] = hashlib.sha1(
+                        f"{r['item_name']}|{r['price']}|{r['qty_visible']}|{r['scroll_pos']:g}".encode()
+                    ).hexdigest()
+                    db._changed_since_last(con, db._snapshot_params(run_id, r))
+            with timer.stage("sqlite_insert"):
+                with db.SnapshotWriter(con, run_id) as writer:
+                    writer.add_snapshots(rows)
+            backend.advance("bench:page")
+        db.end_run(con, run_id)
+
+
+def bench_scan_once(timer: StageTimer, make_backend, n_pages: int, cfg_ocr: str,
+                    source_view: str, repeat: int) -> int:
+    rows = 0
+    for _ in range(repeat):
+        backend = make_backend()
+        set_backend(backend)
+        for page in range(n_pages):
+            with timer.stage("e2e.scan_once"):
+                rows += len(extract.scan_once(source_view, cfg_ocr, str(CFG_UI), page_index=page))
+            backend.advance("bench:page")
+    return rows
+
+
+def bench_scan_my_orders(timer: StageTimer, make_backend, n_pages: int, cfg_ocr: str, repeat: int) -> int:
+    rows = 0
+    for _ in range(repeat):
+        backend = make_backend()
+        set_backend(backend)
+        for page in range(n_pages):
+            with timer.stage("e2e.scan_my_orders"):
+                rows += len(extract.scan_my_orders(cfg_ocr, str(CFG_UI), page_index=page))
+            backend.advance("bench:page")
+    return rows
+
+
+def bench_collect_watchlist(timer: StageTimer, make_backend, cfg_ocr: str, items: List[str],
+                            views: List[str], repeat: int) -> int:
+    """Run ``JobScheduler._job_collect_watchlist`` against the fixture (inputs only advance frames)."""
+    from src.exec.scheduler import JobScheduler
+
+    sched = JobScheduler(str(CFG_UI), str(CFG_ACTIONS), cfg_ocr, jobs_file="bench")
+    sched.con = db.ensure_db()
+    done = 0
+    for _ in range(repeat):
+        set_backend(make_backend())
+        run_id = db.new_run(sched.con, mode="bench", notes="collect_watchlist")
+        with timer.stage("e2e.collect_watchlist"):
+            sched._job_collect_watchlist(run_id, {"items": items, "views": views})
+        db.end_run(sched.con, run_id)
+        done += len(items)
+    return done
+
+
+# ---------- orquestração ----------
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_bench(
+    fixture: Path | str,
+    *,
+    engines: Sequence[str] = ("configured",),
+    source_view: str = "BUY_LIST",
+    repeat: int = 3,
+    scenarios: Sequence[str] = ("stages", "scan_once", "scan_my_orders", "collect_watchlist"),
+    items: Sequence[str] = ("Bench Item",),
+) -> Dict:
+    """Run the selected scenarios and return the result document (JSON-serializable)."""
+    make_backend, n_pages = fixture_factory(fixture)
+    timer = StageTimer()
+    throughput: Dict[str, float] = {}
+    previous_backend = set_backend(None)
+    db_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.close_db()
+        db.DB_PATH = Path(tmp) / "bench.db"
+        try:
+            engine_cfgs = _engine_configs(engines, Path(tmp))
+            main_cfg = next(iter(engine_cfgs.values()))
+            for cfg_path in engine_cfgs.values():
+                # carga/warm-up fora das medições
+                t0 = time.perf_counter()
+                get_engine(cfg_path)
+                timer.add("engine_load", time.perf_counter() - t0)
+
+            if "stages" in scenarios:
+                bench_stages(timer, make_backend, n_pages, engine_cfgs, source_view, repeat)
+            if "scan_once" in scenarios:
+                rows = bench_scan_once(timer, make_backend, n_pages, main_cfg, source_view, repeat)
+                secs = timer.total("e2e.scan_once")
+                throughput["scan_once_rows"] = rows
+                throughput["scan_once_rows_per_s"] = round(rows / secs, 3) if secs else 0.0
+            if "scan_my_orders" in scenarios:
+                rows = bench_scan_my_orders(timer, make_backend, n_pages, main_cfg, repeat)
+                secs = timer.total("e2e.scan_my_orders")
+                throughput["scan_my_orders_rows"] = rows
+                throughput["scan_my_orders_rows_per_s"] = round(rows / secs, 3) if secs else 0.0
+            if "collect_watchlist" in scenarios:
+                done = bench_collect_watchlist(
+                    timer, make_backend, main_cfg, list(items), [source_view], repeat
+                )
+                secs = timer.total("e2e.collect_watchlist")
+                throughput["collect_watchlist_items_per_min"] = round(done * 60.0 / secs, 3) if secs else 0.0
+        finally:
+            db.close_db()
+            db.DB_PATH = db_path
+            set_backend(previous_backend)
+            clear_engines()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixture": str(fixture),
+            "pages": n_pages,
+            "repeat": repeat,
+            "engines": list(engines),
+            "source_view": source_view,
+        },
+        "stages": timer.summary(),
+        "throughput": throughput,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def save_result(result: Dict, out: Path | str | None = None) -> Path:
+    """Write ``result`` as JSON (default: ``bench_results/<timestamp>-<commit>.json``)."""
+    if out:
+        path = Path(out)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = BASE / "bench_results" / f"{stamp}-{result['meta']['commit']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return path
+
+
+def compare(base: Dict, new: Dict) -> List[str]:
+    """One line per stage present in both results: p50/p95 and the p50 change."""
+    lines = []
+    for name in sorted(set(base["stages"]) & set(new["stages"])):
+        a, b = base["stages"][name], new["stages"][name]
+        delta = (b["p50_ms"] - a["p50_ms"]) / a["p50_ms"] * 100.0 if a["p50_ms"] else 0.0
+        lines.append(
+            f"{name:32s} p50 {a['p50_ms']:9.3f} -> {b['p50_ms']:9.3f} ms ({delta:+6.1f}%)"
+            f"  p95 {a['p95_ms']:9.3f} -> {b['p95_ms']:9.3f} ms"
+        )
+    for key in sorted(set(base.get("throughput", {})) & set(new.get("throughput", {}))):
+        lines.append(f"{key:32s} {base['throughput'][key]} -> {new['throughput'][key]}")
+    return lines
@@ -0,0 +1,271 @@
+"""Screen capture backends.
+
+Every capture in the pipeline (``scan_once``, ``scan_my_orders``,
+``ActionRunner`` OCR waits, ``nav``) goes through :func:`get_backend`, so the
+same code runs against the live game (``gdi``/``mss``) or against recorded
+frames (``replay``) on any OS.
+
+``config/capture.yaml``::
+
+    backend: "gdi"          # "gdi" | "mss" | "replay"
+    replay_dir: ""          # diretório com manifest.json (backend "replay")
+
+Replay directory layout (``manifest.json``)::
+
+    {
+      "screen": [2560, 1440],
+      "window": {"x": 0, "y": 0, "w": 2560, "h": 1440, "title": "New World"},
+      "frames": [
+        {"file": "000001.png", "x": 0, "y": 0},
+        {"file": "frames.npz", "key": "f000002", "x": 0, "y": 0, "event": "scroll"}
+      ]
+    }
+
+Each frame is a region of the screen whose top-left corner is ``(x, y)`` in
+absolute screen pixels. ``window`` may be ``null`` (full-screen capture).
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import json
+import logging
+from pathlib import Path
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+import yaml
+
+logger = logging.getLogger(__name__)
+
+BASE = Path(__file__).resolve().parents[2]
+CFG_CAPTURE = BASE / "config" / "capture.yaml"
+
+try:  # backend opcional
+    import mss
+except ImportError:  # pragma: no cover - depende do ambiente
+    mss = None
+
+
+class CaptureBackend:
+    """Source of window geometry and screen pixels.
+
+    ``grab`` takes absolute screen coordinates and returns an ``(h, w, 3)``
+    RGB uint8 array. ``live`` is False for backends that do not drive a real
+    screen: input helpers then skip the mouse/keyboard and call
+    :meth:`advance` instead.
+    """
+
+    name = "base"
+    live = True
+
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def find_window(self, title_contains: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def advance(self, event: str = "") -> None:
+        """Called where a live run would send input (click, key, scroll)."""
+
+    def close(self) -> None:
+        pass
+
+
+class GDIBackend(CaptureBackend):
+    """Current behaviour: ``win32gui`` for geometry and ``PIL.ImageGrab`` for pixels."""
+
+    name = "gdi"
+
+    def screen_size(self) -> Tuple[int, int]:
+        from .window import get_screen_resolution
+
+        return get_screen_resolution()
+
+    def find_window(self, title_contains: str) -> Optional[Dict[str, Any]]:
+        from .window import get_window_rect
+
+        return get_window_rect(title_contains)
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        from .window import capture_array
+
+        return capture_array(x, y, w, h)
+
+
+class MSSBackend(GDIBackend):
+    """DXGI/BitBlt grabs through ``mss`` (one instance per thread; mss is not thread-safe)."""
+
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("backend 'mss' requer o pacote mss (pip install mss)")
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        shot = self._sct().grab({"left": int(x), "top": int(y), "width": int(w), "height": int(h)})
+        # BGRA -> RGB
+        return np.ascontiguousarray(np.asarray(shot)[..., 2::-1])
+
+    def close(self) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class ReplayBackend(CaptureBackend):
+    """Serve recorded frames from ``directory/manifest.json`` (deterministic, no game needed).
+
+    The current frame only changes on :meth:`advance` (i.e. where the live
+    pipeline would scroll, click or type), so repeated grabs between inputs
+    see the same pixels — like a static UI.
+    """
+
+    name = "replay"
+    live = False
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        manifest_path = self.directory / "manifest.json"
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"manifest.json não encontrado em {self.directory}")
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        self._decoded: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._npz: Dict[str, Any] = {}
+        self.frames: List[Dict[str, Any]] = list(manifest.get("frames") or [])
+        if not self.frames:
+            raise ValueError(f"replay sem frames: {manifest_path}")
+        self.window: Optional[Dict[str, Any]] = manifest.get("window")
+        screen = manifest.get("screen")
+        if screen:
+            self._screen = (int(screen[0]), int(screen[1]))
+        elif self.window:
+            self._screen = (int(self.window["w"]), int(self.window["h"]))
+        else:
+            h, w = self._load(0).shape[:2]
+            self._screen = (w, h)
+        self.index = 0
+        self.events: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.index >= len(self.frames) - 1
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._screen
+
+    def find_window(self, title_contains: str) -> Optional[Dict[str, Any]]:
+        if not self.window:
+            return None
+        title = self.window.get("title") or ""
+        if title_contains and title and title_contains.lower() not in title.lower():
+            return None
+        return {"handle": None, "title": title, **{k: int(self.window[k]) for k in ("x", "y", "w", "h")}}
+
+    def _load(self, index: int) -> np.ndarray:
+        cached = self._decoded.get(index)
+        if cached is not None:
+            self._decoded.move_to_end(index)
+            return cached
+        entry = self.frames[index]
+        path = self.directory / entry["file"]
+        if path.suffix.lower() == ".npz":
+            archive = self._npz.get(entry["file"])
+            if archive is None:
+                archive = self._npz[entry["file"]] = np.load(path)
+            arr = archive[entry.get("key") or archive.files[0]]
+        else:
+            arr = np.asarray(Image.open(path).convert("RGB"))
+        if arr.ndim == 2:
+            arr = np.stack([arr] * 3, axis=-1)
+        arr = np.ascontiguousarray(arr[..., :3], dtype=np.uint8)
+        self._decoded[index] = arr
+        while len(self._decoded) > 8:
+            self._decoded.popitem(last=False)
+        return arr
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        with self._lock:
+            index = self.index
+        entry = self.frames[index]
+        frame = self._load(index)
+        fx, fy = int(x) - int(entry.get("x", 0)), int(y) - int(entry.get("y", 0))
+        fh, fw = frame.shape[:2]
+        if fx < 0 or fy < 0 or fx + w > fw or fy + h > fh:
+            raise ValueError(
+                f"recorte ({x},{y},{w},{h}) fora do frame {index} "
+                f"({entry.get('x', 0)},{entry.get('y', 0)},{fw},{fh})"
+            )
+        return frame[fy : fy + h, fx : fx + w]
+
+    def advance(self, event: str = "") -> None:
+        with self._lock:
+            self.events.append(event)
+            if self.index < len(self.frames) - 1:
+                self.index += 1
+
+    def rewind(self) -> None:
+        with self._lock:
+            self.index = 0
+            self.events.clear()
+
+
+_BACKEND: Optional[CaptureBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def _load_capture_cfg() -> Dict[str, Any]:
+    if CFG_CAPTURE.exists():
+        with open(CFG_CAPTURE, "r", encoding="utf-8") as fh:
+            return yaml.safe_load(fh) or {}
+    return {}
+
+
+def make_backend(name: str, replay_dir: str | Path = "") -> CaptureBackend:
+    name = (name or "gdi").lower()
+    if name == "gdi":
+        return GDIBackend()
+    if name == "mss":
+        if mss is None:
+            logger.warning("mss não instalado; usando backend 'gdi'")
+            return GDIBackend()
+        return MSSBackend()
+    if name == "replay":
+        path = Path(replay_dir)
+        if not path.is_absolute():
+            path = BASE / path
+        return ReplayBackend(path)
+    raise ValueError(f"backend de captura desconhecido: {name!r}")
+
+
+def get_backend() -> CaptureBackend:
+    """Process-wide backend, built from ``capture.yaml`` on first use."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            cfg = _load_capture_cfg()
+            _BACKEND = make_backend(cfg.get("backend", "gdi"), cfg.get("replay_dir") or "")
+            logger.debug("backend de captura: %s", _BACKEND.name)
+        return _BACKEND
+
+
+def set_backend(backend: Optional[CaptureBackend]) -> Optional[CaptureBackend]:
+    """Install ``backend`` (``None`` = rebuild from config on next use); returns the previous one."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        previous, _BACKEND = _BACKEND, backend
+    return previous
@@ -0,0 +1,125 @@
+"""Cheap visual readiness probes used to gate OCR in UI waits.
+
+A probe decides, from pixels alone, whether a region is worth an OCR pass:
+
+* **reference match** — the region correlates with a snippet captured at
+  calibration time (``python -m src.tools.calibrate_probes``), e.g. "the
+  header region looks like the BUY header". Snippets are PNGs named
+  ``<anchor>@<label>.png`` in ``probes_dir`` (``capture.yaml``, default
+  ``config/probes``);
+* **content** — without a reference, the region must contain ink, be stable
+  for one poll and differ from the last frame OCR already rejected.
+
+Each poll is one grab plus a resize to :data:`PROBE_SIZE` and a dot product,
+so waiting costs microseconds of CPU per poll instead of an OCR inference.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from ..ocr.digits import ink_mask
+from ..utils.timing import span
+from .backends import BASE, _load_capture_cfg
+
+PROBE_SIZE = (96, 16)  # (w, h)
+POLL_MS = 15
+MATCH_SCORE = 0.90
+SAME_SCORE = 0.98  # acima disso dois frames são "o mesmo conteúdo"
+
+Grab = Callable[[], np.ndarray]
+
+
+def probe_vector(arr: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-norm grayscale thumbnail; dot product = normalized correlation."""
+    gray = arr.mean(axis=2) if arr.ndim == 3 else arr
+    img = Image.fromarray(gray.astype(np.uint8)).resize(PROBE_SIZE, Image.BILINEAR)
+    vec = np.asarray(img, dtype=np.float32).ravel()
+    vec -= vec.mean()
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Correlation of two :func:`probe_vector` results (1.0 = identical; flat regions score 0)."""
+    return float(a @ b)
+
+
+def has_content(arr: np.ndarray, min_ratio: float = 0.01) -> bool:
+    """True when at least ``min_ratio`` of the pixels are ink (text/icons over the background)."""
+    return bool(ink_mask(arr).mean() >= min_ratio)
+
+
+def probe_name(anchor: str, label: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", (label or "").lower()).strip("_")
+    return f"{anchor}@{slug}" if slug else anchor
+
+
+def probes_dir() -> Path:
+    path = Path(_load_capture_cfg().get("probes_dir") or "config/probes")
+    return path if path.is_absolute() else BASE / path
+
+
+_REFS: Dict[Path, Optional[np.ndarray]] = {}
+
+
+def load_reference(name: str, directory: Path | None = None) -> Optional[np.ndarray]:
+    """Probe vector of the snippet ``<name>.png`` (cached); ``None`` if not calibrated."""
+    path = (directory or probes_dir()) / f"{name}.png"
+    if path not in _REFS:
+        _REFS[path] = probe_vector(np.asarray(Image.open(path).convert("RGB"))) if path.exists() else None
+    return _REFS[path]
+
+
+def save_reference(arr: np.ndarray, name: str, directory: Path | None = None) -> Path:
+    directory = directory or probes_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.png"
+    Image.fromarray(arr).save(path)
+    _REFS.pop(path, None)
+    return path
+
+
+def wait_ready(
+    grab: Grab,
+    confirm: Callable[[np.ndarray], bool],
+    timeout_ms: int,
+    reference: Optional[np.ndarray] = None,
+    min_score: float = MATCH_SCORE,
+    poll_ms: int = POLL_MS,
+) -> bool:
+    """Poll ``grab`` until a probe fires, then run ``confirm`` (the OCR) on that frame.
+
+    With ``reference`` the probe is a match against the calibrated snippet;
+    otherwise it is the content probe. A frame ``confirm`` rejected is not
+    OCR'd again until the region changes. Returns False on timeout.
+    """
+    deadline = time.perf_counter() + timeout_ms / 1000.0
+    prev: Optional[np.ndarray] = None
+    rejected: Optional[np.ndarray] = None
+    with span("wait.probe"):
+        while True:
+            img = grab()
+            vec = probe_vector(img)
+            if reference is not None:
+                fired = similarity(vec, reference) >= min_score
+            else:
+                fired = (
+                    prev is not None
+                    and similarity(vec, prev) >= SAME_SCORE
+                    and has_content(img)
+                )
+            prev = vec
+            if fired and not (rejected is not None and similarity(vec, rejected) >= SAME_SCORE):
+                if confirm(img):
+                    return True
+                rejected = vec
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(poll_ms / 1000.0)
@@ -4,12 +4,18 @@ from pathlib import Path
 from typing import Any, Dict
 
 import yaml
-import win32api
-import win32con
-import win32gui
 
+try:  # Windows-only; ausentes no modo replay
+    import win32api
+    import win32con
+    import win32gui
+except ImportError:  # pragma: no cover - depende do SO
+    win32api = win32con = win32gui = None
+
+from .backends import get_backend
 from .calibrate import relative_rect
-from .window import get_window_rect, human_pause
+from .waits import region_signature, wait_region_settled
+from .window import human_pause
 
 
 BASE = Path(__file__).resolve().parents[2]
@@ -35,7 +41,7 @@ def _focus_window() -> Dict[str, Any] | None:
     if not title_hint:
         return None
 
-    win = get_window_rect(title_hint)
+    win = get_backend().find_window(title_hint)
     if not win:
         return None
 
@@ -52,6 +58,11 @@ def _focus_window() -> Dict[str, Any] | None:
 def focus_and_scroll(ui_cfg_path: str, anchor_name: str = "list_zone") -> None:
     """Bring the target window to the foreground and scroll once using the provided anchor."""
 
+    backend = get_backend()
+    backend.advance(f"scroll:{anchor_name}")
+    if not backend.live:
+        return
+
     profile = _load_ui_profile(ui_cfg_path)
     scroll_cfg: Dict[str, Any] = profile.get(
         "buy_panel_scroll" if anchor_name == "buy_panel_zone" else "scroll", {}
@@ -73,10 +84,13 @@ def focus_and_scroll(ui_cfg_path: str, anchor_name: str = "list_zone") -> None:
     step_pixels = scroll_cfg.get("step_pixels", 240)
     wheel_steps = max(1, int(round(step_pixels / 120.0)))
     wheel_delta = -wheel_steps * win32con.WHEEL_DELTA
+    zone = (win["x"] + x, win["y"] + y, w, h)
+    before = region_signature(zone)
     win32api.mouse_event(win32con.MOUSEEVENTF_WHEEL, 0, 0, wheel_delta, 0)
 
-    pause_ms = scroll_cfg.get("pause_ms", 150)
-    human_pause(pause_ms)
+    # pause_ms é o teto: segue assim que a lista rolou e parou; sem mudança
+    # até o timeout (fim da lista) o custo é o mesmo do sleep antigo
+    wait_region_settled(zone, before, scroll_cfg.get("pause_ms", 150), scroll_cfg.get("stable_ms", 40))
 
 
 def focus_and_scroll_one_page(ui_cfg_path: str) -> None:
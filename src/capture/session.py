@@ -0,0 +1,355 @@
+"""Session recording and replay.
+
+A session archive is a directory with:
+
+- ``events.jsonl``: append-only event log, one JSON object per line
+  (``session``, ``screen``, ``window``, ``frame``, ``input``, ``action``,
+  ``ocr``, ``rows``), each with ``t`` = epoch ms;
+- ``blobs/<hash>.png``: frames and frame patches, stored once per content hash.
+
+A ``frame`` event references either a full blob (``blob``) or a key frame of
+the same geometry plus the patch of pixels that changed (``base``, ``patch``,
+``dx``, ``dy``), so a mostly static UI costs only its changed regions.
+
+Recording wraps the live capture backend (:class:`RecordingBackend`); replay
+serves the recorded frames back through :class:`SessionReplayBackend`, grouped
+by the inputs sent between them, so the pipeline sees the same pixels in the
+same order.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .backends import CaptureBackend
+
+# patch maior que isso (fração do frame) vira um novo key frame
+KEYFRAME_RATIO = 0.5
+
+Rect = Tuple[int, int, int, int]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _content_hash(arr: np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(arr.shape).encode())
+    h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class SessionRecorder:
+    """Append-only writer of a session archive.
+
+    With ``directory=None`` nothing is written: events (except frames) are
+    kept in :attr:`events`, which is how ``replay`` collects the new results.
+    """
+
+    def __init__(self, directory: Optional[Path | str]):
+        self.directory = Path(directory) if directory is not None else None
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stored: set[str] = set()
+        # rect -> (hash, pixels) do key frame atual daquela geometria
+        self._keyframes: Dict[Rect, Tuple[str, np.ndarray]] = {}
+        # hash do frame completo -> referência já gravada (dedup de deltas)
+        self._refs: Dict[str, Dict[str, Any]] = {}
+        self._fh = None
+        if self.directory is not None:
+            (self.directory / "blobs").mkdir(parents=True, exist_ok=True)
+            self._stored = {p.stem for p in (self.directory / "blobs").glob("*.png")}
+            self._fh = open(self.directory / "events.jsonl", "a", encoding="utf-8")
+
+    def log(self, type_: str, **fields) -> None:
+        event = {"t": _now_ms(), "type": type_, **_jsonable(fields)}
+        with self._lock:
+            if self._fh is None:
+                if type_ != "frame":
+                    self.events.append(event)
+                return
+            self._fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def _put_blob(self, arr: np.ndarray) -> str:
+        digest = _content_hash(arr)
+        if digest not in self._stored:
+            Image.fromarray(arr).save(self.directory / "blobs" / f"{digest}.png", optimize=True)
+            self._stored.add(digest)
+        return digest
+
+    def frame(self, rect: Rect, arr: np.ndarray) -> None:
+        if self._fh is None:
+            return
+        arr = np.ascontiguousarray(arr, dtype=np.uint8)
+        with self._lock:
+            ref = self._frame_ref(tuple(int(v) for v in rect), arr)
+        self.log("frame", x=rect[0], y=rect[1], w=rect[2], h=rect[3], **ref)
+
+    def _frame_ref(self, rect: Rect, arr: np.ndarray) -> Dict[str, Any]:
+        digest = _content_hash(arr)
+        if digest in self._refs:
+            return self._refs[digest]
+        key = self._keyframes.get(rect)
+        ref: Dict[str, Any]
+        if key is not None and key[1].shape == arr.shape:
+            changed = np.any(arr != key[1], axis=-1) if arr.ndim == 3 else arr != key[1]
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            if (y1 - y0) * (x1 - x0) <= KEYFRAME_RATIO * changed.size:
+                patch = self._put_blob(np.ascontiguousarray(arr[y0:y1, x0:x1]))
+                ref = {"hash": digest, "base": key[0], "patch": patch, "dx": int(x0), "dy": int(y0)}
+                self._refs[digest] = ref
+                return ref
+        self._put_blob(arr)
+        self._keyframes[rect] = (digest, arr)
+        ref = {"hash": digest, "blob": digest}
+        self._refs[digest] = ref
+        return ref
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class RecordingBackend(CaptureBackend):
+    """Pass-through backend that logs geometry, frames and inputs to a recorder."""
+
+    def __init__(self, inner: CaptureBackend, recorder: SessionRecorder):
+        self.inner = inner
+        self.recorder = recorder
+        self.name = f"record:{inner.name}"
+        self.live = inner.live
+        self._last_window: Any = object()
+        self._screen_logged = False
+
+    def screen_size(self) -> Tuple[int, int]:
+        size = self.inner.screen_size()
+        if not self._screen_logged:
+            self.recorder.log("screen", size=list(size))
+            self._screen_logged = True
+        return size
+
+    def find_window(self, title_contains: str) -> Optional[Dict[str, Any]]:
+        win = self.inner.find_window(title_contains)
+        geom = None if win is None else {k: win[k] for k in ("x", "y", "w", "h", "title")}
+        if geom != self._last_window:
+            self.recorder.log("window", window=geom)
+            self._last_window = geom
+        return win
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        arr = self.inner.grab(x, y, w, h)
+        self.recorder.frame((x, y, w, h), arr)
+        return arr
+
+    def advance(self, event: str = "") -> None:
+        self.recorder.log("input", event=event)
+        self.inner.advance(event)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def load_events(directory: Path | str) -> List[Dict[str, Any]]:
+    path = Path(directory) / "events.jsonl"
+    events: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+class SessionReplayBackend(CaptureBackend):
+    """Serve a recorded session's frames back, in recording order.
+
+    Frames are grouped by *epoch* (number of inputs sent before them). Within
+    an epoch, successive grabs of the same rectangle return the recorded
+    frames in order, repeating the last one; a rectangle never grabbed in the
+    epoch is cropped from a recorded frame that contains it (searching back
+    through earlier epochs, since the UI only changes on input).
+    """
+
+    name = "session"
+    live = False
+
+    def __init__(self, directory: Path | str, events: Optional[List[Dict[str, Any]]] = None):
+        self.directory = Path(directory)
+        events = events if events is not None else load_events(self.directory)
+        self._queues: Dict[Tuple[int, Rect], List[Dict[str, Any]]] = {}
+        self._by_epoch: Dict[int, List[Tuple[Rect, Dict[str, Any]]]] = {}
+        self._windows: List[Tuple[int, Optional[Dict[str, Any]]]] = []
+        self.inputs: List[str] = []
+        self._screen: Optional[Tuple[int, int]] = None
+        epoch = 0
+        for ev in events:
+            kind = ev.get("type")
+            if kind == "input":
+                self.inputs.append(ev.get("event", ""))
+                epoch += 1
+            elif kind == "frame":
+                rect = (ev["x"], ev["y"], ev["w"], ev["h"])
+                self._queues.setdefault((epoch, rect), []).append(ev)
+                self._by_epoch.setdefault(epoch, []).append((rect, ev))
+            elif kind == "window":
+                self._windows.append((epoch, ev.get("window")))
+            elif kind == "screen" and self._screen is None:
+                self._screen = tuple(ev["size"])
+        self.epoch = 0
+        self.replayed_inputs: List[str] = []
+        self._pos: Dict[Tuple[int, Rect], int] = {}
+        self._decoded: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- geometria ---
+    def screen_size(self) -> Tuple[int, int]:
+        if self._screen is not None:
+            return self._screen
+        win = self.find_window("")
+        return (win["w"], win["h"]) if win else (0, 0)
+
+    def find_window(self, title_contains: str) -> Optional[Dict[str, Any]]:
+        current = None
+        for epoch, win in self._windows:
+            if epoch > self.epoch:
+                break
+            current = win
+        if not current:
+            return None
+        title = current.get("title") or ""
+        if title_contains and title and title_contains.lower() not in title.lower():
+            return None
+        return {"handle": None, **current}
+
+    # --- pixels ---
+    def _blob(self, digest: str) -> np.ndarray:
+        arr = self._decoded.get(digest)
+        if arr is None:
+            arr = np.asarray(Image.open(self.directory / "blobs" / f"{digest}.png").convert("RGB"))
+            self._decoded[digest] = arr
+            while len(self._decoded) > 32:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(digest)
+        return arr
+
+    def _materialize(self, ev: Dict[str, Any]) -> np.ndarray:
+        if ev.get("blob"):
+            return self._blob(ev["blob"])
+        frame = self._blob(ev["base"]).copy()
+        patch = self._blob(ev["patch"])
+        dy, dx = ev["dy"], ev["dx"]
+        frame[dy : dy + patch.shape[0], dx : dx + patch.shape[1]] = patch
+        return frame
+
+    def grab(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        rect = (int(x), int(y), int(w), int(h))
+        with self._lock:
+            key = (self.epoch, rect)
+            queue = self._queues.get(key)
+            if queue:
+                pos = self._pos.get(key, 0)
+                self._pos[key] = pos + 1
+                return self._materialize(queue[min(pos, len(queue) - 1)])
+            for epoch in range(self.epoch, -1, -1):
+                for (fx, fy, fw, fh), ev in reversed(self._by_epoch.get(epoch, [])):
+                    if fx <= x and fy <= y and x + w <= fx + fw and y + h <= fy + fh:
+                        frame = self._materialize(ev)
+                        return frame[y - fy : y - fy + h, x - fx : x - fx + w]
+        raise ValueError(f"nenhum frame gravado cobre {rect} (epoch {self.epoch})")
+
+    def advance(self, event: str = "") -> None:
+        with self._lock:
+            self.replayed_inputs.append(event)
+            if self.epoch < len(self.inputs):
+                self.epoch += 1
+
+
+# ---------- gravador ativo (um por processo) ----------
+_RECORDER: Optional[SessionRecorder] = None
+
+
+def start_recording(directory: Optional[Path | str], **header) -> SessionRecorder:
+    """Install a recorder; with a directory the capture backend is wrapped too."""
+    global _RECORDER
+    from .backends import get_backend, set_backend
+
+    stop_recording()
+    recorder = SessionRecorder(directory)
+    recorder.log("session", **header)
+    if directory is not None:
+        set_backend(RecordingBackend(get_backend(), recorder))
+    _RECORDER = recorder
+    return recorder
+
+
+def stop_recording() -> Optional[SessionRecorder]:
+    global _RECORDER
+    recorder, _RECORDER = _RECORDER, None
+    if recorder is not None:
+        recorder.close()
+        from .backends import get_backend, set_backend
+
+        backend = get_backend()
+        if isinstance(backend, RecordingBackend) and backend.recorder is recorder:
+            set_backend(backend.inner)
+    return recorder
+
+
+def is_recording() -> bool:
+    return _RECORDER is not None
+
+
+def record(type_: str, **fields) -> None:
+    """Log an event to the active recorder (no-op when not recording)."""
+    if _RECORDER is not None:
+        _RECORDER.log(type_, **fields)
+
+
+# ---------- diff ----------
+_VOLATILE = {"timestamp", "ts_ms"}
+
+
+def _comparable(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in r.items() if k not in _VOLATILE} for r in rows]
+
+
+def diff_rows(recorded: List[Dict[str, Any]], replayed: List[Dict[str, Any]]) -> List[str]:
+    """Compare ``rows`` events pairwise; returns human-readable differences."""
+    diffs: List[str] = []
+    if len(recorded) != len(replayed):
+        diffs.append(f"páginas: gravado={len(recorded)} replay={len(replayed)}")
+    for n, (old, new) in enumerate(zip(recorded, replayed)):
+        label = f"página {n} ({old.get('view')}, page_index={old.get('page_index')})"
+        old_rows, new_rows = _comparable(old.get("rows", [])), _comparable(new.get("rows", []))
+        if len(old_rows) != len(new_rows):
+            diffs.append(f"{label}: linhas gravado={len(old_rows)} replay={len(new_rows)}")
+        for i, (a, b) in enumerate(zip(old_rows, new_rows)):
+            changed = {k: (a.get(k), b.get(k)) for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)}
+            if changed:
+                diffs.append(f"{label} linha {i}: {changed}")
+    return diffs
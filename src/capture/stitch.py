@@ -0,0 +1,82 @@
+"""Scroll shift estimation between consecutive frames of a list.
+
+Each frame is reduced to a *row-band profile*: for every pixel row, the mean
+gray level of :data:`BANDS` vertical strips. Scrolling down by ``s`` pixels
+moves content up, so ``cur[y] == prev[y + s]``; the shift is the ``s`` whose
+overlap has the smallest mean absolute difference (a 1-D cross-correlation
+over the rows, ``O(H²·BANDS)`` on a few hundred rows).
+
+:class:`ScrollTracker` turns the pixel shift into whole rows, so a reader
+only OCRs the rows the scroll revealed and stops when the list did not move.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+BANDS = 8
+# diferença média máxima (níveis de cinza) para aceitar um alinhamento
+MATCH_TOL = 4.0
+
+
+def row_bands(frame: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """``(H, bands)`` float32 profile of ``frame``."""
+    gray = frame.mean(axis=2) if frame.ndim == 3 else frame.astype(np.float32)
+    h, w = gray.shape
+    edges = np.linspace(0, w, bands + 1).astype(int)
+    return np.stack(
+        [gray[:, a:b].mean(axis=1) if b > a else np.zeros(h) for a, b in zip(edges[:-1], edges[1:])],
+        axis=1,
+    ).astype(np.float32)
+
+
+def estimate_shift(
+    prev: np.ndarray, cur: np.ndarray, min_overlap: int, tol: float = MATCH_TOL
+) -> Optional[int]:
+    """Pixels the content moved up from ``prev`` to ``cur`` (both :func:`row_bands`).
+
+    Returns ``None`` when no shift leaves at least ``min_overlap`` matching rows
+    (the list moved a whole page or more, or the view changed).
+    """
+    h = min(len(prev), len(cur))
+    best_s, best_err = None, tol
+    for s in range(0, max(0, h - min_overlap) + 1):
+        err = float(np.abs(prev[s:h] - cur[: h - s]).mean())
+        if err < best_err:
+            best_s, best_err = s, err
+            if err == 0.0:
+                break
+    return best_s
+
+
+class ScrollTracker:
+    """Row offset of a scrolling list, updated from one frame per page.
+
+    :meth:`advance` returns the page row indices that are new since the
+    previous frame (all of them for the first page); ``offset`` is the list
+    row shown in page row 0 and ``at_end`` turns True when a scroll did not
+    move the list.
+    """
+
+    def __init__(self, line_h: int, rows: int):
+        self.line_h = max(1, line_h)
+        self.rows = rows
+        self.offset = 0
+        self.at_end = False
+        self._prev: Optional[np.ndarray] = None
+
+    def advance(self, frame: np.ndarray) -> range:
+        cur = row_bands(frame[: self.line_h * self.rows])
+        prev, self._prev = self._prev, cur
+        if prev is None:
+            return range(self.rows)
+        px = estimate_shift(prev, cur, min_overlap=self.line_h)
+        shift = self.rows if px is None else int(round(px / self.line_h))
+        if shift == 0:
+            self.at_end = True
+            return range(0)
+        shift = min(shift, self.rows)
+        self.offset += shift
+        return range(self.rows - shift, self.rows)
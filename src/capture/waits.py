@@ -0,0 +1,114 @@
+"""Event-driven UI waits: poll a cheap downscaled grab of a region.
+
+Instead of sleeping a fixed time after a click/keystroke/scroll, callers take
+a :func:`region_signature` before acting and then wait for the region to
+change and/or settle. The configured delays become *timeouts*: in the worst
+case (nothing observable happens) the wait costs what the old sleep did.
+
+Rects are absolute screen coordinates ``(x, y, w, h)``. With a non-live
+capture backend (replay/bench) frames only change on input, so every wait
+returns immediately.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..utils.timing import span
+from .backends import get_backend
+
+Rect = Tuple[int, int, int, int]
+
+POLL_MS = 10
+# diferença média (0-255, após downscale) que conta como "mudou"
+CHANGE_THRESHOLD = 3.0
+STABLE_THRESHOLD = 1.0
+
+
+def region_signature(rect: Rect, step: int = 4) -> np.ndarray:
+    """Grayscale grab of ``rect`` subsampled every ``step`` pixels (int16)."""
+    x, y, w, h = rect
+    arr = get_backend().grab(x, y, max(1, w), max(1, h))
+    small = arr[::step, ::step]
+    return small.mean(axis=2).astype(np.int16) if small.ndim == 3 else small.astype(np.int16)
+
+
+def _distance(a: np.ndarray, b: np.ndarray) -> float:
+    if a.shape != b.shape:
+        return float("inf")
+    return float(np.abs(a - b).mean())
+
+
+def wait_region_changed(
+    rect: Rect,
+    baseline: Optional[np.ndarray] = None,
+    timeout_ms: int = 1000,
+    poll_ms: int = POLL_MS,
+    threshold: float = CHANGE_THRESHOLD,
+) -> bool:
+    """Return True as soon as ``rect`` differs from ``baseline``; False on timeout.
+
+    Take ``baseline`` with :func:`region_signature` *before* the input that is
+    expected to change the region; without it the first poll is the baseline.
+    """
+    if not get_backend().live:
+        return True
+    with span("wait.changed"):
+        if baseline is None:
+            baseline = region_signature(rect)
+        deadline = time.perf_counter() + timeout_ms / 1000.0
+        while True:
+            if _distance(region_signature(rect), baseline) > threshold:
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(poll_ms / 1000.0)
+
+
+def wait_region_stable(
+    rect: Rect,
+    stable_ms: int = 40,
+    timeout_ms: int = 1000,
+    poll_ms: int = POLL_MS,
+    threshold: float = STABLE_THRESHOLD,
+) -> bool:
+    """Return True once ``rect`` stays unchanged for ``stable_ms``; False on timeout."""
+    if not get_backend().live:
+        return True
+    with span("wait.stable"):
+        deadline = time.perf_counter() + timeout_ms / 1000.0
+        last = region_signature(rect)
+        still_since = time.perf_counter()
+        while True:
+            time.sleep(poll_ms / 1000.0)
+            now = time.perf_counter()
+            current = region_signature(rect)
+            if _distance(current, last) > threshold:
+                still_since = now
+                last = current
+            elif (now - still_since) * 1000.0 >= stable_ms:
+                return True
+            if now >= deadline:
+                return False
+
+
+def wait_region_settled(
+    rect: Rect,
+    baseline: Optional[np.ndarray],
+    timeout_ms: int,
+    stable_ms: int = 40,
+) -> bool:
+    """Wait for a change from ``baseline`` and then for the region to stop moving.
+
+    Both phases share ``timeout_ms``. Returns False if no change was seen.
+    """
+    t0 = time.perf_counter()
+    changed = wait_region_changed(rect, baseline, timeout_ms=timeout_ms)
+    if not changed:
+        return False
+    left = max(0, int(timeout_ms - (time.perf_counter() - t0) * 1000.0))
+    wait_region_stable(rect, stable_ms=stable_ms, timeout_ms=max(left, stable_ms))
+    return True
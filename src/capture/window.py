@@ -2,8 +2,15 @@ import ctypes
 import time
 from typing import Dict, Optional, Tuple
 
+import numpy as np
 from PIL import ImageGrab
-import win32gui
+
+from ..utils.timing import timed
+
+try:  # Windows-only; ausente no modo replay (ver src.capture.backends)
+    import win32gui
+except ImportError:  # pragma: no cover - depende do SO
+    win32gui = None
 
 # --- DPI awareness (corrige capturas em 125%/150%) ---
 def _enable_dpi_awareness():
@@ -27,6 +34,7 @@ def get_screen_resolution() -> Tuple[int, int]:
     return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
 
 
+@timed("capture.rect")
 def capture_rect(x: int, y: int, w: int, h: int):
     """Capture a rectangular region of the screen specified in absolute pixels."""
 
@@ -34,6 +42,12 @@ def capture_rect(x: int, y: int, w: int, h: int):
     return ImageGrab.grab(bbox=bbox)
 
 
+def capture_array(x: int, y: int, w: int, h: int) -> np.ndarray:
+    """Capture a rectangle once and return it as an ``(h, w, 3)`` RGB array."""
+
+    return np.asarray(capture_rect(x, y, w, h).convert("RGB"))
+
+
 def human_pause(ms: int = 120) -> None:
     """Pause execution for a short human-like delay expressed in milliseconds."""
 
@@ -1,16 +1,10 @@
 from pathlib import Path
-import time
 import yaml
 
-from ..capture.window import (
-    capture_rect,
-    capture_rect_in_window,
-    get_screen_resolution,
-    get_window_rect,
-)
+from ..capture.backends import get_backend
 from ..capture.calibrate import relative_rect
-from ..ocr.engine import OCREngine, load_ocr_config
-from ..utils.timing import sleep_ms
+from ..capture.probes import wait_ready
+from ..ocr.engine import get_engine
 
 
 def _capture_fn():
@@ -21,24 +15,25 @@ def _capture_fn():
     ) as fh:
         cap_cfg = yaml.safe_load(fh)
 
+    backend = get_backend()
     title = (cap_cfg.get("window_title_contains") or "").strip()
-    wnd = get_window_rect(title) if title else None
+    wnd = backend.find_window(title) if title else None
     if wnd:
         base = (wnd["w"], wnd["h"])
 
         def cap(x, y, w, h):
-            return capture_rect_in_window(wnd["x"], wnd["y"], x, y, w, h)
+            return backend.grab(wnd["x"] + x, wnd["y"] + y, w, h)
 
         return base, cap
-    base = get_screen_resolution()
+    base = backend.screen_size()
 
     def cap(x, y, w, h):
-        return capture_rect(x, y, w, h)
+        return backend.grab(x, y, w, h)
 
     return base, cap
 
 
-def ocr_first_row_name(ui_cfg_path: str, ocr_cfg_path: str) -> str:
+def _first_row_grab(ui_cfg_path: str):
     with open(ui_cfg_path, "r", encoding="utf-8") as fh:
         ui = yaml.safe_load(fh)
 
@@ -54,8 +49,12 @@ def ocr_first_row_name(ui_cfg_path: str, ocr_cfg_path: str) -> str:
         int(cols["name"]["w"] * lw),
         line_h,
     )
-    eng = OCREngine(load_ocr_config(ocr_cfg_path))
-    txt, _ = eng.text_and_conf(cap(*name_rect))
+    return lambda: cap(*name_rect)
+
+
+def ocr_first_row_name(ui_cfg_path: str, ocr_cfg_path: str) -> str:
+    eng = get_engine(ocr_cfg_path)
+    txt, _ = eng.text_and_conf(_first_row_grab(ui_cfg_path)())
     return " ".join(txt.split())
 
 
@@ -65,14 +64,18 @@ def wait_for_item_visible(
     expected_substr: str,
     timeout_s: float = 3.0,
 ) -> bool:
-    t0 = time.time()
     exp = expected_substr.lower()
-    while time.time() - t0 < timeout_s:
-        txt = (ocr_first_row_name(ui_cfg_path, ocr_cfg_path) or "").lower()
-        if exp and exp in txt:
-            return True
-        sleep_ms(150, jitter=0.3)
-    return False
+    if not exp:
+        return False
+    # config/engine resolvidos uma vez; o loop só captura e roda o probe de
+    # conteúdo, e o OCR só quando a primeira linha mudou e estabilizou
+    eng = get_engine(ocr_cfg_path)
+
+    def confirm(img) -> bool:
+        txt, _ = eng.text_and_conf(img)
+        return exp in " ".join(txt.split()).lower()
+
+    return wait_ready(_first_row_grab(ui_cfg_path), confirm, int(timeout_s * 1000))
 
 
 # ----- Esqueleto de ações de domínio (a implementar no Nível 2) -----
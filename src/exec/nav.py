@@ -7,20 +7,21 @@ import random
 from pathlib import Path
 from typing import Any, Dict, Tuple
 
-import keyboard
-import win32api
-import win32con
-import win32gui
 import yaml
 
+try:  # Windows-only; ausentes no modo replay
+    import keyboard
+    import win32api
+    import win32con
+    import win32gui
+except ImportError:  # pragma: no cover - depende do SO
+    keyboard = win32api = win32con = win32gui = None
+
+from src.capture.backends import get_backend
 from src.capture.calibrate import relative_rect
-from src.capture.window import (
-    capture_rect,
-    get_screen_resolution,
-    get_window_rect,
-    human_pause,
-)
-from src.ocr.engine import OCREngine, load_ocr_config
+from src.capture.waits import region_signature, wait_region_settled, wait_region_stable
+from src.capture.window import human_pause
+from src.ocr.engine import OCREngine, get_engine
 
 logger = logging.getLogger(__name__)
 
@@ -28,23 +29,17 @@ BASE = Path(__file__).resolve().parents[2]
 CFG_CAPTURE = BASE / "config" / "capture.yaml"
 CFG_OCR = BASE / "config" / "ocr.yaml"
 
-_OCR_ENGINE: OCREngine | None = None
-
 
 def _ensure_ocr_engine() -> OCREngine | None:
-    global _OCR_ENGINE
-    if _OCR_ENGINE:
-        return _OCR_ENGINE
     if not CFG_OCR.exists():
         logger.debug("Arquivo de configuração OCR não encontrado: %s", CFG_OCR)
         return None
     try:
-        cfg = load_ocr_config(str(CFG_OCR))
+        return get_engine(str(CFG_OCR))
     except OSError:
         logger.exception("Falha ao carregar configuração OCR em %s", CFG_OCR)
         return None
-    _OCR_ENGINE = OCREngine(cfg)
-    return _OCR_ENGINE
+
 
 def _load_ui_profile(ui_cfg_path: str) -> Dict[str, Any]:
     with open(ui_cfg_path, "r", encoding="utf-8") as fh:
@@ -63,7 +58,7 @@ def _load_capture_cfg() -> Dict[str, Any]:
 
 
 def _screen_bounds() -> Tuple[int, int, int, int]:
-    sw, sh = get_screen_resolution()
+    sw, sh = get_backend().screen_size()
     return 0, 0, sw - 1, sh - 1
 
 
@@ -83,13 +78,13 @@ def _focus_window() -> Dict[str, Any] | None:
         logger.warning("window_title_contains não configurado em capture.yaml")
         return None
 
-    win = get_window_rect(title_hint)
+    win = get_backend().find_window(title_hint)
     if not win:
         logger.warning("janela com título contendo '%s' não encontrada", title_hint)
         return None
 
     hwnd = win.get("handle")
-    if hwnd:
+    if hwnd and get_backend().live:
         try:
             win32gui.SetForegroundWindow(hwnd)
         except win32gui.error:
@@ -132,7 +127,7 @@ def _confirm_first_result(
 
     rx, ry, rw, rh = relative_rect(first_result_cfg, base)
     ox, oy = origin
-    snapshot = capture_rect(ox + rx, oy + ry, rw, rh)
+    snapshot = get_backend().grab(ox + rx, oy + ry, rw, rh)
     text, conf = engine.text_and_conf(snapshot)
     norm_text = " ".join(text.split()).lower()
     expected_head = expected_name.strip().split()
@@ -171,8 +166,9 @@ def open_item_by_search(ui_cfg_path: str, item_name: str) -> bool:
         logger.error("Anchor 'search.input' não configurada no profile da UI")
         return False
 
+    backend = get_backend()
     win = _focus_window()
-    screen = get_screen_resolution()
+    screen = backend.screen_size()
     if win:
         base = (win["w"], win["h"])
         origin = (win["x"], win["y"])
@@ -186,41 +182,70 @@ def open_item_by_search(ui_cfg_path: str, item_name: str) -> bool:
     input_rect = relative_rect(search_box, base)
     rcx, rcy = _rect_center(input_rect)
     cx, cy = origin[0] + rcx, origin[1] + rcy
-
-    _click_at(
-        cx,
-        cy,
-        pause_ms=search_cfg.get("pause_before_focus_ms", 120),
-        jitter_px=jitter_px,
-        bounds=bounds,
-    )
-    keyboard.send("ctrl+a")
-    human_pause(search_cfg.get("pause_after_clear_ms", 80))
-
-    delay = max(0.0, search_cfg.get("type_interval_ms", 30) / 1000.0)
-    keyboard.write(item_name, delay=delay)
-
-    submit_key = search_cfg.get("submit_key", "enter")
-    if submit_key:
-        human_pause(search_cfg.get("pause_before_submit_ms", 100))
-        keyboard.send(submit_key)
+    input_abs = (origin[0] + input_rect[0], origin[1] + input_rect[1], input_rect[2], input_rect[3])
 
     first_result = search_cfg.get("first_result")
+    result_abs = None
+    if first_result:
+        rr = relative_rect(first_result, base)
+        result_abs = (origin[0] + rr[0], origin[1] + rr[1], rr[2], rr[3])
+
+    list_zone = profile.get("anchors", {}).get("list_zone")
+    list_abs = None
+    if list_zone:
+        lr = relative_rect(list_zone, base)
+        list_abs = (origin[0] + lr[0], origin[1] + lr[1], lr[2], lr[3])
+    before_list = None
+
+    # as pausas do profile viram tetos: cada etapa segue assim que a região
+    # observada reage (muda e estabiliza)
+    backend.advance("search")
+    if backend.live:
+        _click_at(
+            cx,
+            cy,
+            pause_ms=search_cfg.get("pause_before_focus_ms", 120),
+            jitter_px=jitter_px,
+            bounds=bounds,
+        )
+        before = region_signature(input_abs)
+        keyboard.send("ctrl+a")
+        wait_region_settled(input_abs, before, search_cfg.get("pause_after_clear_ms", 80))
+
+        # assinaturas antes de digitar: as esperas abaixo exigem que o campo e os
+        # resultados mudem (não basta o conteúdo antigo estar parado)
+        before = region_signature(input_abs)
+        before_results = region_signature(result_abs) if result_abs else None
+        before_list = region_signature(list_abs) if list_abs else None
+        delay = max(0.0, search_cfg.get("type_interval_ms", 30) / 1000.0)
+        keyboard.write(item_name, delay=delay)
+
+        submit_key = search_cfg.get("submit_key", "enter")
+        if submit_key:
+            wait_region_settled(input_abs, before, search_cfg.get("pause_before_submit_ms", 100))
+            keyboard.send(submit_key)
+        if result_abs:
+            wait_region_settled(result_abs, before_results, search_cfg.get("pause_before_result_click_ms", 180))
+
     confirmed = True
     pause_before_confirm_ms = search_cfg.get("pause_before_confirm_ms", 220)
     confirm_min_conf = float(search_cfg.get("confirm_min_conf", 0.55))
 
     if first_result:
-        result_rect = relative_rect(first_result, base)
-        rrx, rry = _rect_center(result_rect)
-        rx, ry = origin[0] + rrx, origin[1] + rry
-        pause_ms = search_cfg.get("pause_before_result_click_ms", 180)
-        _click_at(rx, ry, pause_ms=pause_ms, jitter_px=jitter_px, bounds=bounds)
+        rx, ry = _rect_center(result_abs)
+        backend.advance("click:first_result")
+        if backend.live:
+            _click_at(rx, ry, pause_ms=0, jitter_px=jitter_px, bounds=bounds)
 
         if search_cfg.get("confirm_first_result", True):
-            human_pause(pause_before_confirm_ms)
+            wait_region_stable(result_abs, timeout_ms=pause_before_confirm_ms)
             confirmed = _confirm_first_result(first_result, base, origin, item_name, min_conf=confirm_min_conf)
 
-    human_pause(search_cfg.get("pause_after_action_ms", 200))
+    pause_after_action_ms = search_cfg.get("pause_after_action_ms", 200)
+    if list_abs:
+        # a lista do item aberto tem que substituir a anterior
+        wait_region_settled(list_abs, before_list, pause_after_action_ms)
+    elif backend.live:
+        human_pause(pause_after_action_ms)
     logger.debug("Item '%s' pesquisado via busca", item_name)
     return confirmed
@@ -0,0 +1,148 @@
+"""Pipelined page reading: capture on the caller thread, OCR in worker processes.
+
+The caller (the UI thread) only navigates and grabs frames; each page frame
+goes to a :class:`~concurrent.futures.ProcessPoolExecutor` whose workers
+keep a warmed OCR engine. A single commit thread takes results in
+submission order and runs the caller's commit callbacks, so every DB write
+happens on one thread and in the order pages were captured::
+
+    with OCRPipeline(cfg_ocr, workers=2) as pipe:
+        for item in items:
+            runner.run("open_item", {"item_name": item})
+            pipe.submit(capture_book_page(view, cfg_ui), writer.add_snapshots)
+            pipe.call(writer.flush)
+
+Backpressure: at most ``max_pending`` entries wait for commit; ``submit``
+blocks beyond that, so capture never runs far ahead of OCR. While the
+pipeline is open the DB connection belongs to the commit thread — route
+every write through :meth:`OCRPipeline.submit` / :meth:`OCRPipeline.call`.
+
+``workers=0`` (and any run under ``--record``) reads pages inline on the
+caller thread with the same API, keeping recorded sessions deterministic.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.capture.session import is_recording, record
+from src.ocr.engine import get_engine
+from src.ocr.extract import read_book_page
+from src.utils.timing import span
+
+logger = logging.getLogger(__name__)
+
+Commit = Callable[[List[Dict]], Any]
+
+# ---------- processo worker ----------
+_WORKER_CFG_OCR: Optional[str] = None
+
+
+def _init_worker(cfg_ocr: str) -> None:
+    global _WORKER_CFG_OCR
+    _WORKER_CFG_OCR = cfg_ocr
+    get_engine(cfg_ocr)  # aquece o engine uma vez por processo
+
+
+def _ocr_page(page: Dict) -> List[Dict]:
+    return read_book_page(page, _WORKER_CFG_OCR)
+
+
+# ---------- pipeline ----------
+class OCRPipeline:
+    """Bounded capture → OCR pool → ordered single-writer commit pipeline."""
+
+    def __init__(self, cfg_ocr: str, workers: int = 0, max_pending: int = 4):
+        self.cfg_ocr = cfg_ocr
+        # gravando: OCR no processo, para os eventos "ocr"/"rows" irem ao log
+        self.workers = 0 if is_recording() else max(0, int(workers))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if self.workers:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(cfg_ocr,)
+            )
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._commit_loop, name="ocr-commit", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(cancel=exc_type is not None)
+        return False
+
+    # --- produtor (thread de captura/UI) ---
+    def submit(self, page: Dict, commit: Commit) -> None:
+        """Queue ``page`` (from ``capture_book_page``) for OCR; ``commit(rows)`` runs in order."""
+        self._check()
+        if self._pool is not None:
+            fut = self._pool.submit(_ocr_page, page)
+        else:
+            fut = Future()
+            try:
+                rows = read_book_page(page, self.cfg_ocr)
+                record("rows", scan="scan_once", view=page["source_view"], page_index=page["page_index"], rows=rows)
+                fut.set_result(rows)
+            except Exception as exc:
+                fut.set_exception(exc)
+        self._put((fut, commit))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> None:
+        """Run ``fn`` on the commit thread after everything submitted before it."""
+        self._check()
+        self._put((None, lambda _rows: fn(*args, **kwargs)))
+
+    def drain(self) -> None:
+        """Block until every queued entry has been committed."""
+        self._queue.join()
+        self._check()
+
+    def close(self, cancel: bool = False) -> None:
+        """Commit what is queued (or drop it with ``cancel``) and stop the workers."""
+        if self._closed:
+            return
+        self._closed = True
+        if cancel and self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._queue.put(None)
+        self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if not cancel:
+            self._check()
+
+    # --- interno ---
+    def _put(self, entry: tuple) -> None:
+        with span("pipeline.backpressure"):
+            self._queue.put(entry)
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _commit_loop(self) -> None:
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is None:
+                    return
+                if self._error is not None:
+                    continue  # após um erro só drena a fila
+                fut, commit = entry
+                rows = fut.result() if fut is not None else None
+                with span("pipeline.commit"):
+                    commit(rows)
+            except CancelledError:
+                pass
+            except BaseException as exc:
+                logger.exception("falha no commit do pipeline de OCR")
+                self._error = exc
+            finally:
+                self._queue.task_done()
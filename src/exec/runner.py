@@ -1,13 +1,18 @@
 from pathlib import Path
-import time, yaml, pyautogui as pg
+import yaml
 
-from ..capture.window import (
-    get_window_rect, get_screen_resolution,
-    capture_rect, capture_rect_in_window
-)
+try:  # sem display (replay em Linux) o import falha; só os passos de input usam
+    import pyautogui as pg
+except Exception:  # pragma: no cover - depende do ambiente
+    pg = None
+
+from ..capture.backends import get_backend
 from ..capture.calibrate import relative_rect
-from ..ocr.engine import OCREngine, load_ocr_config
-from ..utils.timing import sleep_ms
+from ..capture.probes import load_reference, probe_name, wait_ready
+from ..capture.session import record
+from ..capture.waits import region_signature, wait_region_settled, wait_region_stable
+from ..ocr.engine import get_engine
+from ..utils.timing import sleep_ms, span
 
 
 class ActionRunner:
@@ -19,7 +24,10 @@ class ActionRunner:
       - type_text {text}           (suporta <item_name>)
       - key {keys: ["enter"]}
       - sleep_ms {ms}
-      - wait_header_contains {text, timeout_ms}
+      - wait_stable {anchor, stable_ms, timeout_ms}
+    click/type_clear/type_text/key esperam a UI reagir (região ``watch`` mudar
+    e estabilizar) em vez de dormir um tempo fixo; ``timeout_ms`` é o teto.
+      - wait_header_contains {text, timeout_ms}   (probe header_row@<text> se calibrado)
       - wait_item_first_row {timeout_ms}
     """
 
@@ -30,124 +38,199 @@ class ActionRunner:
         self.ui = yaml.safe_load(open(cfg_ui_path, "r", encoding="utf-8"))
         self.prof = next(iter(self.ui["profiles"].values()))
         self.actions = yaml.safe_load(open(cfg_actions_path, "r", encoding="utf-8"))["actions"]
-        self.engine = OCREngine(load_ocr_config(cfg_ocr_path))
+        self.engine = get_engine(cfg_ocr_path)
+        self._focus: str | None = None  # último anchor clicado (recebe o texto)
 
     # --- helpers base/window ---
     def _window_and_cap(self):
         cfg_path = Path(self.cfg_ui_path).resolve().parents[1] / "config" / "capture.yaml"
         with cfg_path.open("r", encoding="utf-8") as fh:
             cap_cfg = yaml.safe_load(fh)
+        backend = get_backend()
         title = (cap_cfg.get("window_title_contains") or "").strip()
-        wnd = get_window_rect(title) if title else None
+        wnd = backend.find_window(title) if title else None
         if wnd:
             base = (wnd["w"], wnd["h"])
-            def cap(x,y,w,h): return capture_rect_in_window(wnd["x"], wnd["y"], x,y,w,h)
+            def cap(x,y,w,h): return backend.grab(wnd["x"] + x, wnd["y"] + y, w, h)
             origin = (wnd["x"], wnd["y"])
             return base, cap, origin
         else:
-            base = get_screen_resolution()
-            def cap(x,y,w,h): return capture_rect(x,y,w,h)
+            base = backend.screen_size()
+            def cap(x,y,w,h): return backend.grab(x,y,w,h)
             return base, cap, (0,0)
 
-    def _anchor_center_abs(self, anchor_name: str):
+    def _anchor_rect_abs(self, anchor_name: str):
         anchors = self.prof["anchors"]
         if anchor_name not in anchors:
             raise RuntimeError(f"Anchor '{anchor_name}' não encontrado no ui_profiles.yaml")
         base, _, origin = self._window_and_cap()
         x,y,w,h = relative_rect(anchors[anchor_name], base)
-        ax, ay = origin[0] + x + w//2, origin[1] + y + h//2
-        return ax, ay
+        return origin[0] + x, origin[1] + y, w, h
 
-    def _ocr_text_zone(self, anchor_name: str) -> str:
+    def _anchor_center_abs(self, anchor_name: str):
+        x,y,w,h = self._anchor_rect_abs(anchor_name)
+        return x + w//2, y + h//2
+
+    def _watch_rect(self, watch: str | None):
+        name = watch or self._focus
+        if not name or name not in self.prof["anchors"]:
+            return None
+        return self._anchor_rect_abs(name)
+
+    def _settle(self, rect, before, timeout_ms: int) -> None:
+        # sem região observável, cai no comportamento antigo (sleep fixo)
+        if rect is None:
+            sleep_ms(timeout_ms)
+            return
+        wait_region_settled(rect, before, timeout_ms)
+
+    def _zone_grab(self, anchor_name: str):
         base, cap, _ = self._window_and_cap()
-        x,y,w,h = relative_rect(self.prof["anchors"][anchor_name], base)
-        img = cap(x,y,w,h)
-        txt, _ = self.engine.text_and_conf(img)
-        return " ".join((txt or "").split()).lower()
+        rect = relative_rect(self.prof["anchors"][anchor_name], base)
+        return lambda: cap(*rect)
 
-    def _ocr_first_row_name(self) -> str:
+    def _first_row_grab(self):
         base, cap, _ = self._window_and_cap()
         lx, ly, lw, lh = relative_rect(self.prof["anchors"]["list_zone"], base)
         cols = self.prof["columns"]
         line_h = int(lh / 12)
         y0 = ly
         name_rect = (lx + int(cols["name"]["x"] * lw), y0, int(cols["name"]["w"] * lw), line_h)
-        img = cap(*name_rect)
+        return lambda: cap(*name_rect)
+
+    def _ocr_zone_img(self, img) -> str:
+        # geometria conhecida: reconhecimento direto, sem detecção
+        (txt, _), = self.engine.recognize_batch([img])
+        return " ".join((txt or "").split()).lower()
+
+    def _ocr_first_row_img(self, img) -> str:
         txt, _ = self.engine.text_and_conf(img)
         return " ".join((txt or "").split()).lower()
 
+    def _ocr_text_zone(self, anchor_name: str) -> str:
+        return self._ocr_zone_img(self._zone_grab(anchor_name)())
+
+    def _ocr_first_row_name(self) -> str:
+        return self._ocr_first_row_img(self._first_row_grab()())
+
     # Público: útil para schedulers/rotinas
     def read_first_row_name(self) -> str:
         return self._ocr_first_row_name()
 
     # --- primitives ---
-    def click(self, anchor_name: str):
+    # todo input passa pelo backend (gravação); sem backend live (replay) ele
+    # só avança o frame e não é enviado
+    def _replayed(self, event: str) -> bool:
+        backend = get_backend()
+        backend.advance(event)
+        return not backend.live
+
+    def click(self, anchor_name: str, watch: str | None = None, timeout_ms: int = 150):
+        self._focus = anchor_name
+        if self._replayed(f"click:{anchor_name}"):
+            return
         ax, ay = self._anchor_center_abs(anchor_name)
+        rect = self._watch_rect(watch)
+        before = region_signature(rect) if rect else None
         pg.moveTo(ax, ay, duration=0.05)
         pg.click()
-        sleep_ms(150)
-
-    def type_clear(self):
-        pg.hotkey("ctrl","a"); sleep_ms(40)
-        pg.press("backspace"); sleep_ms(40)
-
-    def type_text(self, text: str):
+        self._settle(rect, before, timeout_ms)
+
+    def type_clear(self, watch: str | None = None, timeout_ms: int = 80):
+        if self._replayed("type_clear"):
+            return
+        rect = self._watch_rect(watch)
+        before = region_signature(rect) if rect else None
+        pg.hotkey("ctrl","a")
+        pg.press("backspace")
+        self._settle(rect, before, timeout_ms)
+
+    def type_text(self, text: str, watch: str | None = None, timeout_ms: int = 200):
+        if self._replayed("type_text"):
+            return
+        rect = self._watch_rect(watch)
+        before = region_signature(rect) if rect else None
         pg.write(text, interval=0.02)
-        sleep_ms(200)
+        self._settle(rect, before, timeout_ms)
 
-    def key(self, keys):
+    def key(self, keys, watch: str | None = None, timeout_ms: int = 120):
+        if self._replayed("key"):
+            return
+        rect = self._watch_rect(watch or "list_zone")
+        before = region_signature(rect) if rect else None
         if isinstance(keys, str):
             pg.press(keys)
         else:
             for k in keys:
                 pg.press(k)
-        sleep_ms(120)
-
+        self._settle(rect, before, timeout_ms)
+
+    def wait_stable(self, anchor_name: str | None, stable_ms: int = 60, timeout_ms: int = 300) -> bool:
+        if not get_backend().live:
+            return True
+        rect = self._watch_rect(anchor_name)
+        if rect is None:
+            sleep_ms(timeout_ms)
+            return True
+        return wait_region_stable(rect, stable_ms=stable_ms, timeout_ms=timeout_ms)
+
+    # esperas: o polling é só pixel (probes); o OCR roda uma vez quando o probe dispara
     def wait_header_contains(self, text: str, timeout_ms: int = 2000) -> bool:
-        t0 = time.time()
         needle = (text or "").lower()
-        while (time.time() - t0) * 1000 < timeout_ms:
-            got = self._ocr_text_zone("header_row")
-            if needle in got:
-                return True
-            sleep_ms(150)
-        return False
+        return wait_ready(
+            self._zone_grab("header_row"),
+            lambda img: needle in self._ocr_zone_img(img),
+            timeout_ms,
+            reference=load_reference(probe_name("header_row", text)),
+        )
 
     def wait_item_first_row(self, expected: str, timeout_ms: int = 3000) -> bool:
-        t0 = time.time()
         needle = (expected or "").lower()
-        while (time.time() - t0) * 1000 < timeout_ms:
-            got = self._ocr_first_row_name()
-            if needle and needle in got:
-                return True
-            sleep_ms(150)
-        return False
+        if not needle:
+            return False
+        return wait_ready(
+            self._first_row_grab(),
+            lambda img: needle in self._ocr_first_row_img(img),
+            timeout_ms,
+        )
 
     # --- executor ---
     def run(self, action_name: str, ctx: dict | None = None) -> bool:
         steps = self.actions.get(action_name, {}).get("steps", [])
         ctx = ctx or {}
-        ok = True
+        record("action", action=action_name, ctx=ctx)
         for st in steps:
             typ = st["type"]
-            if typ == "click":
-                self.click(st["anchor"])
-            elif typ == "type_clear":
-                self.type_clear()
-            elif typ == "type_text":
-                txt = st.get("text","")
-                txt = txt.replace("<item_name>", ctx.get("item_name",""))
-                self.type_text(txt)
-            elif typ == "key":
-                self.key(st.get("keys", []))
-            elif typ == "sleep_ms":
-                sleep_ms(st.get("ms",150))
-            elif typ == "wait_header_contains":
-                ok = self.wait_header_contains(st.get("text",""), st.get("timeout_ms",2000))
-                if not ok: return False
-            elif typ == "wait_item_first_row":
-                ok = self.wait_item_first_row(ctx.get("item_name",""), st.get("timeout_ms",3000))
-                if not ok: return False
-            else:
-                raise RuntimeError(f"Passo não suportado: {typ}")
-        return ok
+            with span(f"runner.{typ}"):
+                ok = self._run_step(action_name, st, typ, ctx)
+            if not ok:
+                return False
+        return True
+
+    def _run_step(self, action_name: str, st: dict, typ: str, ctx: dict) -> bool:
+        if typ == "click":
+            self.click(st["anchor"], st.get("watch"), st.get("timeout_ms", 150))
+        elif typ == "type_clear":
+            self.type_clear(st.get("watch"), st.get("timeout_ms", 80))
+        elif typ == "type_text":
+            txt = st.get("text","")
+            txt = txt.replace("<item_name>", ctx.get("item_name",""))
+            self.type_text(txt, st.get("watch"), st.get("timeout_ms", 200))
+        elif typ == "key":
+            self.key(st.get("keys", []), st.get("watch"), st.get("timeout_ms", 120))
+        elif typ == "sleep_ms":
+            sleep_ms(st.get("ms",150))
+        elif typ == "wait_stable":
+            ok = self.wait_stable(st.get("anchor"), st.get("stable_ms", 60), st.get("timeout_ms", 300))
+            record("step", action=action_name, step=typ, ok=ok)
+        elif typ == "wait_header_contains":
+            ok = self.wait_header_contains(st.get("text",""), st.get("timeout_ms",2000))
+            record("step", action=action_name, step=typ, ok=ok)
+            return ok
+        elif typ == "wait_item_first_row":
+            ok = self.wait_item_first_row(ctx.get("item_name",""), st.get("timeout_ms",3000))
+            record("step", action=action_name, step=typ, ok=ok)
+            return ok
+        else:
+            raise RuntimeError(f"Passo não suportado: {typ}")
+        return True
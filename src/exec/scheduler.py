@@ -1,52 +1,94 @@
 from __future__ import annotations
 
+import asyncio
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
 from datetime import datetime, timedelta
 import sqlite3
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Tuple
 
 import yaml
-import pyautogui as pg
 
 from src.exec.runner import ActionRunner
 from src.exec.watchdog import assert_window_alive
-from src.ocr.extract import scan_once, scan_my_orders
+from src.ocr.engine import get_engine
+from src.exec.pipeline import OCRPipeline
+from src.ocr.extract import capture_book_page, scan_my_orders_pages
+from src.analysis.signals import compute_signals, load_config as load_signals_config
 from src.capture.scroll import focus_and_scroll
+from src.utils.timing import span
+from src.storage.names import catalog_index, normalize_name, resolve_item
 from src.storage.db import (
+    SnapshotWriter,
     ensure_db,
     insert_action,
-    insert_my_order_snapshot,
-    insert_snapshot,
     mark_order_seen_now,
     new_run,
+    now_ms,
+    open_connection,
     set_order_closed,
     update_order_fill,
     end_run,
+    transaction,
     upsert_item,
 )
 
 
+# recursos que cada fase de job declara e quantas fases os usam ao mesmo tempo:
+#   ui  -> tela (mouse/teclado/captura): um por vez, o "screen lock"
+#   ocr -> engine de OCR do processo (não é thread-safe)
+#   db  -> SQLite; fases sem "ui" abrem a própria conexão
+RESOURCE_SLOTS = {"ui": 1, "ocr": 1, "db": 4}
+# ordem fixa de aquisição (sem deadlock entre jobs): os exclusivos primeiro,
+# para que um job na fila da tela não prenda um slot de db esperando por ela
+ACQUIRE_ORDER = ("ui", "ocr", "db")
+UI_JOB = ("ui", "ocr", "db")
+
+
 class JobScheduler:
     """
-    Lê um arquivo YAML de jobs e os executa em sequência.
+    Lê um arquivo YAML de jobs e os executa num núcleo asyncio: as fases que
+    usam a tela seguem a ordem do arquivo (um screen lock), e as que só usam
+    o banco rodam em paralelo num executor.
     Suporta:
-      - collect_watchlist: usa ActionRunner + scan_once (BUY/SELL)
+      - collect_watchlist: usa ActionRunner + scan_once (BUY/SELL); com
+                           ocr_workers > 0 o OCR roda num pool de processos
       - collect_category: chama uma ação de navegação definida no actions.yaml
                          e percorre a lista com setas, cadastrando itens (tabela items).
+      - reconcile_orders: fase "read" (UI: lê My Orders) e "match" (só banco).
     """
     def __init__(self, cfg_ui: str, cfg_actions: str, cfg_ocr: str, jobs_file: str):
         self.cfg_ui = cfg_ui
         self.cfg_actions = cfg_actions
         self.cfg_ocr = cfg_ocr
         self.jobs_file = Path(jobs_file)
+        self._con: sqlite3.Connection | None = None
+        self._local = threading.local()
+
+    @property
+    def con(self) -> sqlite3.Connection:
+        """Connection of the running phase: its own one, or the process writer for UI phases."""
+        return getattr(self._local, "con", None) or self._con
+
+    @con.setter
+    def con(self, value: sqlite3.Connection) -> None:
+        self._con = value
 
     def _load_jobs(self) -> List[Dict[str, Any]]:
         with self.jobs_file.open("r", encoding="utf-8") as fh:
             data = yaml.safe_load(fh) or {}
         return data.get("jobs", [])
 
+    def _dict_cursor(self) -> sqlite3.Cursor:
+        # a conexão é compartilhada no processo: row_factory só neste cursor
+        cur = self.con.cursor()
+        cur.row_factory = sqlite3.Row
+        return cur
+
     # ---------- Jobs ----------
     def _job_collect_watchlist(self, run_id: int, job: Dict[str, Any]):
         assert_window_alive()
@@ -60,28 +102,52 @@ class JobScheduler:
             items = [l for l in (lines[1:] if "item_name" in header else lines)]
 
         ar = ActionRunner(self.cfg_ui, self.cfg_actions, self.cfg_ocr)
-        for item in items:
-            insert_action(self.con, run_id, "open_item:start", {"item": item})
-            ok = ar.run("open_item", {"item_name": item})
-            insert_action(self.con, run_id, "open_item:end", {"item": item, "ok": ok})
-            if not ok:
-                continue
-
-            for v in views:
-                step_action = "open_buy_orders" if v == "BUY_LIST" else "open_sell_orders"
-                insert_action(self.con, run_id, f"{step_action}:start", {"item": item})
-                ok2 = ar.run(step_action, {"item_name": item})
-                insert_action(self.con, run_id, f"{step_action}:end", {"item": item, "ok": ok2})
-                if not ok2:
+        # um commit por item: ações e snapshots ficam no buffer até o fim do item.
+        # Com ocr_workers > 0 o OCR do item N roda em paralelo à navegação do N+1;
+        # toda escrita passa pelo pipeline (thread única de commit, em ordem).
+        with SnapshotWriter(self.con, run_id, dedup=job.get("dedup", "run")) as writer, \
+                OCRPipeline(self.cfg_ocr, workers=int(job.get("ocr_workers", 0) or 0)) as pipe:
+            def act(action, details, success=1):
+                pipe.call(writer.add_action, action, details, success, ts_ms=now_ms())
+
+            for item in items:
+                act("open_item:start", {"item": item})
+                ok = ar.run("open_item", {"item_name": item})
+                act("open_item:end", {"item": item, "ok": ok})
+                if not ok:
+                    pipe.call(writer.flush)
                     continue
 
-                rows = scan_once(v, self.cfg_ocr, self.cfg_ui, page_index=0, scroll_pos=0.0)
-                for r in rows:
-                    insert_snapshot(self.con, run_id, r)
-                insert_action(self.con, run_id, "scan_page", {"item": item, "view": v, "rows": len(rows)})
+                for v in views:
+                    step_action = "open_buy_orders" if v == "BUY_LIST" else "open_sell_orders"
+                    act(f"{step_action}:start", {"item": item})
+                    ok2 = ar.run(step_action, {"item_name": item})
+                    act(f"{step_action}:end", {"item": item, "ok": ok2})
+                    if not ok2:
+                        continue
+
+                    pipe.submit(capture_book_page(v, self.cfg_ui), self._page_commit(writer, item, v))
 
                 # opcional: cadastrar item no catálogo, sem categoria conhecida
-                upsert_item(self.con, name=item, category=None, subcategory=None, tags_json=None, source="watchlist")
+                pipe.call(self._commit_item, writer, item, None, None, "watchlist")
+
+    def _page_commit(self, writer: SnapshotWriter, item: str, view: str, item_name: str | None = None):
+        """Commit callback of one scanned page (runs on the pipeline's commit thread)."""
+        def commit(rows: List[Dict[str, Any]]) -> None:
+            if item_name is not None:
+                match = resolve_item(item_name, writer.con)
+                for r in rows:
+                    # sobrescrever o item_name lido para garantir consistência
+                    r["item_name"] = item_name
+                    r["canonical_item_id"] = match.item_id if match else None
+            writer.add_snapshots(rows)
+            writer.add_action("scan_page", {"item": item, "view": view, "rows": len(rows)})
+        return commit
+
+    def _commit_item(self, writer: SnapshotWriter, name: str, category, subcategory, source: str) -> None:
+        with transaction(writer.con):
+            writer.flush()
+            upsert_item(writer.con, name=name, category=category, subcategory=subcategory, tags_json=None, source=source)
 
     def _job_collect_category(self, run_id: int, job: Dict[str, Any]):
         assert_window_alive()
@@ -113,34 +179,30 @@ class JobScheduler:
             return
 
         seen = set()
-        for _ in range(limit_items):
-            name = ar.read_first_row_name()
-            if not name or name in seen:
-                # heurística simples: repetiu -> fim
-                break
-            seen.add(name)
-
-            # cadastra no catálogo com a categoria informada
-            upsert_item(self.con, name=name, category=category, subcategory=subcategory, tags_json=None, source="ocr")
-
-            # coleta BUY/SELL conforme solicitado
-            for v in views:
-                step_action = "open_buy_orders" if v == "BUY_LIST" else "open_sell_orders"
-                ar.run(step_action, {"item_name": name})
-                rows = scan_once(v, self.cfg_ocr, self.cfg_ui, page_index=0, scroll_pos=0.0)
-                for r in rows:
-                    # sobrescrever o item_name lido para garantir consistência
-                    r["item_name"] = name
-                    insert_snapshot(self.con, run_id, r)
-                insert_action(self.con, run_id, "scan_page", {"item": name, "view": v, "rows": len(rows)})
+        with SnapshotWriter(self.con, run_id, dedup=job.get("dedup", "run")) as writer, \
+                OCRPipeline(self.cfg_ocr, workers=int(job.get("ocr_workers", 0) or 0)) as pipe:
+            for _ in range(limit_items):
+                name = ar.read_first_row_name()
+                if not name or name in seen:
+                    # heurística simples: repetiu -> fim
+                    break
+                seen.add(name)
 
-            # vai para o próximo item visual com tecla ↓ (supondo foco na lista)
-            pg.press("down")
-            time.sleep(0.15)
+                # coleta BUY/SELL conforme solicitado
+                for v in views:
+                    step_action = "open_buy_orders" if v == "BUY_LIST" else "open_sell_orders"
+                    ar.run(step_action, {"item_name": name})
+                    pipe.submit(capture_book_page(v, self.cfg_ui), self._page_commit(writer, name, v, item_name=name))
 
-    def _job_reconcile_orders(self, run_id: int, job: Dict[str, Any]):
-        assert_window_alive()
+                # cadastra no catálogo com a categoria informada
+                pipe.call(self._commit_item, writer, name, category, subcategory, "ocr")
 
+                # vai para o próximo item visual com tecla ↓ (supondo foco na lista);
+                # pelo ActionRunner, para a tecla entrar na gravação e avançar o replay
+                ar.key("down", watch="list_zone", timeout_ms=150)
+
+    @staticmethod
+    def _reconcile_settings(job: Dict[str, Any]) -> tuple:
         price_epsilon_val = job.get("price_match_epsilon", 0.005)
         if price_epsilon_val is None:
             price_epsilon_val = 0.005
@@ -151,6 +213,18 @@ class JobScheduler:
         snapshot_window_minutes = int(snapshot_window_val)
         close_missing_after_minutes = job.get("close_missing_after_minutes")
         missing_close_status = job.get("missing_close_status")
+        return price_epsilon, snapshot_window_minutes, close_missing_after_minutes, missing_close_status
+
+    def _job_reconcile_orders(self, run_id: int, job: Dict[str, Any]):
+        """Both phases of reconcile_orders, in sequence."""
+        self._job_reconcile_read(run_id, job)
+        self._job_reconcile_match(run_id, job)
+
+    def _job_reconcile_read(self, run_id: int, job: Dict[str, Any]):
+        """UI half of reconcile_orders: open My Orders and import its rows as snapshots."""
+        assert_window_alive()
+
+        price_epsilon, snapshot_window_minutes, close_missing_after_minutes, _ = self._reconcile_settings(job)
         run_ui = bool(job.get("open_ui", True))
         side = job.get("side")
 
@@ -202,14 +276,19 @@ class JobScheduler:
         # 2) Ler a grade "My Orders" com OCR (várias páginas com scroll)
         pages = int(job.get("pages", 3))
         imported_rows = 0
-        for p in range(pages):
-            rows = scan_my_orders(self.cfg_ocr, self.cfg_ui, page_index=p, scroll_pos=float(p))
-            for r in rows:
-                insert_my_order_snapshot(self.con, r)
-            imported_rows += len(rows)
-            if p < pages - 1:
-                # rolar na área correta (defina anchor 'my_orders_zone' no profile)
-                focus_and_scroll(self.cfg_ui, anchor_name="my_orders_zone")
+        with SnapshotWriter(self.con, run_id) as writer:
+            # rola na área correta (defina anchor 'my_orders_zone' no profile) e
+            # para quando a lista não se mover mais
+            for rows in scan_my_orders_pages(
+                self.cfg_ocr,
+                self.cfg_ui,
+                max_pages=pages,
+                scroll=lambda: focus_and_scroll(self.cfg_ui, anchor_name="my_orders_zone"),
+            ):
+                for r in rows:
+                    writer.add_my_order_snapshot(r)
+                writer.flush()
+                imported_rows += len(rows)
 
         insert_action(
             self.con,
@@ -218,21 +297,37 @@ class JobScheduler:
             {"rows": imported_rows},
         )
 
+    def _job_reconcile_match(self, run_id: int, job: Dict[str, Any]):
+        """DB half of reconcile_orders: match snapshots to open orders (no UI)."""
+        (
+            price_epsilon,
+            snapshot_window_minutes,
+            close_missing_after_minutes,
+            missing_close_status,
+        ) = self._reconcile_settings(job)
+
         params: List[Any] = []
         query = """
-            SELECT id, ts, item_name, side, price, qty_remaining, settlement
+            SELECT id, ts, item_name, side, price, qty_remaining, settlement, canonical_item_id
             FROM my_orders_snapshots
         """
         if snapshot_window_minutes > 0:
-            query += " WHERE datetime(ts) >= datetime('now', ?)"
-            params.append(f"-{snapshot_window_minutes} minutes")
-        query += " ORDER BY datetime(ts) DESC"
+            query += " WHERE ts_ms >= ?"
+            params.append(now_ms() - snapshot_window_minutes * 60_000)
+        query += " ORDER BY ts_ms DESC"
 
-        cur = self.con.execute(query, params)
+        cur = self._dict_cursor()
+        cur.execute(query, params)
         snapshot_rows = [dict(row) for row in cur.fetchall()]
 
-        def _normalize_item(name: str | None) -> str:
-            return (name or "").strip().casefold()
+        names = catalog_index(self.con)
+
+        def _item_key(name: str | None, item_id: int | None = None) -> int | str:
+            # item do catálogo quando o nome resolve (tolera erros de OCR); senão o nome normalizado
+            if item_id is None:
+                match = names.resolve(name)
+                item_id = match.item_id if match else None
+            return item_id if item_id is not None else normalize_name(name)
 
         def _parse_float(val: Any) -> float | None:
             if val is None:
@@ -281,13 +376,13 @@ class JobScheduler:
             except ValueError:
                 return None
 
-        grouped: Dict[tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        grouped: Dict[tuple[int | str, str], List[Dict[str, Any]]] = defaultdict(list)
         for snap in snapshot_rows:
             price_val = _parse_float(snap.get("price"))
             if price_val is None:
                 continue
             side_val = (snap.get("side") or "").upper()
-            item_key = _normalize_item(snap.get("item_name"))
+            item_key = _item_key(snap.get("item_name"), snap.get("canonical_item_id"))
             snap["price"] = price_val
             snap["qty_remaining"] = _parse_int(snap.get("qty_remaining"))
             snap["_ts_obj"] = _parse_dt(snap.get("ts"))
@@ -296,7 +391,8 @@ class JobScheduler:
         for entries in grouped.values():
             entries.sort(key=lambda s: s.get("_ts_obj") or datetime.min, reverse=True)
 
-        cur = self.con.execute(
+        cur = self._dict_cursor()
+        cur.execute(
             """
             SELECT my_order_id, item_name, side, price, qty_requested, qty_filled,
                    status, last_seen_at
@@ -311,88 +407,90 @@ class JobScheduler:
         filled = 0
         closed_missing = 0
 
-        for order in active_orders:
-            item_key = _normalize_item(order.get("item_name"))
-            side_val = (order.get("side") or "").upper()
-            order_price = _parse_float(order.get("price"))
-            if order_price is None:
-                continue
-            order_qty_req = _parse_int(order.get("qty_requested")) or 0
-            order_qty_filled = _parse_int(order.get("qty_filled")) or 0
-
-            candidates = grouped.get((item_key, side_val), [])
-            match = None
-            for snap in candidates:
-                snap_price = snap["price"]
-                if abs(snap_price - order_price) <= price_epsilon:
-                    match = snap
-                    break
+        # seen/fill/close + log de todas as ordens numa única transação
+        with transaction(self.con):
+            for order in active_orders:
+                item_key = _item_key(order.get("item_name"))
+                side_val = (order.get("side") or "").upper()
+                order_price = _parse_float(order.get("price"))
+                if order_price is None:
+                    continue
+                order_qty_req = _parse_int(order.get("qty_requested")) or 0
+                order_qty_filled = _parse_int(order.get("qty_filled")) or 0
+
+                candidates = grouped.get((item_key, side_val), [])
+                match = None
+                for snap in candidates:
+                    snap_price = snap["price"]
+                    if abs(snap_price - order_price) <= price_epsilon:
+                        match = snap
+                        break
+
+                if match:
+                    matched += 1
+                    mark_order_seen_now(self.con, order["my_order_id"])
+
+                    qty_remaining = match.get("qty_remaining")
+                    fill_delta = 0
+                    total_filled = order_qty_filled
+                    if qty_remaining is not None:
+                        qty_remaining = max(qty_remaining, 0)
+                        total_filled = max(0, min(order_qty_req, order_qty_req - qty_remaining))
+                        fill_delta = total_filled - order_qty_filled
+                        if fill_delta > 0:
+                            update_order_fill(self.con, order["my_order_id"], fill_delta)
+                    order_qty_filled = total_filled
+                    closed_now = False
+                    if order_qty_req > 0 and order_qty_filled >= order_qty_req:
+                        set_order_closed(self.con, order["my_order_id"], "FILLED")
+                        filled += 1
+                        closed_now = True
+                    insert_action(
+                        self.con,
+                        run_id,
+                        "reconcile_orders:match",
+                        {
+                            "my_order_id": order["my_order_id"],
+                            "qty_delta": fill_delta,
+                            "snapshot_id": match.get("id"),
+                            "qty_remaining": qty_remaining,
+                            "closed": closed_now,
+                        },
+                    )
+                    continue
 
-            if match:
-                matched += 1
-                mark_order_seen_now(self.con, order["my_order_id"])
-
-                qty_remaining = match.get("qty_remaining")
-                fill_delta = 0
-                total_filled = order_qty_filled
-                if qty_remaining is not None:
-                    qty_remaining = max(qty_remaining, 0)
-                    total_filled = max(0, min(order_qty_req, order_qty_req - qty_remaining))
-                    fill_delta = total_filled - order_qty_filled
-                    if fill_delta > 0:
-                        update_order_fill(self.con, order["my_order_id"], fill_delta)
-                order_qty_filled = total_filled
-                closed_now = False
-                if order_qty_req > 0 and order_qty_filled >= order_qty_req:
-                    set_order_closed(self.con, order["my_order_id"], "FILLED")
-                    filled += 1
-                    closed_now = True
                 insert_action(
                     self.con,
                     run_id,
-                    "reconcile_orders:match",
-                    {
-                        "my_order_id": order["my_order_id"],
-                        "qty_delta": fill_delta,
-                        "snapshot_id": match.get("id"),
-                        "qty_remaining": qty_remaining,
-                        "closed": closed_now,
-                    },
+                    "reconcile_orders:missing",
+                    {"my_order_id": order["my_order_id"], "status": order.get("status")},
+                    success=0,
                 )
-                continue
-
-            insert_action(
-                self.con,
-                run_id,
-                "reconcile_orders:missing",
-                {"my_order_id": order["my_order_id"], "status": order.get("status")},
-                success=0,
-            )
 
-            if close_missing_after_minutes is None:
-                continue
+                if close_missing_after_minutes is None:
+                    continue
 
-            last_seen_dt = _parse_dt(order.get("last_seen_at"))
-            if last_seen_dt is None:
-                continue
+                last_seen_dt = _parse_dt(order.get("last_seen_at"))
+                if last_seen_dt is None:
+                    continue
 
-            if now - last_seen_dt < timedelta(minutes=float(close_missing_after_minutes)):
-                continue
+                if now - last_seen_dt < timedelta(minutes=float(close_missing_after_minutes)):
+                    continue
 
-            final_status = missing_close_status
-            if final_status is None and (order_qty_filled >= order_qty_req > 0):
-                final_status = "FILLED"
-            if final_status:
-                set_order_closed(
-                    self.con,
-                    order["my_order_id"],
-                    str(final_status),
-                    {
-                        "reason": "not_seen_recently",
-                        "last_seen_at": order.get("last_seen_at"),
-                    },
-                )
-                closed_missing += 1
+                final_status = missing_close_status
+                if final_status is None and (order_qty_filled >= order_qty_req > 0):
+                    final_status = "FILLED"
+                if final_status:
+                    set_order_closed(
+                        self.con,
+                        order["my_order_id"],
+                        str(final_status),
+                        {
+                            "reason": "not_seen_recently",
+                            "last_seen_at": order.get("last_seen_at"),
+                        },
+                    )
+                    closed_missing += 1
 
         insert_action(
             self.con,
@@ -401,26 +499,124 @@ class JobScheduler:
             {"matched": matched, "filled": filled, "closed_missing": closed_missing},
         )
 
+    # ---------- Job: signals ----------
+    def _job_signals(self, run_id: int, job: Dict[str, Any]):
+        """Recompute the ``signals`` table from ``book_latest`` (no screen needed)."""
+        cfg = load_signals_config(job.get("config") or None)
+        counts = compute_signals(self.con, cfg)
+        insert_action(self.con, run_id, "signals:summary", counts)
+
     # ---------- Execução ----------
+    def _phases(self, job: Dict[str, Any]) -> List[Tuple[str, Callable[[int, Dict[str, Any]], None], Tuple[str, ...]]]:
+        """``(fase, função, recursos)`` of a job, in execution order.
+
+        ``resources`` in the job overrides the defaults: a list for single-phase
+        jobs or a ``{fase: [...]}`` mapping.
+        """
+        kind = (job.get("kind") or "").lower()
+        if kind == "collect_watchlist":
+            phases = [("collect", self._job_collect_watchlist, UI_JOB)]
+        elif kind == "collect_category":
+            phases = [("collect", self._job_collect_category, UI_JOB)]
+        elif kind == "reconcile_orders":
+            phases = [
+                ("read", self._job_reconcile_read, UI_JOB),
+                ("match", self._job_reconcile_match, ("db",)),
+            ]
+        elif kind == "signals":
+            phases = [("compute", self._job_signals, ("db",))]
+        else:
+            def skip(run_id: int, job: Dict[str, Any]) -> None:
+                insert_action(self.con, run_id, "job:skip", {"unknown_kind": job.get("kind")})
+            phases = [("skip", skip, ("db",))]
+
+        declared = job.get("resources")
+        if isinstance(declared, dict):
+            phases = [(name, fn, tuple(declared.get(name, res))) for name, fn, res in phases]
+        elif declared and len(phases) == 1:
+            phases = [(phases[0][0], phases[0][1], tuple(declared))]
+        for _, _, res in phases:
+            unknown = set(res) - set(RESOURCE_SLOTS)
+            if unknown:
+                raise ValueError(f"recurso desconhecido em {kind!r}: {sorted(unknown)} (use {sorted(RESOURCE_SLOTS)})")
+        return phases
+
+    def _call_phase(self, fn, run_id: int, job: Dict[str, Any], own_con: bool) -> None:
+        # fases sem a tela rodam junto com a fase de UI: conexão própria
+        con = open_connection() if own_con else None
+        self._local.con = con
+        try:
+            fn(run_id, job)
+        finally:
+            self._local.con = None
+            if con is not None:
+                con.close()
+
+    async def _run_job(
+        self,
+        run_id: int,
+        job: Dict[str, Any],
+        slots: Dict[str, asyncio.Semaphore],
+        pool,
+        ui_done: asyncio.Event,
+        before: List[asyncio.Event],
+    ) -> None:
+        kind = (job.get("kind") or "").lower() or "unknown"
+        loop = asyncio.get_running_loop()
+        try:
+            phases = self._phases(job)
+            if phases and "ui" not in phases[0][2]:
+                # job só de banco lê o que os jobs de tela anteriores gravam:
+                # espera a parte de UI deles terminar
+                ui_done.set()
+                for ev in before:
+                    await ev.wait()
+            with span(f"job.{kind}"):
+                for n, (phase, fn, resources) in enumerate(phases):
+                    async with AsyncExitStack() as stack:
+                        for res in sorted(resources, key=ACQUIRE_ORDER.index):
+                            await stack.enter_async_context(slots[res])
+                        with span(f"job.{kind}.{phase}"):
+                            await loop.run_in_executor(pool, self._call_phase, fn, run_id, job, "ui" not in resources)
+                    if not any("ui" in res for _, _, res in phases[n + 1 :]):
+                        ui_done.set()
+        finally:
+            ui_done.set()
+
+    async def _run_jobs(self, run_id: int, jobs: List[Dict[str, Any]]) -> None:
+        """Start every job at once and let the declared resources decide who waits.
+
+        Jobs queue on the screen lock in file order, so UI work stays
+        sequential, while phases that only need the DB (reconciliation
+        matching, skips) overlap with the next job's navigation and OCR. A
+        job whose first phase does not use the screen (``signals``) waits for
+        the UI phases of every job listed before it, so it reads their data.
+        The first failure is re-raised after the other jobs finish.
+        """
+        if not jobs:
+            return
+        slots = {name: asyncio.Semaphore(n) for name, n in RESOURCE_SLOTS.items()}
+        ui_done = [asyncio.Event() for _ in jobs]
+        with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="job") as pool:
+            results = await asyncio.gather(
+                *(self._run_job(run_id, j, slots, pool, ui_done[i], ui_done[:i]) for i, j in enumerate(jobs)),
+                return_exceptions=True,
+            )
+        for res in results:
+            if isinstance(res, BaseException):
+                raise res
+
     def run_once(self):
         # Garanta que a janela está ativa antes de abrir o banco ou registrar runs.
         assert_window_alive()
 
+        # carrega (ou reutiliza) o engine compartilhado antes do primeiro job
+        get_engine(self.cfg_ocr)
+
         self.con = ensure_db()
-        self.con.row_factory = sqlite3.Row
         run_id = new_run(self.con, mode="jobs", notes=self.jobs_file.name)
         try:
-            jobs = self._load_jobs()
-            for j in jobs:
-                kind = (j.get("kind") or "").lower()
-                if kind == "collect_watchlist":
-                    self._job_collect_watchlist(run_id, j)
-                elif kind == "collect_category":
-                    self._job_collect_category(run_id, j)
-                elif kind == "reconcile_orders":
-                    self._job_reconcile_orders(run_id, j)
-                else:
-                    insert_action(self.con, run_id, "job:skip", {"unknown_kind": j.get("kind")})
+            asyncio.run(self._run_jobs(run_id, self._load_jobs()))
         finally:
             end_run(self.con, run_id)
 
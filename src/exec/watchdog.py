@@ -7,7 +7,7 @@ from pathlib import Path
 
 import yaml
 
-from src.capture.window import get_window_rect
+from src.capture.backends import get_backend
 
 _BASE_DIR = Path(__file__).resolve().parents[2]
 _CAPTURE_CFG = _BASE_DIR / "config" / "capture.yaml"
@@ -29,7 +29,7 @@ def wait_for_window(timeout_s: float = 5.0, poll_interval: float = 0.2) -> bool:
 
     deadline = time.time() + max(0.0, timeout_s)
     while time.time() <= deadline:
-        if get_window_rect(title_hint):
+        if get_backend().find_window(title_hint):
             return True
         time.sleep(max(0.01, poll_interval))
     return False
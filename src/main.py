@@ -1,23 +1,32 @@
 import json
+import sys
+import tempfile
 import time
 from pathlib import Path
 from typing import List
 
 import typer
 
+from src.analysis import signals as _signals
+from src.capture import session as _session
+from src.capture.backends import set_backend
 from src.capture.scroll import focus_and_scroll_one_page
 from src.exec.nav import open_item_by_search
 from src.exec.runner import ActionRunner
 from src.exec.scheduler import JobScheduler
 from src.exec.watchdog import assert_window_alive
-from src.ocr.extract import scan_once
+from src.ocr.extract import scan_once, scan_pages
+from src.storage import aggregates as _aggregates
+from src.storage import db as _db
 from src.storage.db import (
+    SnapshotWriter,
     end_run,
     ensure_db,
-    insert_action,
-    insert_snapshot,
     new_run,
 )
+from src.storage.names import resolve_item
+from src.utils.logging import setup_logging
+from src.utils.timing import enable_timing
 
 app = typer.Typer(add_completion=False)
 
@@ -48,32 +57,70 @@ def _load_watchlist(path: Path) -> List[str]:
     return items
 
 
+def _argv_without_record(argv: List[str]) -> List[str]:
+    out: List[str] = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--record":
+            skip = True
+        elif not arg.startswith("--record="):
+            out.append(arg)
+    return out
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    record: str = typer.Option(
+        "", help="gravar a sessão (frames, ações, OCR) neste diretório p/ `replay`"
+    ),
+    timing: bool = typer.Option(
+        False, help="medir tempos por estágio (log JSON + tabela metrics ao fim de cada run)"
+    ),
+):
+    """Offline Market Bot — coleta, jobs e ferramentas."""
+    if timing:
+        setup_logging()
+        enable_timing()
+    if record:
+        _session.start_recording(
+            record,
+            command=ctx.invoked_subcommand,
+            argv=_argv_without_record(sys.argv[1:]),
+        )
+        ctx.call_on_close(_session.stop_recording)
+
+
 @app.command()
 def scan(
     source_view: str = typer.Option("BUY_LIST", help="BUY_LIST ou SELL_LIST"),
-    pages: int = typer.Option(3, help="quantas páginas (scrolls) estimar"),
+    pages: int = typer.Option(3, help="máximo de páginas (para antes se a lista não rolar)"),
     out_json: str = typer.Option("", help="salvar também em JSON (opcional)"),
+    dedup: str = typer.Option(
+        "run", help="run: ignora linhas repetidas no run • changed: só grava o nível do book cujo preço/qty mudou"
+    ),
 ):
     """Nível 0: captura uma amostra da lista (12 linhas por página) e salva no SQLite."""
     con = ensure_db()
     run_id = new_run(con, mode="scan", notes=f"{source_view}")
     all_rows = []
     try:
-        for p in range(pages):
-            rows = scan_once(
+        with SnapshotWriter(con, run_id, dedup=dedup) as writer:
+            # só as linhas reveladas por cada scroll passam pelo OCR; scroll_pos
+            # é o offset exato da linha na lista
+            for rows in scan_pages(
                 source_view,
                 str(CFG_OCR),
                 str(CFG_UI),
-                page_index=p,
-                scroll_pos=p,
-            )
-            for r in rows:
-                insert_snapshot(con, run_id, r)
-            all_rows.extend(rows)
-
-            if p < pages - 1:
-                # rolar para a próxima "página" da lista (exceto após a última)
-                focus_and_scroll_one_page(str(CFG_UI))
+                max_pages=pages,
+                scroll=lambda: focus_and_scroll_one_page(str(CFG_UI)),
+            ):
+                writer.add_snapshots(rows)
+                writer.flush()  # uma transação por página
+                all_rows.extend(rows)
+        typer.echo(f"{writer.written} linhas gravadas, {writer.skipped} repetidas ignoradas")
         if out_json:
             Path(out_json).write_text(
                 json.dumps(all_rows, indent=2), encoding="utf-8"
@@ -87,6 +134,7 @@ def _scan_watchlist_legacy(
     watchlist_csv: str = "",
     pages: int = 1,
     out_json: str = "",
+    dedup: str = "run",
 ):
     """[LEGACY] Varre a watchlist digitando no campo de busca antes de capturar os preços."""
 
@@ -102,29 +150,30 @@ def _scan_watchlist_legacy(
     page_counter = 0
 
     try:
-        for item in items:
-            open_item_by_search(str(CFG_UI), item)
-            time.sleep(0.4)
-
-            scroll_pos = 0.0
-            for page in range(pages):
-                rows = scan_once(
-                    source_view,
-                    str(CFG_OCR),
-                    str(CFG_UI),
-                    page_index=page_counter,
-                    scroll_pos=scroll_pos,
-                )
-                for r in rows:
-                    insert_snapshot(con, run_id, r)
-                all_rows.extend(rows)
+        with SnapshotWriter(con, run_id, dedup=dedup) as writer:
+            for item in items:
+                open_item_by_search(str(CFG_UI), item)
+                time.sleep(0.4)
 
-                page_counter += 1
-                scroll_pos += 1
+                scroll_pos = 0.0
+                for page in range(pages):
+                    rows = scan_once(
+                        source_view,
+                        str(CFG_OCR),
+                        str(CFG_UI),
+                        page_index=page_counter,
+                        scroll_pos=scroll_pos,
+                    )
+                    writer.add_snapshots(rows)
+                    all_rows.extend(rows)
+
+                    page_counter += 1
+                    scroll_pos += 1
 
-                if page < pages - 1:
-                    focus_and_scroll_one_page(str(CFG_UI))
-                    time.sleep(0.3)
+                    if page < pages - 1:
+                        focus_and_scroll_one_page(str(CFG_UI))
+                        time.sleep(0.3)
+                writer.flush()
 
         if out_json:
             Path(out_json).write_text(
@@ -143,6 +192,9 @@ def scan_watchlist(
     views: str = typer.Option(
         "BUY_LIST,SELL_LIST", help="Quais listas abrir por item (sep. por vírgula)"
     ),
+    dedup: str = typer.Option(
+        "run", help="run: ignora linhas repetidas no run • changed: só grava o nível do book cujo preço/qty mudou"
+    ),
 ):
     """
     Para cada item na watchlist:
@@ -158,16 +210,16 @@ def scan_watchlist(
     run_id = new_run(con, mode="scan_watchlist", notes=f"watchlist:{views}")
     runner = ActionRunner(str(CFG_UI), str(CFG_ACTIONS), str(CFG_OCR))
     try:
-        with open(watchlist_csv, newline="", encoding="utf-8") as f:
+        with open(watchlist_csv, newline="", encoding="utf-8") as f, SnapshotWriter(
+            con, run_id, dedup=dedup
+        ) as writer:
             reader = csv.DictReader(f)
             for row in reader:
                 item = row["item_name"].strip()
                 assert_window_alive()
-                insert_action(con, run_id, "open_item:start", {"item": item})
+                writer.add_action("open_item:start", {"item": item})
                 ok = runner.run("open_item", {"item_name": item})
-                insert_action(
-                    con,
-                    run_id,
+                writer.add_action(
                     "open_item:end",
                     {"item": item},
                     success=1 if ok else 0,
@@ -178,13 +230,9 @@ def scan_watchlist(
                 views_list = [v.strip().upper() for v in views.split(",") if v.strip()]
                 for v in views_list:
                     if v == "BUY_LIST":
-                        insert_action(
-                            con, run_id, "open_buy_orders:start", {"item": item}
-                        )
+                        writer.add_action("open_buy_orders:start", {"item": item})
                         ok = runner.run("open_buy_orders", {"item_name": item})
-                        insert_action(
-                            con,
-                            run_id,
+                        writer.add_action(
                             "open_buy_orders:end",
                             {"item": item},
                             success=1 if ok else 0,
@@ -192,13 +240,9 @@ def scan_watchlist(
                         if not ok:
                             continue
                     elif v == "SELL_LIST":
-                        insert_action(
-                            con, run_id, "open_sell_orders:start", {"item": item}
-                        )
+                        writer.add_action("open_sell_orders:start", {"item": item})
                         ok = runner.run("open_sell_orders", {"item_name": item})
-                        insert_action(
-                            con,
-                            run_id,
+                        writer.add_action(
                             "open_sell_orders:end",
                             {"item": item},
                             success=1 if ok else 0,
@@ -216,17 +260,19 @@ def scan_watchlist(
                         scroll_pos=0.0,
                     )
                     if v == "BUY_LIST":
+                        # nome da watchlist no lugar do lido, e o id do catálogo
+                        # que corresponde a ele (como no _page_commit do scheduler)
+                        match = resolve_item(item, con)
                         for r in rows:
                             r["item_name"] = item
+                            r["canonical_item_id"] = match.item_id if match else None
 
-                    for r in rows:
-                        insert_snapshot(con, run_id, r)
-                    insert_action(
-                        con,
-                        run_id,
+                    writer.add_snapshots(rows)
+                    writer.add_action(
                         "scan_page",
                         {"item": item, "view": v, "rows": len(rows)},
                     )
+                writer.flush()  # uma transação por item
     finally:
         end_run(con, run_id)
 
@@ -258,5 +304,86 @@ def watch_jobs(file: str = "config/jobs.yaml", interval_s: float = 1.0):
     sched.watch_forever(interval_s=interval_s)
 
 
+@app.command()
+def rebuild_aggregates():
+    """Recalcula book_latest e book_ohlc_{5m,1h,1d} a partir de prices_snapshots."""
+    con = ensure_db()
+    t0 = time.perf_counter()
+    n = _aggregates.rebuild(con)
+    typer.echo(f"agregados recalculados: {n} snapshots em {time.perf_counter() - t0:.1f}s")
+
+
+def _price(v) -> str:
+    return "-" if v is None else f"{v:.2f}"
+
+
+@app.command()
+def signals(
+    kind: str = typer.Option("flip", help="flip | refine"),
+    top: int = typer.Option(20, help="quantos sinais listar"),
+    config: str = typer.Option("config/signals.yaml", help="taxas, filtros e receitas de refino"),
+):
+    """Recalcula a tabela signals a partir de book_latest e lista os melhores por score."""
+    if kind not in _signals.KINDS:
+        raise typer.BadParameter(f"kind deve ser um de {', '.join(_signals.KINDS)}")
+    con = ensure_db()
+    t0 = time.perf_counter()
+    counts = _signals.compute_signals(con, _signals.load_config(config))
+    ms = (time.perf_counter() - t0) * 1000
+    typer.echo(f"sinais: {counts['flip']} flip, {counts['refine']} refine em {ms:.1f} ms")
+    for name, refined, buy, sell, net, margin, qty, profit, score in _signals.top_signals(con, kind, top):
+        extra = f"  -> {refined}" if refined else ""
+        typer.echo(
+            f"{score:7.3f}  {name:<32} compra {_price(buy):>10}  venda {_price(sell):>10}  "
+            f"spread {net:9.2f}  margem {margin:6.1%}  qty {qty:6.0f}  lucro {profit:10.2f}{extra}"
+        )
+
+
+@app.command()
+def replay(
+    session: str = typer.Argument(..., help="diretório gravado com --record"),
+    out_json: str = typer.Option("", help="salvar as linhas do replay em JSON (opcional)"),
+):
+    """Reexecuta uma sessão gravada sobre os frames dela (sem o jogo) e compara os resultados."""
+    events = _session.load_events(session)
+    header = next((e for e in events if e.get("type") == "session"), None)
+    if not header or not header.get("argv"):
+        raise typer.BadParameter(f"sessão sem cabeçalho/argv: {session}")
+    recorded = [e for e in events if e.get("type") == "rows"]
+
+    backend = _session.SessionReplayBackend(session, events)
+    previous = set_backend(backend)
+    # o replay grava num banco temporário: a sessão não polui data/market.db
+    tmp = tempfile.TemporaryDirectory()
+    _db.close_db()
+    db_path = _db.DB_PATH
+    _db.DB_PATH = Path(tmp.name) / "replay.db"
+    collector = _session.start_recording(None, argv=header["argv"], replay_of=str(session))
+    try:
+        app(args=header["argv"], standalone_mode=False)
+    finally:
+        _session.stop_recording()
+        _db.close_db()
+        _db.DB_PATH = db_path
+        set_backend(previous)
+        tmp.cleanup()
+
+    replayed = [e for e in collector.events if e.get("type") == "rows"]
+    if out_json:
+        Path(out_json).write_text(json.dumps(replayed, indent=2), encoding="utf-8")
+
+    diffs = _session.diff_rows(recorded, replayed)
+    if backend.replayed_inputs != backend.inputs:
+        diffs.insert(
+            0,
+            f"inputs: gravado={len(backend.inputs)} replay={len(backend.replayed_inputs)}",
+        )
+    n_rows = sum(len(e.get("rows", [])) for e in replayed)
+    typer.echo(f"replay: {len(replayed)} páginas, {n_rows} linhas, {len(diffs)} diferença(s)")
+    for line in diffs:
+        typer.echo(f"  - {line}")
+    raise typer.Exit(1 if diffs else 0)
+
+
 if __name__ == "__main__":
     app()
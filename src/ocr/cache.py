@@ -0,0 +1,213 @@
+"""Content-addressed cache of OCR results, keyed by the crop's pixels."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BASE = Path(__file__).resolve().parents[2]
+
+# kinds que só aceitam o mesmo recorte: no modo dhash, 2 bits de diferença
+# bastam para trocar o preço de uma linha pelo da vizinha
+EXACT_KINDS = ("numeric",)
+
+
+def exact_key(arr: np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(arr.shape).encode())
+    h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def dhash(arr: np.ndarray, size: int = 8) -> int:
+    """64-bit difference hash of a crop (robust to tiny rendering noise)."""
+    gray = arr.mean(axis=2) if arr.ndim == 3 else arr
+    small = np.asarray(
+        Image.fromarray(gray.astype(np.uint8)).resize((size + 1, size), Image.BILINEAR),
+        dtype=np.int16,
+    )
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class OCRCache:
+    """Bounded LRU of ``(text, conf)`` per crop, with optional SQLite persistence.
+
+    ``mode="exact"`` keys on a hash of the raw pixel buffer; ``mode="dhash"``
+    accepts any cached crop of the same shape within ``max_distance`` bits,
+    except for :data:`EXACT_KINDS`, which always key on the exact pixels. Near
+    lookups go through an index of ``max_distance + 1`` bands of the hash: two
+    hashes within ``max_distance`` bits agree on at least one whole band.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 20000,
+        mode: str = "exact",
+        max_distance: int = 2,
+        persist_path: Optional[Path] = None,
+        namespace: str = "",
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.mode = mode
+        self.max_distance = int(max_distance)
+        self.persist_path = persist_path
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bands: Dict[Tuple[str, int, int], Set[str]] = {}
+        self._band_bits = -(-64 // (self.max_distance + 1))
+        self._lock = threading.Lock()
+        if persist_path is not None:
+            self._load()
+
+    @classmethod
+    def from_config(cls, cfg: Dict, namespace: str = "") -> Optional["OCRCache"]:
+        """Build the cache described by ``cfg["cache"]``; ``None`` when disabled."""
+        cache_cfg = cfg.get("cache") or {}
+        if not cache_cfg.get("enabled", False):
+            return None
+        persist = cache_cfg.get("persist_path") or None
+        if persist:
+            persist = Path(persist)
+            if not persist.is_absolute():
+                persist = BASE / persist
+        return cls(
+            max_entries=cache_cfg.get("max_entries", 20000),
+            mode=cache_cfg.get("mode", "exact"),
+            max_distance=cache_cfg.get("max_distance", 2),
+            persist_path=persist,
+            namespace=namespace,
+        )
+
+    # --- chaves ---
+    def key(self, arr: np.ndarray, kind: str) -> str:
+        if self._is_near(kind):
+            return f"{kind}|{arr.shape[0]}x{arr.shape[1]}|{dhash(arr):016x}"
+        return f"{kind}|{exact_key(arr)}"
+
+    def _is_near(self, key: str) -> bool:
+        # kind de tier ("numeric:tesseract") segue o kind da coluna
+        return self.mode == "dhash" and key.split("|", 1)[0].split(":", 1)[0] not in EXACT_KINDS
+
+    def _band_keys(self, key: str):
+        kind_shape, _, hexhash = key.rpartition("|")
+        h = int(hexhash, 16)
+        mask = (1 << self._band_bits) - 1
+        for b in range(self.max_distance + 1):
+            yield kind_shape, b, (h >> (b * self._band_bits)) & mask
+
+    def _index(self, key: str) -> None:
+        if self._is_near(key):
+            for band in self._band_keys(key):
+                self._bands.setdefault(band, set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        if self._is_near(key):
+            for band in self._band_keys(key):
+                keys = self._bands.get(band)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._bands[band]
+
+    def _near(self, key: str) -> Optional[str]:
+        """Closest cached key within ``max_distance`` bits (same kind and shape)."""
+        target = int(key.rpartition("|")[2], 16)
+        best, best_dist = None, self.max_distance + 1
+        for band in self._band_keys(key):
+            for cand in self._bands.get(band, ()):
+                dist = (int(cand.rpartition("|")[2], 16) ^ target).bit_count()
+                if dist < best_dist:
+                    best, best_dist = cand, dist
+        return best
+
+    # --- acesso ---
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            hit_key = key if key in self._data else None
+            if hit_key is None and self._is_near(key):
+                hit_key = self._near(key)
+            if hit_key is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(hit_key)
+            self.hits += 1
+            return self._data[hit_key]
+
+    def put(self, key: str, value: Tuple[str, float]) -> None:
+        with self._lock:
+            if key not in self._data:
+                self._index(key)
+            self._data[key] = (value[0], float(value[1]))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._unindex(self._data.popitem(last=False)[0])
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    # --- persistência ---
+    def _connect(self) -> sqlite3.Connection:
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.persist_path)
+        con.execute(
+            """CREATE TABLE IF NOT EXISTS ocr_cache (
+                 namespace TEXT NOT NULL,
+                 key TEXT NOT NULL,
+                 text TEXT NOT NULL,
+                 conf REAL NOT NULL,
+                 PRIMARY KEY (namespace, key)
+               )"""
+        )
+        return con
+
+    def _load(self) -> None:
+        try:
+            con = self._connect()
+        except sqlite3.Error:
+            logger.warning("cache OCR em disco indisponível: %s", self.persist_path, exc_info=True)
+            return
+        try:
+            cur = con.execute(
+                "SELECT key, text, conf FROM ocr_cache WHERE namespace=? ORDER BY rowid DESC LIMIT ?",
+                (self.namespace, self.max_entries),
+            )
+            for key, text, conf in reversed(cur.fetchall()):
+                self._data[key] = (text, float(conf))
+                self._index(key)
+        finally:
+            con.close()
+
+    def save(self) -> None:
+        """Write the current entries to ``persist_path`` (no-op without persistence)."""
+        if self.persist_path is None:
+            return
+        with self._lock:
+            rows = [(self.namespace, k, t, c) for k, (t, c) in self._data.items()]
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM ocr_cache WHERE namespace=?", (self.namespace,))
+                con.executemany(
+                    "INSERT INTO ocr_cache (namespace, key, text, conf) VALUES (?,?,?,?)", rows
+                )
+        finally:
+            con.close()
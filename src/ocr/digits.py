@@ -0,0 +1,149 @@
+"""Template-matching digit classifier for the game's fixed numeric font.
+
+Glyphs are learned once from calibrated price cells (see
+``src.tools.calibrate_digits``) and stored as small PNGs named ``0.png`` …
+``9.png``, ``dot.png`` and ``comma.png``. Reading a cell is then a column
+projection + one normalized dot product per glyph, with no OCR model involved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+GLYPH_W, GLYPH_H = 12, 18
+
+_PUNCT_FILES = {"dot": ".", "comma": ","}
+_FILE_FOR_CHAR = {v: k for k, v in _PUNCT_FILES.items()}
+
+
+def ink_mask(arr: np.ndarray) -> np.ndarray:
+    """Boolean mask of "ink" pixels: those far from the cell's background colour."""
+    gray = arr.astype(np.float32)
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+    dist = np.abs(gray - np.median(gray))
+    peak = float(dist.max()) if dist.size else 0.0
+    if peak < 25.0:
+        return np.zeros(gray.shape, dtype=bool)
+    return dist > peak * 0.45
+
+
+def segment_glyphs(mask: np.ndarray) -> List[Tuple[np.ndarray, bool]]:
+    """Split ``mask`` into glyphs by column projection.
+
+    Returns ``(glyph_mask, is_small)`` per glyph, left to right; ``is_small``
+    marks punctuation-sized glyphs (much shorter than the text line).
+    """
+    if not mask.any():
+        return []
+    rows = np.flatnonzero(mask.any(axis=1))
+    line = mask[rows[0] : rows[-1] + 1]
+    line_h = line.shape[0]
+
+    cols = line.any(axis=0).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], cols, [0]))))
+    glyphs: List[Tuple[np.ndarray, bool]] = []
+    for x0, x1 in zip(edges[0::2], edges[1::2]):
+        g = line[:, x0:x1]
+        g_rows = np.flatnonzero(g.any(axis=1))
+        g = g[g_rows[0] : g_rows[-1] + 1]
+        glyphs.append((g, g.shape[0] < 0.45 * line_h))
+    return glyphs
+
+
+def _normalize(glyph: np.ndarray) -> np.ndarray:
+    # centraliza num quadro com a proporção do template (um "1" não vira um bloco)
+    h, w = glyph.shape
+    box_w = max(w, int(round(h * GLYPH_W / GLYPH_H)))
+    canvas = np.zeros((h, box_w), dtype=bool)
+    x0 = (box_w - w) // 2
+    canvas[:, x0 : x0 + w] = glyph
+    img = Image.fromarray(canvas.astype(np.uint8) * 255).resize((GLYPH_W, GLYPH_H), Image.BILINEAR)
+    vec = np.asarray(img, dtype=np.float32).ravel()
+    vec -= vec.mean()
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class DigitTemplates:
+    """Classifier built from one template per character."""
+
+    def __init__(self, templates: Dict[str, np.ndarray]):
+        self.digits = [c for c in templates if c.isdigit()]
+        self.punct = [c for c in templates if not c.isdigit()]
+        self._digit_mat = np.stack([templates[c] for c in self.digits]) if self.digits else None
+        self._punct_mat = np.stack([templates[c] for c in self.punct]) if self.punct else None
+        h = hashlib.blake2b(digest_size=8)
+        for c in sorted(templates):
+            h.update(c.encode())
+            h.update(np.ascontiguousarray(templates[c]).tobytes())
+        # muda quando os templates são recalibrados (namespace do cache OCR)
+        self.fingerprint = h.hexdigest()
+
+    @classmethod
+    def load(cls, glyphs_dir: Path) -> Optional["DigitTemplates"]:
+        """Load templates from ``glyphs_dir``; ``None`` when no digit glyph exists yet."""
+        if not glyphs_dir.is_dir():
+            return None
+        templates: Dict[str, np.ndarray] = {}
+        for png in glyphs_dir.glob("*.png"):
+            char = _PUNCT_FILES.get(png.stem, png.stem)
+            if len(char) != 1:
+                continue
+            templates[char] = _normalize(np.asarray(Image.open(png).convert("L")) > 127)
+        if not any(c.isdigit() for c in templates):
+            return None
+        return cls(templates)
+
+    def classify(self, arr: np.ndarray, min_score: float) -> Tuple[str, float]:
+        """Read a numeric cell; returns ``("", 0.0)`` if any glyph is not confidently known."""
+        glyphs = segment_glyphs(ink_mask(arr))
+        if not glyphs or self._digit_mat is None:
+            return "", 0.0
+
+        chars: List[str] = []
+        scores: List[float] = []
+        for glyph, small in glyphs:
+            if small:
+                # pontuação: se não houver template, assume separador decimal
+                if self._punct_mat is None:
+                    chars.append(".")
+                    continue
+                sims = self._punct_mat @ _normalize(glyph)
+                chars.append(self.punct[int(sims.argmax())])
+                continue
+            sims = self._digit_mat @ _normalize(glyph)
+            best = int(sims.argmax())
+            if sims[best] < min_score:
+                return "", 0.0
+            chars.append(self.digits[best])
+            scores.append(float(sims[best]))
+        if not scores:
+            return "", 0.0
+        return "".join(chars), float(min(scores))
+
+
+def learn_glyphs(arr: np.ndarray, text: str, glyphs_dir: Path) -> List[str]:
+    """Save the glyphs of a cell whose true ``text`` is known; returns the chars saved.
+
+    Spaces in ``text`` are ignored. Nothing is written when the number of
+    segmented glyphs does not match the number of characters.
+    """
+    chars = [c for c in text if not c.isspace()]
+    glyphs = segment_glyphs(ink_mask(arr))
+    if len(glyphs) != len(chars):
+        return []
+    glyphs_dir.mkdir(parents=True, exist_ok=True)
+    saved: List[str] = []
+    for char, (glyph, _) in zip(chars, glyphs):
+        name = _FILE_FOR_CHAR.get(char, char)
+        if not (char.isdigit() or char in _FILE_FOR_CHAR):
+            continue
+        Image.fromarray(glyph.astype(np.uint8) * 255).save(glyphs_dir / f"{name}.png")
+        saved.append(char)
+    return saved
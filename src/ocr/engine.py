@@ -1,4 +1,12 @@
+import atexit
+from bisect import bisect_right
+import hashlib
+import logging
 import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
 
 import numpy as np
 from PIL import Image
@@ -11,48 +19,382 @@ except Exception:  # pragma: no cover - optional dependency
 
 import pytesseract
 
+from .cache import OCRCache
+from .digits import DigitTemplates
+from .preprocess import Preprocessor
+from ..utils.timing import span, timed
+
+logger = logging.getLogger(__name__)
+
+BASE = Path(__file__).resolve().parents[2]
+
 PRICE_RE = None
 MIN_CONF = 0.65
+# reconhecedores que um tier de escalonamento pode pedir (ocr.yaml: escalation.tiers)
+RECOGNIZERS = ("digits", "tesseract", "paddle")
 
 
-def load_ocr_config(path_ocr_yaml: str):
-    """Load OCR configuration file and set global parameters."""
+def _apply_ocr_config(cfg) -> None:
+    """Publish the postprocess/tesseract settings of ``cfg`` as module globals."""
     global PRICE_RE, MIN_CONF
-    with open(path_ocr_yaml, "r", encoding="utf-8") as fh:
-        cfg = yaml.safe_load(fh)
     PRICE_RE = re.compile(cfg["postprocess"]["price_regex"])
     MIN_CONF = float(cfg["postprocess"]["min_confidence"])
     tess_cfg = cfg.get("tesseract", {})
     if tess_cfg.get("path"):
         pytesseract.pytesseract.tesseract_cmd = tess_cfg["path"]
+
+
+def load_ocr_config(path_ocr_yaml: str):
+    """Load OCR configuration file and set global parameters."""
+    with open(path_ocr_yaml, "r", encoding="utf-8") as fh:
+        cfg = yaml.safe_load(fh)
+    _apply_ocr_config(cfg)
     return cfg
 
 
 class OCREngine:
-    def __init__(self, cfg):
+    def __init__(self, cfg, cache: OCRCache | None = None):
         self.cfg = cfg
+        self.cache = cache
         self.paddle = None
+        self.load_time_s = 0.0
         if "paddle" in cfg.get("engine_order", []) and PaddleOCR is not None:
+            paddle_cfg = cfg.get("paddle", {}) or {}
             self.paddle = PaddleOCR(
                 use_angle_cls=False,
                 use_gpu=False,
                 det=True,
                 rec=True,
                 lang="en",
+                rec_batch_num=int(paddle_cfg.get("rec_batch_num", 16)),
             )
+        num_cfg = cfg.get("numeric", {}) or {}
+        glyphs_dir = Path(num_cfg.get("glyphs_dir", "config/glyphs"))
+        if not glyphs_dir.is_absolute():
+            glyphs_dir = BASE / glyphs_dir
+        self.digits = DigitTemplates.load(glyphs_dir)
+        self.preprocess = Preprocessor.from_config(cfg)
+        self.tiers = self._load_tiers(cfg.get("escalation") or {})
+
+    def _load_tiers(self, esc_cfg) -> List[Tuple[str, Preprocessor | None]]:
+        """``(recognizer, preprocessor)`` per escalation tier, cheapest first."""
+        tiers: List[Tuple[str, Preprocessor | None]] = []
+        if not esc_cfg.get("enabled", True):
+            return tiers
+        for tier in esc_cfg.get("tiers") or []:
+            name = tier.get("engine", "tesseract")
+            if name not in RECOGNIZERS:
+                raise ValueError(f"engine de escalonamento desconhecido: {name!r} (use {RECOGNIZERS})")
+            if name == "paddle" and self.paddle is None:
+                continue
+            over = tier.get("preprocess")
+            if not over:
+                pre = self.preprocess
+            elif self.preprocess is not None:
+                pre = self.preprocess.with_overrides(over)
+            else:
+                pre = Preprocessor(over)
+            tiers.append((name, pre))
+        return tiers
+
+    def warm_up(self) -> None:
+        """Run one inference on a blank strip so the first real call is not slowed down."""
+        blank = Image.new("RGB", (96, 24), (255, 255, 255))
+        try:
+            self._text_and_conf(blank)
+        except Exception:
+            logger.debug("warm-up do OCR falhou", exc_info=True)
 
+    @timed("ocr.text_and_conf")
     def text_and_conf(self, img: Image.Image) -> tuple[str, float]:
+        if self.cache is None:
+            return self._text_and_conf(img)
+        key = self.cache.key(_as_rgb(img), "full")
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        res = self._text_and_conf(img)
+        self.cache.put(key, res)
+        return res
+
+    def _text_and_conf(self, img: Image.Image) -> tuple[str, float]:
         # 1) Paddle
+        best = ("", 0.0)
         if self.paddle:
             res = self.paddle.ocr(np.array(img), cls=False)
             if res and res[0]:
                 # pega a linha com melhor confiança média
-                best = max(res[0], key=lambda r: float(r[1][1]))
-                return best[1][0], float(best[1][1])
-        # 2) Tesseract fallback
+                line = max(res[0], key=lambda r: float(r[1][1]))
+                best = (line[1][0], float(line[1][1]))
+                if best[1] >= MIN_CONF:
+                    return best
+        # 2) Tesseract, com a confiança média das palavras
+        res = self._tesseract_strip([_as_rgb(img)])[0]
+        return res if res[1] > best[1] else best
+
+    def recognize_batch(
+        self, crops: Sequence, kind: str = "text", engine: str | None = None
+    ) -> List[tuple[str, float]]:
+        """Recognize many cells at once, returning ``(text, conf)`` per crop in input order.
+
+        The cells already have known geometry, so Paddle runs recognition only
+        (no detection stage) over the whole list in batched inference. Cells that
+        Paddle leaves empty go to Tesseract in a single call over a stitched strip.
+        ``kind="numeric"`` skips Paddle and uses :meth:`_recognize_numeric`.
+        ``engine`` (one of :data:`RECOGNIZERS`) runs a single recognizer
+        instead, as the escalation tiers do. Crops already seen (same pixels)
+        are answered from the cache; the base pass also caches each reading
+        under the recognizer that made it, so a tier repeating that recognizer
+        on the same pixels does not run it again.
+        """
+        arrays = [_as_rgb(c) for c in crops]
+        out: List[tuple[str, float]] = [("", 0.0)] * len(arrays)
+        pending = [i for i, a in enumerate(arrays) if a.size]
+        keys: Dict[int, str] = {}
+        cache_kind = kind if engine is None else f"{kind}:{engine}"
+        if self.cache is not None:
+            missing = []
+            for i in pending:
+                keys[i] = self.cache.key(arrays[i], cache_kind)
+                hit = self.cache.get(keys[i])
+                if hit is None:
+                    missing.append(i)
+                else:
+                    out[i] = hit
+            pending = missing
+        if not pending:
+            return out
+
+        via: List[str] = []
+        with span(f"ocr.batch.{cache_kind}"):
+            if engine is None:
+                results = self._recognize([arrays[i] for i in pending], kind, via)
+            else:
+                results = self._recognize_with([arrays[i] for i in pending], kind, engine)
+        for n, (i, res) in enumerate(zip(pending, results)):
+            out[i] = res
+            if self.cache is not None:
+                self.cache.put(keys[i], res)
+                if via:
+                    # a leitura da passada base também responde pelo tier do mesmo
+                    # reconhecedor: tier sem preprocess próprio não relê a célula
+                    self.cache.put(self.cache.key(arrays[i], f"{kind}:{via[n]}"), res)
+        return out
+
+    def _recognize(self, arrays: List[np.ndarray], kind: str, via: List[str]) -> List[tuple[str, float]]:
+        """Base pass over ``arrays``; ``via`` gets the recognizer that read each crop."""
+        if kind == "numeric":
+            return self._recognize_numeric(arrays, via)
+
+        out: List[tuple[str, float]] = [("", 0.0)] * len(arrays)
+        via[:] = ["tesseract"] * len(arrays)
+        pending = list(range(len(arrays)))
+        if self.paddle:
+            rec_res, _ = self.paddle.text_recognizer([arrays[i] for i in pending])
+            missing = []
+            for i, (txt, score) in zip(pending, rec_res):
+                if txt:
+                    out[i] = (txt, float(score))
+                    via[i] = "paddle"
+                else:
+                    missing.append(i)
+            pending = missing
+            if not pending:
+                return out
+
+        results = self._tesseract_strip([arrays[i] for i in pending])
+        for i, res in zip(pending, results):
+            out[i] = res
+        return out
+
+    def _recognize_with(self, arrays: List[np.ndarray], kind: str, engine: str) -> List[tuple[str, float]]:
+        """Run only ``engine`` over ``arrays`` (empty results where it has nothing)."""
+        if engine == "paddle":
+            if not self.paddle:
+                return [("", 0.0)] * len(arrays)
+            rec_res, _ = self.paddle.text_recognizer(arrays)
+            return [(txt, float(score)) if txt else ("", 0.0) for txt, score in rec_res]
+        if engine == "digits":
+            if self.digits is None:
+                return [("", 0.0)] * len(arrays)
+            min_score = float((self.cfg.get("numeric", {}) or {}).get("min_score", 0.80))
+            return [self.digits.classify(a, min_score) for a in arrays]
+        if kind == "numeric":
+            num_cfg = self.cfg.get("numeric", {}) or {}
+            return self._tesseract_strip(
+                arrays, gap=40, horizontal=True, psm=7, whitelist=num_cfg.get("whitelist", "0123456789.,")
+            )
+        return self._tesseract_strip(arrays)
+
+    def _recognize_numeric(self, arrays: List[np.ndarray], via: List[str]) -> List[tuple[str, float]]:
+        """Digits-only path for price/qty cells.
+
+        Glyph templates (when calibrated) decide most cells; the rest go to one
+        Tesseract call with a digit whitelist and ``psm 7`` over a horizontal strip.
+        """
+        num_cfg = self.cfg.get("numeric", {}) or {}
+        out: List[tuple[str, float]] = [("", 0.0)] * len(arrays)
+        via[:] = ["tesseract"] * len(arrays)
+        pending = list(range(len(arrays)))
+        if self.digits is not None:
+            min_score = float(num_cfg.get("min_score", 0.80))
+            missing = []
+            for i in pending:
+                txt, score = self.digits.classify(arrays[i], min_score)
+                if txt:
+                    out[i] = (txt, score)
+                    via[i] = "digits"
+                else:
+                    missing.append(i)
+            pending = missing
+        if pending:
+            results = self._tesseract_strip(
+                [arrays[i] for i in pending],
+                gap=40,
+                horizontal=True,
+                psm=7,
+                whitelist=num_cfg.get("whitelist", "0123456789.,"),
+            )
+            for i, res in zip(pending, results):
+                out[i] = res
+        return out
+
+    def _tesseract_strip(
+        self,
+        arrays: List[np.ndarray],
+        gap: int = 12,
+        *,
+        horizontal: bool = False,
+        psm: int | None = None,
+        whitelist: str | None = None,
+    ) -> List[tuple[str, float]]:
+        """Stitch crops into one strip and run a single ``image_to_data`` call over it.
+
+        Crops are stacked vertically by default; ``horizontal=True`` lays them out
+        side by side on one text line (for ``psm 7``).
+        """
+        if horizontal:
+            height = max(a.shape[0] for a in arrays) + 2 * gap
+            width = sum(a.shape[1] + gap for a in arrays) + gap
+        else:
+            width = max(a.shape[1] for a in arrays)
+            height = sum(a.shape[0] + gap for a in arrays) + gap
+        strip = np.full((height, width, 3), 255, dtype=np.uint8)
+        starts: List[int] = []
+        pos = gap
+        for a in arrays:
+            h, w = a.shape[:2]
+            # fundo de cada faixa com a cor mediana do próprio recorte
+            bg = np.median(a.reshape(-1, 3), axis=0)
+            starts.append(pos - gap // 2)
+            if horizontal:
+                strip[:, pos - gap // 2 : pos + w + gap // 2] = bg
+                strip[gap : gap + h, pos : pos + w] = a
+                pos += w + gap
+            else:
+                strip[pos - gap // 2 : pos + h + gap // 2, :] = bg
+                strip[pos : pos + h, :w] = a
+                pos += h + gap
+
         cfg_t = self.cfg.get("tesseract", {})
-        psm = cfg_t.get("psm", 6)
-        whitelist = cfg_t.get("whitelist")
+        psm = psm if psm is not None else cfg_t.get("psm", 6)
+        whitelist = whitelist if whitelist is not None else cfg_t.get("whitelist")
         extra = f' -c tessedit_char_whitelist="{whitelist}"' if whitelist else ""
-        txt = pytesseract.image_to_string(img, config=f"--psm {psm}{extra}")
-        return txt.strip(), 0.60
+        data = pytesseract.image_to_data(
+            Image.fromarray(strip),
+            config=f"--psm {psm}{extra}",
+            output_type=pytesseract.Output.DICT,
+        )
+
+        words: List[List[str]] = [[] for _ in arrays]
+        confs: List[List[float]] = [[] for _ in arrays]
+        for txt, conf, left, top, w, h in zip(
+            data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+        ):
+            txt = (txt or "").strip()
+            if not txt or float(conf) < 0:
+                continue
+            center = left + w // 2 if horizontal else top + h // 2
+            idx = bisect_right(starts, center) - 1
+            if 0 <= idx < len(arrays):
+                words[idx].append(txt)
+                confs[idx].append(float(conf) / 100.0)
+        return [
+            (" ".join(w), float(sum(c) / len(c)) if c else 0.0)
+            for w, c in zip(words, confs)
+        ]
+
+
+def _as_rgb(img) -> np.ndarray:
+    """Normalize a PIL image or array (gray/RGB/RGBA) into an ``(h, w, 3)`` uint8 array."""
+    arr = np.asarray(img)
+    if arr.ndim == 2:
+        arr = np.stack([arr] * 3, axis=-1)
+    elif arr.shape[-1] == 4:
+        arr = arr[..., :3]
+    return np.ascontiguousarray(arr, dtype=np.uint8)
+
+
+# ---------- Registro de engines (um por conteúdo de ocr.yaml) ----------
+_ENGINES: Dict[str, OCREngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def _config_digest(path_ocr_yaml: str) -> str:
+    return hashlib.sha1(Path(path_ocr_yaml).read_bytes()).hexdigest()
+
+
+def _cache_namespace(digest: str, engine: OCREngine) -> str:
+    # o digest do ocr.yaml já cobre a seção numeric; os templates de dígitos
+    # ficam fora dele e entram à parte
+    glyphs = engine.digits.fingerprint if engine.digits is not None else "-"
+    return f"{digest}:{glyphs}"
+
+
+def get_engine(path_ocr_yaml: str) -> OCREngine:
+    """Return the shared, warmed-up engine for the given ``ocr.yaml``.
+
+    Engines are keyed by the file's content hash, so editing the YAML yields a
+    fresh engine while repeated calls with the same config reuse the loaded
+    models. The persisted OCR cache is namespaced by that hash plus the digit
+    templates' fingerprint, so neither a config edit nor a recalibration
+    serves readings made under the old setup.
+    """
+    digest = _config_digest(path_ocr_yaml)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(digest)
+        if engine is None:
+            t0 = time.perf_counter()
+            cfg = load_ocr_config(path_ocr_yaml)
+            engine = OCREngine(cfg)
+            cache = engine.cache = OCRCache.from_config(cfg, namespace=_cache_namespace(digest, engine))
+            if cache is not None and cache.persist_path is not None:
+                atexit.register(cache.save)
+            engine.warm_up()
+            engine.load_time_s = time.perf_counter() - t0
+            logger.info(
+                "OCREngine carregado em %.2fs (config=%s, sha1=%s)",
+                engine.load_time_s,
+                path_ocr_yaml,
+                digest[:10],
+            )
+            _ENGINES[digest] = engine
+        else:
+            _apply_ocr_config(engine.cfg)
+    return engine
+
+
+def clear_engines() -> None:
+    """Drop every cached engine (the next ``get_engine`` reloads the models)."""
+    with _ENGINES_LOCK:
+        _ENGINES.clear()
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters of each loaded engine's OCR cache, keyed by config hash."""
+    with _ENGINES_LOCK:
+        return {
+            digest[:10]: engine.cache.stats()
+            for digest, engine in _ENGINES.items()
+            if engine.cache is not None
+        }
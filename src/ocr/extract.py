@@ -1,25 +1,29 @@
+from collections import defaultdict
 from datetime import datetime
 from functools import lru_cache
 import hashlib
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import yaml
 
-from ..capture.window import (
-    capture_rect,
-    capture_rect_in_window,
-    get_screen_resolution,
-    get_window_rect,
-)
+from ..capture.backends import get_backend
 from ..capture.calibrate import relative_rect
-from .engine import MIN_CONF, PRICE_RE, OCREngine, load_ocr_config
+from ..capture.session import record
+from ..capture.stitch import ScrollTracker
+from ..storage.names import catalog_index, resolve_item
+from ..utils.timing import span, timed
+from . import engine as _ocr
+from .engine import get_engine
 
 
+@timed("parse.price")
 def parse_price(text: str):
-    if PRICE_RE is None:
+    # lê o regex do módulo (é publicado quando o engine é carregado)
+    if _ocr.PRICE_RE is None:
         return None
-    m = PRICE_RE.search(text.replace(" ", ""))
+    m = _ocr.PRICE_RE.search(text.replace(" ", ""))
     if not m:
         return None
     raw = m.group(1).replace(".", "").replace(",", ".")
@@ -29,6 +33,11 @@ def parse_price(text: str):
         return None
 
 
+def parse_qty(text: str):
+    digits = "".join(ch for ch in text if ch.isdigit())
+    return int(digits) if digits else None
+
+
 def _load_ui_cfg(ui_cfg_path: str) -> Dict:
     path = Path(ui_cfg_path)
     mtime = path.stat().st_mtime_ns
@@ -55,159 +64,495 @@ def _load_capture_cfg_cached(capture_cfg_path: str, _mtime_ns: int) -> Dict:
         return yaml.safe_load(fh) or {}
 
 
-def scan_once(
-    source_view: str,
-    ocr_cfg_path: str,
-    ui_cfg_path: str,
-    page_index: int = 0,
-    scroll_pos: float = 0.0,
-) -> List[Dict]:
-    ui = _load_ui_cfg(ui_cfg_path)
-    prof = next(iter(ui["profiles"].values()))
-
-    anchors = prof.get("anchors", {})
-    if (
-        source_view == "BUY_LIST"
-        and isinstance(anchors, dict)
-        and "buy_panel_zone" in anchors
-    ):
-        ax = anchors["buy_panel_zone"]
-        cols = prof.get("buy_panel_columns", {}) or {}
-        rows_per_page = int(prof.get("buy_panel_rows", 8))
+def _capture_target(cap_cfg: Dict) -> Tuple[Optional[Dict], Tuple[int, int]]:
+    """Return the target window (if any) and the base size used by ``relative_rect``."""
+    backend = get_backend()
+    title_contains = (cap_cfg.get("window_title_contains") or "").strip()
+    window_info = backend.find_window(title_contains) if title_contains else None
+    if window_info:
+        return window_info, (window_info["w"], window_info["h"])
+    return None, backend.screen_size()
+
+
+@timed("capture.frame")
+def grab_page_frame(
+    window_info: Optional[Dict],
+    base_size: Tuple[int, int],
+    zone_rect: Tuple[int, int, int, int],
+    scope: str = "zone",
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Grab the page once and return ``(frame, origin)``.
+
+    ``scope="zone"`` grabs only ``zone_rect``; ``scope="window"`` grabs the whole
+    window/screen. ``origin`` is the frame's top-left corner in base coordinates,
+    which :func:`slice_cell` uses to turn ``relative_rect`` boxes into slices.
+    """
+    if scope == "window":
+        x, y, w, h = 0, 0, base_size[0], base_size[1]
+    else:
+        x, y, w, h = zone_rect
+    backend = get_backend()
+    if window_info:
+        frame = backend.grab(window_info["x"] + x, window_info["y"] + y, w, h)
     else:
-        ax = anchors["list_zone"]
-        cols = prof["columns"]
-        rows_per_page = int(prof.get("rows", 12))
+        frame = backend.grab(x, y, w, h)
+    return frame, (x, y)
 
-    capture_cfg_path = Path(__file__).resolve().parents[2] / "config" / "capture.yaml"
-    cap_cfg = _load_capture_cfg(str(capture_cfg_path))
 
-    title_contains = (cap_cfg.get("window_title_contains") or "").strip()
-    window_info = get_window_rect(title_contains) if title_contains else None
+def slice_cell(
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    rect: Tuple[int, int, int, int],
+    scale: float = 1.0,
+) -> np.ndarray:
+    """Zero-copy view of ``rect`` (base coordinates) inside ``frame``.
 
-    if window_info:
-        base_size = (window_info["w"], window_info["h"])
+    ``scale`` maps base coordinates onto a resized frame (see
+    :meth:`~src.ocr.preprocess.Preprocessor.apply`).
+    """
+    ox, oy = origin
+    x, y, w, h = rect
+    if scale == 1.0:
+        return frame[y - oy : y - oy + h, x - ox : x - ox + w]
+    x0, y0 = round((x - ox) * scale), round((y - oy) * scale)
+    x1, y1 = round((x - ox + w) * scale), round((y - oy + h) * scale)
+    return frame[y0:y1, x0:x1]
+
+
+def cell_views(
+    engine,
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    rects: List[Tuple[int, int, int, int]],
+    kind: str,
+    prepared: Optional[Dict] = None,
+    pre=None,
+) -> List[np.ndarray]:
+    """Crops of ``rects`` as views of the engine's preprocessed frame.
+
+    Only the bounding box of ``rects`` is preprocessed, once per distinct
+    setting; pass the same ``prepared`` dict across kinds of one page to share
+    it. ``pre`` replaces the engine's preprocessor (escalation variants).
+    Without a ``preprocess`` section the crops are raw frame views.
+    """
+    if pre is None:
+        pre = getattr(engine, "preprocess", None)
+    if pre is None or not rects:
+        return [slice_cell(frame, origin, r) for r in rects]
+    prepared = {} if prepared is None else prepared
+    key = pre.key(kind)
+    if key not in prepared:
+        x0 = min(r[0] for r in rects)
+        y0 = min(r[1] for r in rects)
+        x1 = max(r[0] + r[2] for r in rects)
+        y1 = max(r[1] + r[3] for r in rects)
+        line_h = int(np.median([r[3] for r in rects]))
+        with span("ocr.preprocess"):
+            img, scale = pre.apply(slice_cell(frame, origin, (x0, y0, x1 - x0, y1 - y0)), line_h, kind)
+        prepared[key] = (img, (x0, y0), scale)
+    img, box_origin, scale = prepared[key]
+    return [slice_cell(img, box_origin, r, scale) for r in rects]
+
+
+def _column_rect(
+    lx: int, lw: int, col: Dict, y0: int, line_h: int
+) -> Tuple[int, int, int, int]:
+    return (lx + int(col["x"] * lw), y0, max(1, int(col["w"] * lw)), line_h)
+
+
+def _read_cells(
+    engine,
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    cells: Dict[tuple, Tuple[int, int, int, int]],
+    cols: Dict[str, Dict],
+) -> Dict[tuple, tuple[str, float]]:
+    """OCR every ``(row, column)`` cell of a page, one batch per column ``kind``.
+
+    Columns declare ``kind: numeric`` in ui_profiles.yaml to use the digits-only
+    recognizer; everything else goes through the general text path. Cells that
+    stay below their column's ``min_conf`` (or a price that does not parse)
+    are re-read by the engine's escalation tiers, cheapest first, keeping the
+    best reading of each cell.
+    """
+    out: Dict[tuple, tuple[str, float]] = {}
+    prepared: Dict = {}
+    for kind, keys in _by_kind(cells, cols).items():
+        crops = cell_views(engine, frame, origin, [cells[k] for k in keys], kind, prepared)
+        results = engine.recognize_batch(crops, kind=kind)
+        out.update(zip(keys, results))
+        record("ocr", kind=kind, cells=[[k[0], k[1], t, c] for k, (t, c) in zip(keys, results)])
+
+    retry = [k for k in cells if _needs_retry(k[1], cols[k[1]], out[k])]
+    for name, pre in getattr(engine, "tiers", ()):
+        if not retry:
+            break
+        with span(f"ocr.escalate.{name}"):
+            for kind, keys in _by_kind(retry, cols).items():
+                crops = cell_views(engine, frame, origin, [cells[k] for k in keys], kind, prepared, pre)
+                results = engine.recognize_batch(crops, kind=kind, engine=name)
+                record("ocr", kind=kind, tier=name, cells=[[k[0], k[1], t, c] for k, (t, c) in zip(keys, results)])
+                for k, res in zip(keys, results):
+                    if _reading_score(k[1], res) > _reading_score(k[1], out[k]):
+                        out[k] = res
+        retry = [k for k in retry if _needs_retry(k[1], cols[k[1]], out[k])]
+    return out
 
-        def cap_fn(x: int, y: int, w: int, h: int):
-            return capture_rect_in_window(window_info["x"], window_info["y"], x, y, w, h)
 
+def _by_kind(keys, cols: Dict[str, Dict]) -> Dict[str, List[tuple]]:
+    by_kind: Dict[str, List[tuple]] = defaultdict(list)
+    for key in keys:
+        by_kind[cols[key[1]].get("kind", "text")].append(key)
+    return by_kind
+
+
+# colunas com o nome do item: resolvidas contra o catálogo (src/storage/names.py)
+NAME_COLUMNS = ("name", "item_name")
+
+
+def _min_conf(col: Dict) -> float:
+    """Confidence a cell of ``col`` needs (``min_conf`` in ui_profiles.yaml, else ocr.yaml's)."""
+    return float(col.get("min_conf", _ocr.MIN_CONF))
+
+
+def _reading_score(colname: str, res: tuple[str, float]) -> tuple[bool, float]:
+    # uma leitura que vira preço/item do catálogo/texto vence qualquer confiança
+    # de uma que não vira
+    txt, conf = res
+    if colname == "price":
+        usable = parse_price(txt) is not None
+    elif colname in NAME_COLUMNS and len(catalog_index()):
+        usable = resolve_item(txt) is not None
     else:
-        base_size = get_screen_resolution()
+        usable = bool(txt.strip())
+    return usable, conf
 
-        def cap_fn(x: int, y: int, w: int, h: int):
-            return capture_rect(x, y, w, h)
 
-    lx, ly, lw, lh = relative_rect(ax, base_size)
+def _needs_retry(colname: str, col: Dict, res: tuple[str, float]) -> bool:
+    # nome que o catálogo resolve sem ambiguidade dispensa a releitura
+    if colname in NAME_COLUMNS and resolve_item(res[0]) is not None:
+        return False
+    usable, conf = _reading_score(colname, res)
+    return not usable or conf < _min_conf(col)
 
-    engine = OCREngine(load_ocr_config(ocr_cfg_path))
 
-    rows: List[Dict] = []
-    line_h = int(lh / rows_per_page)
-    for i in range(rows_per_page):
-        y0 = ly + i * line_h
-        price_rect = (
-            lx + int(cols["price"]["x"] * lw),
-            y0,
-            int(cols["price"]["w"] * lw),
-            line_h,
+def _resolve_name(txt: str, conf: float, col: Optional[Dict]) -> tuple[str, float, Optional[int]]:
+    """``(name, conf, item_id)`` of a name cell; a catalog hit uses the catalog's
+    spelling and counts as confident enough for its column."""
+    name = " ".join(txt.split()) if txt else ""
+    match = resolve_item(name)
+    if match is None:
+        return name, conf, None
+    return match.name, max(conf, _min_conf(col or {})), match.item_id
+
+
+Band = Tuple[int, int, int]  # (linha na página, y relativo à zona, altura)
+INK_MIN_LEVEL = 25.0  # diferença mínima do fundo (0-255) para contar como tinta
+
+
+def detect_row_bands(zone_img: np.ndarray, line_h: int) -> List[Band]:
+    """Rows of a list zone from its horizontal ink projection profile.
+
+    Pixel rows with ink (text/icons far from the background colour) form one
+    run per table row; thin full-width runs (separator lines) are ignored, runs
+    split by small gaps are merged and over-tall runs are split at the
+    measured row pitch. Each band is one pitch tall, centred on its run, and
+    empty rows produce no band at all. ``line_h`` (zone height / rows) is only
+    a hint for the pitch.
+    """
+    # 1 coluna a cada 4 basta para o perfil vertical (texto tem vários px de largura)
+    sub = zone_img[:, ::4]
+    gray = sub.mean(axis=2) if sub.ndim == 3 else sub.astype(np.float32)
+    dist = np.abs(gray - np.median(gray))
+    # limiar mais baixo que o de uma célula (digits.ink_mask): a zona mistura
+    # texto claro (nomes) e escuro (qty) e nenhum deve sumir do perfil
+    mask = dist > max(INK_MIN_LEVEL, 0.2 * float(dist.max()))
+    if not mask.any():
+        return []
+    frac = mask.mean(axis=1)
+    on = (frac * mask.shape[1] >= 2).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], on, [0]))))
+
+    thin = max(2, int(0.1 * line_h))
+    runs: List[List[int]] = []
+    for a, b in zip(edges[0::2], edges[1::2]):
+        # separador: fino e na largura toda (uma linha selecionada é alta)
+        if b - a <= thin and frac[a:b].min() > 0.9:
+            continue
+        if runs and a - runs[-1][1] < 0.1 * line_h:
+            runs[-1][1] = b
+        else:
+            runs.append([int(a), int(b)])
+    runs = [r for r in runs if r[1] - r[0] >= 3]
+    if not runs:
+        return []
+
+    centers = [(a + b) / 2 for a, b in runs]
+    pitch = float(np.median(np.diff(centers))) if len(centers) >= 2 else float(line_h)
+    if not 0.6 * line_h <= pitch <= 1.4 * line_h:
+        pitch = float(line_h)
+
+    split: List[float] = []
+    for (a, b), c in zip(runs, centers):
+        n = max(1, int(round((b - a) / pitch))) if b - a > 1.5 * pitch else 1
+        if n == 1:
+            split.append(c)
+        else:
+            split.extend(a + (k + 0.5) * (b - a) / n for k in range(n))
+
+    height = zone_img.shape[0]
+    h = max(1, int(round(pitch)))
+    bands: List[Band] = []
+    for c in split:
+        y0 = min(max(0, int(round(c - pitch / 2))), max(0, height - h))
+        # índice da linha na página: único e crescente (chave das células)
+        i = max(int(c // pitch), bands[-1][0] + 1 if bands else 0)
+        bands.append((i, y0, h))
+    return bands
+
+
+def _page_bands(
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    zone: Tuple[int, int, int, int],
+    rows_per_page: int,
+    mode: str = "profile",
+) -> List[Band]:
+    """Row bands of one page: detected from pixels or the fixed ``lh / rows`` grid."""
+    line_h = max(1, int(zone[3] / rows_per_page))
+    fixed = [(i, i * line_h, line_h) for i in range(rows_per_page)]
+    if mode == "fixed":
+        return fixed
+    with span("rows.segment"):
+        bands = detect_row_bands(slice_cell(frame, origin, zone), line_h)
+    # detecção implausível (ruído, UI sobreposta): volta à grade fixa
+    if len(bands) > rows_per_page + 1:
+        return fixed
+    return bands
+
+
+def _book_layout(prof: Dict, source_view: str) -> Tuple[Dict, Dict, int]:
+    """Zone anchor, columns and rows per page (a hint for row detection) of the book."""
+    anchors = prof.get("anchors", {})
+    if (
+        source_view == "BUY_LIST"
+        and isinstance(anchors, dict)
+        and "buy_panel_zone" in anchors
+    ):
+        return (
+            anchors["buy_panel_zone"],
+            prof.get("buy_panel_columns", {}) or {},
+            int(prof.get("buy_panel_rows", 8)),
         )
-        price_txt, conf_price = engine.text_and_conf(cap_fn(*price_rect))
-        price_val = parse_price(price_txt)
+    return anchors["list_zone"], prof["columns"], int(prof.get("rows", 12))
 
-        name_txt, conf_name = "", 1.0
-        qty_txt, conf_qty = "", 1.0
-
-        if "name" in cols:
-            name_rect = (
-                lx + int(cols["name"]["x"] * lw),
-                y0,
-                int(cols["name"]["w"] * lw),
-                line_h,
-            )
-            name_txt, conf_name = engine.text_and_conf(cap_fn(*name_rect))
-
-        if "qty" in cols:
-            qty_rect = (
-                lx + int(cols["qty"]["x"] * lw),
-                y0,
-                int(cols["qty"]["w"] * lw),
-                line_h,
-            )
-            qty_txt, conf_qty = engine.text_and_conf(cap_fn(*qty_rect))
+
+def _grab_zone(anchor: Dict):
+    """One frame of the zone: ``(frame, origin, zone_rect)`` in base coordinates."""
+    capture_cfg_path = Path(__file__).resolve().parents[2] / "config" / "capture.yaml"
+    cap_cfg = _load_capture_cfg(str(capture_cfg_path))
+    window_info, base_size = _capture_target(cap_cfg)
+    zone = relative_rect(anchor, base_size)
+    frame, origin = grab_page_frame(window_info, base_size, zone, cap_cfg.get("frame_scope", "zone"))
+    return frame, origin, zone
+
+
+def _book_rows(
+    engine,
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    zone: Tuple[int, int, int, int],
+    cols: Dict[str, Dict],
+    bands: List[Band],
+    source_view: str,
+    page_index: int,
+    scroll_pos: Callable[[int], float],
+) -> List[Dict]:
+    lx, ly, lw, lh = zone
+    cells = {
+        (i, name): _column_rect(lx, lw, cols[name], ly + y, h)
+        for i, y, h in bands
+        for name in ("price", "name", "qty")
+        if name in cols
+    }
+    reads = _read_cells(engine, frame, origin, cells, cols)
+
+    rows: List[Dict] = []
+    for i, _, _ in bands:
+        price_txt, conf_price = reads[(i, "price")]
+        price_val = parse_price(price_txt)
+        item_name, conf_name, item_id = _resolve_name(*reads.get((i, "name"), ("", 1.0)), cols.get("name"))
+        qty_txt, conf_qty = reads.get((i, "qty"), ("", 1.0))
 
         conf = float(min(conf_price, conf_name, conf_qty))
-        if price_val is None or conf < MIN_CONF:
+        if price_val is None or any(
+            c < _min_conf(cols[n]) for n, c in (("price", conf_price), ("name", conf_name), ("qty", conf_qty)) if n in cols
+        ):
             continue
 
-        item_name = " ".join(name_txt.split()) if name_txt else ""
-        h = hashlib.sha1(
-            f"{item_name}|{price_val}|{i}|{page_index}".encode()
-        ).hexdigest()
+        qty_val = parse_qty(qty_txt)
+        pos = scroll_pos(i)
+        # conteúdo + offset da linha na lista: duas ordens iguais (mesmo preço e
+        # qty) são linhas distintas; a mesma linha relida no run (re-scan do
+        # item) repete o hash e é descartada na gravação. Linhas sobrepostas
+        # entre páginas já nem chegam aqui (ScrollTracker)
+        h = hashlib.sha1(f"{item_name}|{price_val}|{qty_val}|{pos:g}".encode()).hexdigest()
         rows.append(
             {
                 "timestamp": datetime.utcnow().isoformat(),
                 "source_view": source_view,
                 "item_name": item_name,
                 "price": price_val,
-                "qty_visible": None,
+                "qty_visible": qty_val,
                 "page_index": page_index,
-                "scroll_pos": scroll_pos,
+                "scroll_pos": pos,
                 "confidence": conf,
                 "hash_row": h,
+                "canonical_item_id": item_id,
             }
         )
     return rows
 
 
-def scan_my_orders(ocr_cfg_path: str, ui_cfg_path: str,
-                   page_index: int = 0, scroll_pos: float = 0.0) -> List[Dict]:
-    """
-    Lê a tabela da aba 'MY ORDERS' usando anchors 'my_orders_zone' e
-    'my_orders_columns' em ui_profiles.yaml.
-    Espera colunas: price, qty (ou qty_remaining), (opcional) side, item_name.
+def capture_book_page(
+    source_view: str,
+    ui_cfg_path: str,
+    page_index: int = 0,
+    scroll_pos: float = 0.0,
+) -> Dict:
+    """Capture half of :func:`scan_once`: grab the page and segment its rows.
+
+    Returns a plain picklable dict (only the zone's pixels), so the OCR half,
+    :func:`read_book_page`, can run in another process.
     """
     ui = _load_ui_cfg(ui_cfg_path)
     prof = next(iter(ui["profiles"].values()))
-    anchors = prof["anchors"]
-    cols = prof.get("my_orders_columns", {}) or {}
+    ax, cols, rows_per_page = _book_layout(prof, source_view)
+    # um único frame por página: todas as células vêm do mesmo instante
+    frame, origin, zone = _grab_zone(ax)
+    bands = _page_bands(frame, origin, zone, rows_per_page, prof.get("row_segmentation", "profile"))
+    return {
+        "source_view": source_view,
+        "frame": np.ascontiguousarray(slice_cell(frame, origin, zone)),
+        "zone": zone,
+        "cols": cols,
+        "bands": bands,
+        "page_index": page_index,
+        "scroll_pos": scroll_pos,
+    }
+
+
+def read_book_page(page: Dict, ocr_cfg_path: str) -> List[Dict]:
+    """OCR half of :func:`scan_once` over a :func:`capture_book_page` result."""
+    zone = page["zone"]
+    return _book_rows(
+        get_engine(ocr_cfg_path),
+        page["frame"],
+        (zone[0], zone[1]),
+        zone,
+        page["cols"],
+        page["bands"],
+        page["source_view"],
+        page["page_index"],
+        # página capturada sozinha: offset da linha a partir do scroll_pos da página
+        lambda i: page["scroll_pos"] + i,
+    )
 
-    if "my_orders_zone" not in anchors or "price" not in cols:
-        return []
 
-    cap_cfg_path = Path(__file__).resolve().parents[2] / "config" / "capture.yaml"
-    cap_cfg = _load_capture_cfg(str(cap_cfg_path))
-    title_contains = (cap_cfg.get("window_title_contains") or "").strip()
-    window_info = get_window_rect(title_contains) if title_contains else None
-
-    if window_info:
-        base_size = (window_info["w"], window_info["h"])
-
-        def cap_fn(x, y, w, h):
-            return capture_rect_in_window(window_info["x"], window_info["y"], x, y, w, h)
+def scan_once(
+    source_view: str,
+    ocr_cfg_path: str,
+    ui_cfg_path: str,
+    page_index: int = 0,
+    scroll_pos: float = 0.0,
+) -> List[Dict]:
+    page = capture_book_page(source_view, ui_cfg_path, page_index, scroll_pos)
+    rows = read_book_page(page, ocr_cfg_path)
+    record("rows", scan="scan_once", view=source_view, page_index=page_index, rows=rows)
+    return rows
 
-    else:
-        base_size = get_screen_resolution()
 
-        def cap_fn(x, y, w, h):
-            return capture_rect(x, y, w, h)
+def _scan_pages(
+    anchor: Dict, rows_per_page: int, mode: str, max_pages: int, scroll: Callable[[], None], read_rows
+):
+    """Read up to ``max_pages`` of a scrolling list, OCR'ing only revealed rows.
 
-    lx, ly, lw, lh = relative_rect(anchors["my_orders_zone"], base_size)
-    rows_per_page = int(prof.get("my_orders_rows", 10))
-    line_h = max(1, int(lh / rows_per_page))
+    ``read_rows(frame, origin, zone, bands, page_index, scroll_pos)`` builds
+    the rows of one page. Between pages ``scroll()`` is called and the actual
+    shift is measured (:class:`ScrollTracker`); reading stops when the list
+    did not move. ``scroll_pos`` of each row is its exact offset in the list.
+    """
+    tracker: Optional[ScrollTracker] = None
+    for page in range(max_pages):
+        if page:
+            scroll()
+        frame, origin, zone = _grab_zone(anchor)
+        if tracker is None:
+            tracker = ScrollTracker(int(zone[3] / rows_per_page), rows_per_page)
+        with span("scroll.shift"):
+            new_rows = tracker.advance(slice_cell(frame, origin, zone))
+        if tracker.at_end:
+            break
+        offset = tracker.offset
+        # só as faixas cujo centro está na parte revelada pelo scroll
+        min_y = new_rows.start * tracker.line_h
+        bands = [
+            b for b in _page_bands(frame, origin, zone, rows_per_page, mode) if b[1] + b[2] / 2 >= min_y
+        ]
+        yield read_rows(frame, origin, zone, bands, page, lambda i: float(offset + i))
+
+
+def scan_pages(
+    source_view: str,
+    ocr_cfg_path: str,
+    ui_cfg_path: str,
+    max_pages: int,
+    scroll: Callable[[], None],
+) -> Iterator[List[Dict]]:
+    """Like :func:`scan_once` over a scrolling book; yields the new rows of each page."""
+    ui = _load_ui_cfg(ui_cfg_path)
+    prof = next(iter(ui["profiles"].values()))
+    ax, cols, rows_per_page = _book_layout(prof, source_view)
+    engine = get_engine(ocr_cfg_path)
 
-    engine = OCREngine(load_ocr_config(ocr_cfg_path))
+    def read_rows(frame, origin, zone, bands, page_index, scroll_pos):
+        rows = _book_rows(
+            engine, frame, origin, zone, cols, bands, source_view, page_index, scroll_pos,
+        )
+        record("rows", scan="scan_once", view=source_view, page_index=page_index, rows=rows)
+        return rows
+
+    mode = prof.get("row_segmentation", "profile")
+    yield from _scan_pages(ax, rows_per_page, mode, max_pages, scroll, read_rows)
+
+
+def _my_orders_rows(
+    engine,
+    frame: np.ndarray,
+    origin: Tuple[int, int],
+    zone: Tuple[int, int, int, int],
+    cols: Dict[str, Dict],
+    bands: List[Band],
+    page_index: int,
+    scroll_pos: Callable[[int], float],
+) -> List[Dict]:
+    lx, ly, lw, lh = zone
+    reads = _read_cells(
+        engine,
+        frame,
+        origin,
+        {
+            (i, name): _column_rect(lx, lw, col, ly + y, h)
+            for i, y, h in bands
+            for name, col in cols.items()
+        },
+        cols,
+    )
     out: List[Dict] = []
 
-    for i in range(rows_per_page):
-        y0 = ly + i * line_h
-
+    for i, _, _ in bands:
         def read(colname: str) -> tuple[str, float]:
-            if colname not in cols:
-                return ("", 1.0)
-            cx = lx + int(cols[colname]["x"] * lw)
-            cw = max(1, int(cols[colname]["w"] * lw))
-            rect = (cx, y0, cw, line_h)
-            return engine.text_and_conf(cap_fn(*rect))
+            return reads.get((i, colname), ("", 1.0))
 
         price_txt, conf_p = read("price")
         price = parse_price(price_txt)
@@ -216,23 +561,78 @@ def scan_my_orders(ocr_cfg_path: str, ui_cfg_path: str,
 
         qty_name = "qty_remaining" if "qty_remaining" in cols else "qty"
         qty_txt, conf_q = read(qty_name)
-        qty_digits = "".join(ch for ch in qty_txt if ch.isdigit())
-        qty_val = int(qty_digits) if qty_digits else None
+        qty_val = parse_qty(qty_txt)
 
-        name_txt, conf_n = read("item_name")
+        item_name, conf_n, item_id = _resolve_name(*read("item_name"), cols.get("item_name"))
         side_txt, conf_s = read("side")
 
-        conf = float(min(conf_p, conf_q, conf_n, conf_s))
-        if conf < MIN_CONF:
+        if any(
+            c < _min_conf(cols[n])
+            for n, c in (("price", conf_p), (qty_name, conf_q), ("item_name", conf_n), ("side", conf_s))
+            if n in cols
+        ):
             continue
 
         out.append({
             "timestamp": datetime.utcnow().isoformat(),
-            "item_name": " ".join(name_txt.split()) if name_txt else "",
+            "item_name": item_name,
             "side": (side_txt or "").strip().upper() or "BUY",
             "price": price,
             "qty_remaining": qty_val,
             "page_index": page_index,
-            "scroll_pos": scroll_pos,
+            "scroll_pos": scroll_pos(i),
+            "canonical_item_id": item_id,
         })
     return out
+
+
+def _my_orders_layout(ui_cfg_path: str) -> Optional[Tuple[Dict, Dict, int, str]]:
+    ui = _load_ui_cfg(ui_cfg_path)
+    prof = next(iter(ui["profiles"].values()))
+    anchors = prof["anchors"]
+    cols = prof.get("my_orders_columns", {}) or {}
+    if "my_orders_zone" not in anchors or "price" not in cols:
+        return None
+    return (
+        anchors["my_orders_zone"],
+        cols,
+        int(prof.get("my_orders_rows", 10)),
+        prof.get("row_segmentation", "profile"),
+    )
+
+
+def scan_my_orders(ocr_cfg_path: str, ui_cfg_path: str,
+                   page_index: int = 0, scroll_pos: float = 0.0) -> List[Dict]:
+    """
+    Lê a tabela da aba 'MY ORDERS' usando anchors 'my_orders_zone' e
+    'my_orders_columns' em ui_profiles.yaml.
+    Espera colunas: price, qty (ou qty_remaining), (opcional) side, item_name.
+    """
+    layout = _my_orders_layout(ui_cfg_path)
+    if layout is None:
+        return []
+    anchor, cols, rows_per_page, mode = layout
+    frame, origin, zone = _grab_zone(anchor)
+    engine = get_engine(ocr_cfg_path)
+    bands = _page_bands(frame, origin, zone, rows_per_page, mode)
+    out = _my_orders_rows(engine, frame, origin, zone, cols, bands, page_index, lambda i: scroll_pos)
+    record("rows", scan="scan_my_orders", view="MY_ORDERS", page_index=page_index, rows=out)
+    return out
+
+
+def scan_my_orders_pages(
+    ocr_cfg_path: str, ui_cfg_path: str, max_pages: int, scroll: Callable[[], None]
+) -> Iterator[List[Dict]]:
+    """Like :func:`scan_my_orders` over a scrolling table; yields the new rows of each page."""
+    layout = _my_orders_layout(ui_cfg_path)
+    if layout is None:
+        return
+    anchor, cols, rows_per_page, mode = layout
+    engine = get_engine(ocr_cfg_path)
+
+    def read_rows(frame, origin, zone, bands, page_index, scroll_pos):
+        out = _my_orders_rows(engine, frame, origin, zone, cols, bands, page_index, scroll_pos)
+        record("rows", scan="scan_my_orders", view="MY_ORDERS", page_index=page_index, rows=out)
+        return out
+
+    yield from _scan_pages(anchor, rows_per_page, mode, max_pages, scroll, read_rows)
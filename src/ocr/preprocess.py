@@ -0,0 +1,124 @@
+"""Frame-level image preprocessing ahead of OCR.
+
+The page frame (or the bounding box of the cells about to be read) is
+prepared once with vectorized NumPy/OpenCV operations, and every cell crop is
+then a view into the result instead of a separately converted PIL image.
+Steps, in order, each toggled in the ``preprocess`` section of ``ocr.yaml``:
+
+``grayscale``
+    RGB → luminance.
+``stripes``
+    subtracts each pixel row's median, removing the alternating background
+    shades of list rows; the output is ink distance, bright on black.
+``normalize``
+    stretches the 1st–99th percentile range to 0–255.
+``invert``
+    ``auto`` leaves dark text on a light background (what Tesseract and the
+    Paddle recognizer expect); ``true``/``false`` force it.
+``scale_to_height``
+    resizes so the median cell height becomes the model's input height.
+``threshold``
+    ``none``, ``adaptive`` (local mean over ``block`` px minus ``offset``) or
+    ``otsu``.
+
+``kinds`` overrides any step per column kind (``text`` / ``numeric``); kinds
+with the same effective settings share one prepared frame.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULTS: Dict = {
+    "grayscale": True,
+    "stripes": True,
+    "normalize": True,
+    "invert": "auto",
+    "scale_to_height": 0,
+    "threshold": "none",
+    "block": 15,
+    "offset": 8,
+}
+# limites do fator de escala (evita explodir frames com linhas minúsculas)
+MIN_SCALE, MAX_SCALE = 0.5, 4.0
+
+
+class Preprocessor:
+    """Per-kind preprocessing settings built from ``ocr.yaml``."""
+
+    def __init__(self, cfg: Dict):
+        base = {**DEFAULTS, **{k: v for k, v in cfg.items() if k in DEFAULTS}}
+        self._base = base
+        self._kinds = {
+            kind: {**base, **(over or {})} for kind, over in (cfg.get("kinds") or {}).items()
+        }
+
+    @classmethod
+    def from_config(cls, ocr_cfg: Dict) -> Optional["Preprocessor"]:
+        """``None`` when the section is missing or ``enabled: false``."""
+        cfg = ocr_cfg.get("preprocess") or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(cfg)
+
+    def with_overrides(self, over: Dict) -> "Preprocessor":
+        """Copy with ``over`` applied on top of every kind (an escalation variant)."""
+        over = {k: v for k, v in over.items() if k in DEFAULTS}
+        variant = Preprocessor({**self._base, **over})
+        variant._kinds = {kind: {**s, **over} for kind, s in self._kinds.items()}
+        return variant
+
+    def settings(self, kind: str) -> Dict:
+        return self._kinds.get(kind, self._base)
+
+    def key(self, kind: str) -> tuple:
+        """Hashable settings of ``kind``: equal keys give identical frames."""
+        return tuple(sorted(self.settings(kind).items()))
+
+    def apply(self, img: np.ndarray, line_h: int, kind: str = "text") -> Tuple[np.ndarray, float]:
+        """Return ``(prepared, scale)``; coordinates in ``prepared`` are ``scale`` × the input's."""
+        s = self.settings(kind)
+        out = np.asarray(img)
+        if out.ndim == 3 and (s["grayscale"] or s["stripes"]):
+            out = cv2.cvtColor(np.ascontiguousarray(out[..., :3]), cv2.COLOR_RGB2GRAY)
+
+        inverted = False
+        if s["stripes"] and out.ndim == 2:
+            bg = np.median(out, axis=1).astype(np.int16)
+            out = np.abs(out.astype(np.int16) - bg[:, None]).astype(np.uint8)
+            inverted = True  # tinta clara sobre preto
+
+        if s["normalize"] and out.size:
+            lo, hi = np.percentile(out, (1, 99))
+            if hi - lo >= 1:
+                lut = np.clip((np.arange(256, dtype=np.float32) - lo) * (255.0 / (hi - lo)), 0, 255)
+                out = lut.astype(np.uint8)[out]
+
+        invert = s["invert"]
+        if invert == "auto":
+            invert = inverted or (out.ndim == 2 and out.size and float(np.median(out)) < 128)
+        if invert:
+            out = 255 - out
+
+        scale = 1.0
+        target = int(s["scale_to_height"] or 0)
+        if target and line_h > 0:
+            scale = min(MAX_SCALE, max(MIN_SCALE, target / float(line_h)))
+            if abs(scale - 1.0) > 0.05:
+                h, w = out.shape[:2]
+                interp = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+                out = cv2.resize(out, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=interp)
+            else:
+                scale = 1.0
+
+        if out.ndim == 2 and s["threshold"] == "adaptive":
+            block = max(3, int(s["block"] * scale) | 1)
+            out = cv2.adaptiveThreshold(
+                out, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, float(s["offset"])
+            )
+        elif out.ndim == 2 and s["threshold"] == "otsu":
+            _, out = cv2.threshold(out, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return out, scale
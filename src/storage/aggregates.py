@@ -0,0 +1,178 @@
+"""Materialized order-book aggregates, updated on every snapshot batch.
+
+``book_latest`` keeps one row per ``(item_name, source_view)``: the best
+price, visible depth and number of price levels of the latest observation
+(the rows one run saw for that item/list). ``book_ohlc_5m`` / ``_1h`` / ``_1d``
+keep open/high/low/close of that best price per time bucket.
+
+:class:`~src.storage.db.SnapshotWriter` feeds every batch it flushes to
+:func:`apply_batch` inside the same transaction, so readers (dashboard,
+signals) scan O(items) rows instead of ``prices_snapshots``. Batches of the
+same run merge into one observation; an older run never overwrites a newer
+one. :func:`rebuild` recomputes everything from ``prices_snapshots``
+(``python -m src.main rebuild-aggregates``).
+
+The OHLC rows take the observation's merged best price from ``book_latest``
+(not the batch's own), so a later, worse page of the same run only adds
+depth. Lists come sorted best-first, so the first page of a run already
+carries its best price.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# lista -> o melhor preço é o menor? BUY_LIST mostra ofertas de venda (ask: menor
+# é melhor); SELL_LIST mostra ordens de compra (bid: maior é melhor)
+BEST_IS_MIN: Dict[str, bool] = {"BUY_LIST": True, "SELL_LIST": False}
+
+OHLC_BUCKETS: Dict[str, int] = {"5m": 300_000, "1h": 3_600_000, "1d": 86_400_000}
+
+REBUILD_CHUNK = 20_000
+
+# (run_id, source_view, item_name) -> (canonical_item_id, best, depth, levels, ts_ms)
+Observation = Tuple[Optional[int], float, Optional[int], int, int]
+
+_LATEST_SQL = """
+    INSERT INTO book_latest (item_name, source_view, canonical_item_id, run_id, best_price, depth_qty, levels, ts_ms)
+    VALUES (?,?,?,?,?,?,?,?)
+    ON CONFLICT(item_name, source_view) DO UPDATE SET
+      best_price = CASE WHEN excluded.run_id = book_latest.run_id
+                        THEN {best}(book_latest.best_price, excluded.best_price)
+                        ELSE excluded.best_price END,
+      depth_qty = CASE WHEN excluded.run_id = book_latest.run_id
+                       THEN COALESCE(book_latest.depth_qty, 0) + COALESCE(excluded.depth_qty, 0)
+                       ELSE excluded.depth_qty END,
+      levels = CASE WHEN excluded.run_id = book_latest.run_id
+                    THEN book_latest.levels + excluded.levels
+                    ELSE excluded.levels END,
+      canonical_item_id = COALESCE(excluded.canonical_item_id, book_latest.canonical_item_id),
+      run_id = excluded.run_id,
+      ts_ms = MAX(book_latest.ts_ms, excluded.ts_ms)
+    WHERE excluded.run_id = book_latest.run_id OR excluded.ts_ms >= book_latest.ts_ms
+"""
+
+_OHLC_SQL = """
+    INSERT INTO book_ohlc_{bucket} (item_name, source_view, bucket_ms, canonical_item_id,
+                                    open, high, low, close, depth_qty, samples, last_run_id, last_ts_ms)
+    SELECT ?1, ?2, ?3, ?4, v, v, v, v, ?6, 1, ?7, ?8
+    FROM (SELECT COALESCE(
+            (SELECT best_price FROM book_latest WHERE item_name = ?1 AND source_view = ?2 AND run_id = ?7),
+            ?5) AS v)
+    WHERE true
+    ON CONFLICT(item_name, source_view, bucket_ms) DO UPDATE SET
+      high = MAX(book_ohlc_{bucket}.high, excluded.high),
+      low = MIN(book_ohlc_{bucket}.low, excluded.low),
+      close = CASE WHEN excluded.last_ts_ms < book_ohlc_{bucket}.last_ts_ms THEN book_ohlc_{bucket}.close
+                   WHEN excluded.last_run_id = book_ohlc_{bucket}.last_run_id
+                   THEN {best}(book_ohlc_{bucket}.close, excluded.close)
+                   ELSE excluded.close END,
+      depth_qty = CASE WHEN excluded.last_ts_ms < book_ohlc_{bucket}.last_ts_ms THEN book_ohlc_{bucket}.depth_qty
+                       WHEN excluded.last_run_id = book_ohlc_{bucket}.last_run_id
+                       THEN COALESCE(book_ohlc_{bucket}.depth_qty, 0) + COALESCE(excluded.depth_qty, 0)
+                       ELSE excluded.depth_qty END,
+      samples = book_ohlc_{bucket}.samples
+                + (excluded.last_run_id IS NOT book_ohlc_{bucket}.last_run_id),
+      canonical_item_id = COALESCE(excluded.canonical_item_id, book_ohlc_{bucket}.canonical_item_id),
+      last_run_id = CASE WHEN excluded.last_ts_ms < book_ohlc_{bucket}.last_ts_ms
+                         THEN book_ohlc_{bucket}.last_run_id ELSE excluded.last_run_id END,
+      last_ts_ms = MAX(book_ohlc_{bucket}.last_ts_ms, excluded.last_ts_ms)
+"""
+
+
+def _sql(template: str, is_min: bool, **fmt) -> str:
+    return template.format(best="MIN" if is_min else "MAX", **fmt)
+
+
+_STATEMENTS = {
+    is_min: (
+        _sql(_LATEST_SQL, is_min),
+        {b: _sql(_OHLC_SQL, is_min, bucket=b) for b in OHLC_BUCKETS},
+    )
+    for is_min in (True, False)
+}
+
+
+def observations(params: Iterable[tuple]) -> Dict[Tuple[int, str, str], Observation]:
+    """Group snapshot rows (``db._snapshot_params`` tuples) into per-run observations."""
+    obs: Dict[Tuple[int, str, str], Observation] = {}
+    for p in params:
+        run_id, view, item, price, qty, ts_ms, item_id = p[0], p[2], p[3], p[4], p[5], p[10], p[11]
+        if price is None:
+            continue
+        key = (run_id, view, item)
+        prev = obs.get(key)
+        if prev is None:
+            obs[key] = (item_id, price, qty, 1, ts_ms)
+            continue
+        is_min = BEST_IS_MIN.get(view, True)
+        best = min(prev[1], price) if is_min else max(prev[1], price)
+        depth = None if prev[2] is None and qty is None else (prev[2] or 0) + (qty or 0)
+        obs[key] = (prev[0] or item_id, best, depth, prev[3] + 1, max(prev[4], ts_ms))
+    return obs
+
+
+def apply_batch(con, params: Iterable[tuple]) -> int:
+    """Merge a batch of snapshot rows into the aggregates; returns observations touched.
+
+    Runs on the caller's connection without committing (call it inside the
+    batch's transaction).
+    """
+    obs = observations(params)
+    if not obs:
+        return 0
+    by_side: Dict[bool, List[tuple]] = {True: [], False: []}
+    for (run_id, view, item), (item_id, best, depth, levels, ts_ms) in sorted(obs.items(), key=lambda kv: kv[1][4]):
+        by_side[BEST_IS_MIN.get(view, True)].append((item, view, item_id, run_id, best, depth, levels, ts_ms))
+    for is_min, rows in by_side.items():
+        if not rows:
+            continue
+        latest_sql, ohlc_sql = _STATEMENTS[is_min]
+        con.executemany(latest_sql, rows)
+        for bucket, size in OHLC_BUCKETS.items():
+            con.executemany(
+                ohlc_sql[bucket],
+                [
+                    (item, view, ts_ms // size * size, item_id, best, depth, run_id, ts_ms)
+                    for item, view, item_id, run_id, best, depth, _levels, ts_ms in rows
+                ],
+            )
+    return len(obs)
+
+
+def clear(con) -> None:
+    con.execute("DELETE FROM book_latest")
+    for bucket in OHLC_BUCKETS:
+        con.execute(f"DELETE FROM book_ohlc_{bucket}")
+
+
+def rebuild(con, chunk: int = REBUILD_CHUNK) -> int:
+    """Recompute every aggregate from ``prices_snapshots`` (plus ``snapshot_repeats``); returns rows read.
+
+    Commits once at the end; the tables are emptied first.
+    """
+    clear(con)
+    total = 0
+    # linhas gravadas + as que dedup="changed" deixou de fora (snapshot_repeats),
+    # reconstituídas a partir da linha gravada que repetem
+    cur = con.execute(
+        """SELECT run_id, timestamp, source_view, item_name, price, qty_visible, page_index,
+                  scroll_pos, confidence, hash_row, ts_ms, canonical_item_id, id
+           FROM prices_snapshots
+           WHERE ts_ms IS NOT NULL
+           UNION ALL
+           SELECT r.run_id, p.timestamp, r.source_view, p.item_name, p.price, p.qty_visible, p.page_index,
+                  p.scroll_pos, p.confidence, r.hash_row, r.ts_ms, p.canonical_item_id, p.id
+           FROM snapshot_repeats r
+           JOIN prices_snapshots p
+             ON p.run_id = r.ref_run_id AND p.source_view = r.source_view AND p.hash_row = r.hash_row
+           ORDER BY 11, 13"""
+    )
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            break
+        apply_batch(con, rows)
+        total += len(rows)
+    con.commit()
+    return total
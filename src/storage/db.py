@@ -1,70 +1,457 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import json
 from pathlib import Path
+import queue
 import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from src.storage import aggregates
+from src.utils.timing import drain_metrics, span, timed, timing_enabled
 
 SCHEMA_PATH = Path(__file__).resolve().parents[2] / "schema.sql"
 DB_PATH = Path(__file__).resolve().parents[2] / "data" / "market.db"
 
-
-def ensure_db():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    con = sqlite3.connect(DB_PATH)
+# Versão do schema gravada em ``PRAGMA user_version``; incremente ao mudar o
+# schema.sql e registre a migração correspondente em ``_MIGRATIONS``.
+SCHEMA_VERSION = 9
+
+READ_POOL_SIZE = 4
+_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB
+)
+
+_WRITER: sqlite3.Connection | None = None
+_WRITER_LOCK = threading.Lock()
+_READ_POOL: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+
+# Deduplicação na gravação de snapshots:
+#   "run"     -> linha idêntica (mesmo hash_row) no mesmo run/lista é ignorada
+#   "changed" -> além disso, só grava a linha cujo preço/qty mudou desde a
+#                última observação daquele nível (offset) do book do item na lista
+DEDUP_MODES = ("run", "changed")
+
+# última observação por nível do book: (item_name, source_view, scroll_pos) ->
+# (price, qty_visible, run_id do run em que a linha foi gravada)
+_LAST_OBSERVED: Dict[Tuple[str, str, float | None], Tuple[float, int | None, int]] = {}
+_LAST_LOCK = threading.Lock()
+
+
+def _apply_pragmas(con, *, read_only: bool = False) -> None:
+    if not read_only:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")  # seguro sob WAL, sem fsync por commit
+    for pragma in _PRAGMAS:
+        con.execute(pragma)
+
+
+def _ensure_schema(con) -> None:
+    """Apply ``schema.sql`` (plus pending migrations) only when ``user_version`` is behind."""
+    version = con.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    existing = _has_table(con, "runs")
+    if existing:
+        # banco existente: migrações antes do schema (índices novos dependem delas)
+        for target, step in _MIGRATIONS:
+            if version < target:
+                step(con)
     with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
         con.executescript(f.read())
-    con.commit()
     _migrate_items_catalog_to_items(con)
+    if existing:
+        # passos que precisam das tabelas novas do schema.sql
+        for target, step in _POST_SCHEMA_MIGRATIONS:
+            if version < target:
+                step(con)
+    con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    con.commit()
+
+
+def ensure_db():
+    """Return the process-wide writer connection, opening and migrating it once."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(DB_PATH, check_same_thread=False)
+            _apply_pragmas(con)
+            _ensure_schema(con)
+            _WRITER = con
+        return _WRITER
+
+
+def open_connection():
+    """A separate read/write connection for work running alongside the writer.
+
+    Concurrent scheduler phases use one each (SQLite serializes the actual
+    writes through WAL + ``busy_timeout``). The caller closes it.
+    """
+    ensure_db()  # schema/migrações uma vez
+    con = sqlite3.connect(DB_PATH, check_same_thread=False)
+    _apply_pragmas(con)
     return con
 
 
+@contextmanager
+def read_connection():
+    """Borrow a pooled read-only connection (for the dashboard and reports)."""
+    try:
+        con = _READ_POOL.get_nowait()
+    except queue.Empty:
+        con = sqlite3.connect(
+            f"file:{DB_PATH.as_posix()}?mode=ro", uri=True, check_same_thread=False
+        )
+        _apply_pragmas(con, read_only=True)
+    try:
+        yield con
+    finally:
+        if _READ_POOL.qsize() < READ_POOL_SIZE:
+            _READ_POOL.put(con)
+        else:
+            con.close()
+
+
+def close_db() -> None:
+    """Close the writer and every pooled reader (the next call reopens them)."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is not None:
+            _WRITER.close()
+            _WRITER = None
+    while True:
+        try:
+            _READ_POOL.get_nowait().close()
+        except queue.Empty:
+            break
+    with _LAST_LOCK:
+        _LAST_OBSERVED.clear()
+
+
+# ---------- Transações ----------
+# profundidade de transação por conexão: dentro de ``transaction`` os helpers
+# deste módulo não fazem commit próprio e compõem uma única transação.
+_TX_DEPTH: Dict[int, int] = {}
+
+
+def _commit(con) -> None:
+    if not _TX_DEPTH.get(id(con)):
+        con.commit()
+
+
+@contextmanager
+def transaction(con):
+    """Run the enclosed helper calls as one atomic transaction (one commit).
+
+    Nested uses join the outermost transaction. On exception everything since
+    the outermost ``transaction`` is rolled back.
+    """
+    key = id(con)
+    _TX_DEPTH[key] = _TX_DEPTH.get(key, 0) + 1
+    try:
+        yield con
+    except BaseException:
+        if _TX_DEPTH[key] == 1:
+            con.rollback()
+        raise
+    else:
+        if _TX_DEPTH[key] == 1:
+            con.commit()
+    finally:
+        _TX_DEPTH[key] -= 1
+        if not _TX_DEPTH[key]:
+            del _TX_DEPTH[key]
+
+
 def new_run(con, mode="scan", notes=None):
     cur = con.cursor()
     cur.execute(
         "INSERT INTO runs (started_at, mode, notes) VALUES (datetime('now'), ?, ?)",
         (mode, notes),
     )
-    con.commit()
+    _commit(con)
     return cur.lastrowid
 
 
 def end_run(con, run_id):
     con.execute("UPDATE runs SET ended_at=datetime('now') WHERE run_id=?", (run_id,))
-    con.commit()
+    if timing_enabled():
+        insert_metrics(con, run_id, drain_metrics())
+    _commit(con)
+
+
+def insert_metrics(con, run_id, metrics: List[Dict]) -> None:
+    """Store span aggregates (see :func:`src.utils.timing.drain_metrics`) for a run."""
+    ts = now_ms()
+    con.executemany(
+        """INSERT INTO metrics (ts_ms, run_id, name, count, total_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms)
+           VALUES (?,?,?,?,?,?,?,?,?,?)""",
+        [
+            (ts, run_id, m["name"], m["count"], m["total_ms"], m["min_ms"], m["max_ms"],
+             m["p50_ms"], m["p95_ms"], m["p99_ms"])
+            for m in metrics
+        ],
+    )
+    _commit(con)
+
+
+# OR IGNORE: o índice único (run_id, source_view, hash_row) descarta repetições
+_SNAPSHOT_SQL = """
+    INSERT OR IGNORE INTO prices_snapshots
+    (run_id, timestamp, source_view, item_name, price, qty_visible, page_index, scroll_pos, confidence, hash_row, ts_ms,
+     canonical_item_id)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+_REPEAT_SQL = """
+    INSERT OR IGNORE INTO snapshot_repeats (run_id, source_view, hash_row, ref_run_id, ts_ms)
+    SELECT ?,?,?,?,?
+    WHERE NOT EXISTS (SELECT 1 FROM prices_snapshots WHERE run_id=? AND source_view=? AND hash_row=?)
+"""
+_ACTION_SQL = """
+    INSERT INTO actions_log (ts, run_id, action, details, success, notes, ts_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_MY_ORDER_SNAPSHOT_SQL = """
+    INSERT INTO my_orders_snapshots (ts, item_name, side, price, qty_remaining, settlement, ts_ms, canonical_item_id)
+    VALUES (?,?,?,?,?,?,?,?)
+"""
+
+
+def _now_sql() -> str:
+    """UTC timestamp in the same format as SQLite's ``datetime('now')``."""
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def iso_to_ms(ts: str) -> int:
+    """Epoch milliseconds of a naive-UTC ISO timestamp (as written by the scanners)."""
+    dt = datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _snapshot_params(run_id, row):
+    return (
+        run_id,
+        row["timestamp"],
+        row["source_view"],
+        row["item_name"],
+        row["price"],
+        row.get("qty_visible"),
+        row.get("page_index"),
+        row.get("scroll_pos"),
+        row.get("confidence"),
+        row.get("hash_row"),
+        row.get("ts_ms") or iso_to_ms(row["timestamp"]),
+        row.get("canonical_item_id"),
+    )
 
 
+def _action_params(run_id, action, details=None, success=1, notes=None, ts=None, ts_ms=None):
+    if isinstance(details, (dict, list)):
+        details = json.dumps(details, ensure_ascii=False)
+    if ts_ms is not None and ts is None:
+        ts = datetime.utcfromtimestamp(ts_ms / 1000).strftime("%Y-%m-%d %H:%M:%S")
+    return (ts or _now_sql(), run_id, action, details, success, notes, ts_ms or now_ms())
+
+
+def _repeat_of(con, params, pending: Dict | None = None) -> int | None:
+    """Run of the stored row that ``params`` repeats, or ``None`` when it changed.
+
+    A book has many rows per item, so the comparison is per level: the row's
+    offset in the list (``scroll_pos``). The in-memory map holds committed rows
+    only (seeded from the database on the first lookup of each level); a
+    changed row goes to ``pending``, the writer's not yet flushed values, which
+    are looked up first and published by :meth:`SnapshotWriter.flush` once
+    its transaction commits.
+    """
+    key = (params[3], params[2], params[7])
+    last = pending.get(key) if pending is not None else None
+    if last is None:
+        with _LAST_LOCK:
+            if key not in _LAST_OBSERVED:
+                cur = con.execute(
+                    """SELECT price, qty_visible, run_id FROM prices_snapshots
+                       WHERE item_name=? AND source_view=? AND scroll_pos IS ?
+                       ORDER BY ts_ms DESC LIMIT 1""",
+                    key,
+                )
+                row = cur.fetchone()
+                if row is not None:
+                    _LAST_OBSERVED[key] = tuple(row)
+            last = _LAST_OBSERVED.get(key)
+    if last is not None and last[:2] == (params[4], params[5]):
+        return last[2]
+    if pending is not None:
+        pending[key] = (params[4], params[5], params[0])
+    return None
+
+
+def _changed_since_last(con, params) -> bool:
+    """True when ``params`` differs in price/qty from the last observation of its book level."""
+    return _repeat_of(con, params) is None
+
+
+@timed("db.insert_snapshot")
 def insert_snapshot(con, run_id, row):
-    con.execute(
-        """
-        INSERT INTO prices_snapshots
-        (run_id, timestamp, source_view, item_name, price, qty_visible, page_index, scroll_pos, confidence, hash_row)
-        VALUES (?,?,?,?,?,?,?,?,?,?)
-        """,
-        (
-            run_id,
-            row["timestamp"],
-            row["source_view"],
-            row["item_name"],
-            row["price"],
-            row.get("qty_visible"),
-            row.get("page_index"),
-            row.get("scroll_pos"),
-            row.get("confidence"),
-            row.get("hash_row"),
-        ),
-    )
-    con.commit()
+    params = _snapshot_params(run_id, row)
+    con.execute(_SNAPSHOT_SQL, params)
+    aggregates.apply_batch(con, [params])
+    _commit(con)
 
 
 def insert_action(con, run_id, action, details=None, success=1, notes=None):
-    if isinstance(details, (dict, list)):
-        details = json.dumps(details, ensure_ascii=False)
-    con.execute(
-        """
-        INSERT INTO actions_log (ts, run_id, action, details, success, notes)
-        VALUES (datetime('now'), ?, ?, ?, ?, ?)
-        """,
-        (run_id, action, details, success, notes),
-    )
-    con.commit()
+    con.execute(_ACTION_SQL, _action_params(run_id, action, details, success, notes))
+    _commit(con)
+
+
+class SnapshotWriter:
+    """Unit of work that buffers snapshot/action rows and writes them in batches.
+
+    Rows are flushed with ``executemany`` inside a single transaction when the
+    buffer reaches ``flush_size`` rows, when ``flush_interval_s`` has elapsed
+    since the last flush, on an explicit :meth:`flush` (e.g. once per page or
+    per item) and when the ``with`` block exits — also on exceptions, so rows
+    already observed are not lost.
+
+    ``dedup`` is one of :data:`DEDUP_MODES`. Rows dropped as repeats are
+    counted in ``skipped``; ``written`` counts snapshot rows actually inserted.
+
+    Each flush also merges the batch into the book aggregates
+    (:mod:`src.storage.aggregates`). They see every row observed in the run,
+    once per ``hash_row``, including rows that ``dedup="changed"`` keeps out
+    of ``prices_snapshots``; those are recorded in ``snapshot_repeats`` (a
+    pointer to the stored row they repeat) so ``aggregates.rebuild`` replays
+    the same input. Only rows the database actually took are merged, so
+    another writer of the same run re-reading a row does not count it twice.
+    """
+
+    def __init__(
+        self,
+        con,
+        run_id,
+        flush_size: int = 500,
+        flush_interval_s: float = 5.0,
+        dedup: str = "run",
+    ):
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup inválido: {dedup!r} (use um de {DEDUP_MODES})")
+        self.con = con
+        self.run_id = run_id
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval_s = float(flush_interval_s)
+        self.dedup = dedup
+        self.written = 0
+        self.skipped = 0
+        self._snapshots: List[tuple] = []
+        self._repeats: List[tuple] = []
+        self._pending: Dict = {}
+        self._seen: set = set()
+        self._actions: List[tuple] = []
+        self._my_orders: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def __len__(self):
+        return len(self._snapshots) + len(self._repeats) + len(self._actions) + len(self._my_orders)
+
+    def _add(self, params) -> None:
+        # a mesma linha relida no run (re-scan): cada (lista, hash_row) conta uma vez
+        key = (params[2], params[9])
+        if params[9] is not None:
+            if key in self._seen:
+                self.skipped += 1
+                return
+            self._seen.add(key)
+        if self.dedup == "changed" and params[9] is not None:
+            ref_run = _repeat_of(self.con, params, self._pending)
+            if ref_run is not None:
+                self.skipped += 1
+                # repetir uma linha do próprio run é só a mesma linha gravada
+                # por outro writer (outro job do run): nada a registrar
+                if ref_run != params[0]:
+                    self._repeats.append(((params[0], params[2], params[9], ref_run, params[10]), params))
+                return
+        self._snapshots.append(params)
+
+    def add_snapshot(self, row) -> None:
+        self._add(_snapshot_params(self.run_id, row))
+        self._maybe_flush()
+
+    def add_snapshots(self, rows) -> None:
+        for r in rows:
+            self._add(_snapshot_params(self.run_id, r))
+        self._maybe_flush()
+
+    def add_action(self, action, details=None, success=1, notes=None, ts_ms=None) -> None:
+        # o ts é o do evento, não o do flush (``ts_ms`` quando o evento é anterior
+        # à chamada, p.ex. enfileirado no pipeline de OCR)
+        self._actions.append(_action_params(self.run_id, action, details, success, notes, ts_ms=ts_ms))
+        self._maybe_flush()
+
+    def add_my_order_snapshot(self, row) -> None:
+        self._my_orders.append(
+            (
+                _now_sql(),
+                row["item_name"],
+                row["side"],
+                row["price"],
+                row.get("qty_remaining"),
+                row.get("settlement"),
+                now_ms(),
+                row.get("canonical_item_id"),
+            )
+        )
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if len(self) >= self.flush_size or (
+            time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every buffered row in one transaction."""
+        self._last_flush = time.monotonic()
+        if not len(self):
+            return
+        snapshots, repeats, pending = self._snapshots, self._repeats, self._pending
+        actions, my_orders = self._actions, self._my_orders
+        self._snapshots, self._repeats, self._actions, self._my_orders = [], [], [], []
+        self._pending = {}
+        with span("db.flush"), transaction(self.con):
+            # linha a linha: o rowcount diz qual linha o banco aceitou, e só
+            # essas entram nos agregados (outro writer do run pode ter gravado)
+            observed = [p for p in snapshots if self.con.execute(_SNAPSHOT_SQL, p).rowcount]
+            self.written += len(observed)
+            self.skipped += len(snapshots) - len(observed)
+            observed += [p for r, p in repeats if self.con.execute(_REPEAT_SQL, r + r[:3]).rowcount]
+            if observed:
+                with span("db.aggregate"):
+                    aggregates.apply_batch(self.con, observed)
+            if my_orders:
+                self.con.executemany(_MY_ORDER_SNAPSHOT_SQL, my_orders)
+            if actions:
+                self.con.executemany(_ACTION_SQL, actions)
+        # só depois do commit: um flush que falha não deixa no mapa valores
+        # que nunca chegaram ao prices_snapshots
+        with _LAST_LOCK:
+            _LAST_OBSERVED.update(pending)
 
 
 # ---------- Catálogo ----------
@@ -91,7 +478,7 @@ def upsert_item(
         """,
         (name, category, subcategory, tags_json, source_insert, source),
     )
-    con.commit()
+    _commit(con)
 
 
 # ---------- Migração: items_catalog -> items ----------
@@ -137,70 +524,151 @@ def _migrate_items_catalog_to_items(con):
     con.execute("DROP TABLE items_catalog")
     con.commit()
 
+
+# Migrações incrementais: (versão alvo, função). Rodam só em bancos existentes
+# com ``user_version`` menor que a versão alvo, antes de reaplicar o schema.sql.
+def _has_column(con, table: str, column: str) -> bool:
+    return any(r[1] == column for r in con.execute(f"PRAGMA table_info({table})"))
+
+
+def _migration_2_epoch_ms(con):
+    """Adiciona ``ts_ms`` (epoch ms) às tabelas com timestamp em texto e faz o backfill."""
+    for table, text_col in (
+        ("prices_snapshots", "timestamp"),
+        ("actions_log", "ts"),
+        ("my_orders_snapshots", "ts"),
+    ):
+        if not _has_table(con, table):
+            continue
+        if not _has_column(con, table, "ts_ms"):
+            con.execute(f"ALTER TABLE {table} ADD COLUMN ts_ms INTEGER")
+        con.execute(
+            f"""UPDATE {table}
+                SET ts_ms = CAST(ROUND((julianday({text_col}) - 2440587.5) * 86400000) AS INTEGER)
+                WHERE ts_ms IS NULL"""
+        )
+    # substituído por idx_prices_item_view_ts
+    con.execute("DROP INDEX IF EXISTS idx_prices_item_time")
+    con.commit()
+
+
+def _migration_3_dedup_hash_row(con):
+    """Remove snapshots repetidos por (run_id, source_view, hash_row) antes do índice único."""
+    if _has_table(con, "prices_snapshots"):
+        con.execute(
+            """DELETE FROM prices_snapshots
+               WHERE hash_row IS NOT NULL
+                 AND id NOT IN (
+                   SELECT MIN(id) FROM prices_snapshots
+                   WHERE hash_row IS NOT NULL
+                   GROUP BY run_id, source_view, hash_row
+                 )"""
+        )
+    con.commit()
+
+
+def _migration_5_canonical_item_id(con):
+    """Adiciona ``canonical_item_id`` aos snapshots e resolve os nomes já gravados."""
+    from .names import NameIndex
+
+    index = NameIndex.from_db(con)
+    for table in ("prices_snapshots", "my_orders_snapshots"):
+        if not _has_table(con, table):
+            continue
+        if not _has_column(con, table, "canonical_item_id"):
+            con.execute(f"ALTER TABLE {table} ADD COLUMN canonical_item_id INTEGER")
+        if not len(index):
+            continue
+        names = [r[0] for r in con.execute(f"SELECT DISTINCT item_name FROM {table} WHERE canonical_item_id IS NULL")]
+        matches = ((index.resolve(n), n) for n in names)
+        con.executemany(
+            f"UPDATE {table} SET canonical_item_id=? WHERE item_name=? AND canonical_item_id IS NULL",
+            [(m.item_id, n) for m, n in matches if m is not None],
+        )
+    con.commit()
+
+
+def _migration_8_signals_refined(con):
+    """``signals`` ganha ``refined`` na PK; a tabela é derivada, então é recriada vazia."""
+    con.execute("DROP TABLE IF EXISTS signals")
+    con.commit()
+
+
+_MIGRATIONS: list = [
+    (2, _migration_2_epoch_ms),
+    (3, _migration_3_dedup_hash_row),
+    (5, _migration_5_canonical_item_id),
+    (8, _migration_8_signals_refined),
+]
+
+_POST_SCHEMA_MIGRATIONS: list = [
+    (6, aggregates.rebuild),  # backfill de book_latest / book_ohlc_*
+]
+
 # ---------- ORDERS ----------
 def create_order(con, *, item_name: str, side: str, price: float, qty_requested: int,
                  run_id: int | None = None, settlement: str | None = None,
                  notes: str | None = None, status: str = "PENDING") -> int:
-    cur = con.cursor()
-    cur.execute("""
-        INSERT INTO my_orders(run_id,item_name,side,price,qty_requested,status,settlement,notes)
-        VALUES (?,?,?,?,?,?,?,?)
-    """, (run_id, item_name, side, price, qty_requested, status, settlement, notes))
-    con.commit()
-    oid = cur.lastrowid
-    append_order_event(con, oid, "PLACED", status_after=status, details=json.dumps({"price":price,"qty":qty_requested}))
+    with transaction(con):
+        cur = con.cursor()
+        cur.execute("""
+            INSERT INTO my_orders(run_id,item_name,side,price,qty_requested,status,settlement,notes)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, (run_id, item_name, side, price, qty_requested, status, settlement, notes))
+        oid = cur.lastrowid
+        append_order_event(con, oid, "PLACED", status_after=status, details=json.dumps({"price":price,"qty":qty_requested}))
     return oid
 
 
 def set_order_active(con, my_order_id: int) -> None:
-    con.execute("UPDATE my_orders SET status='ACTIVE', updated_at=datetime('now') WHERE my_order_id=?", (my_order_id,))
-    append_order_event(con, my_order_id, "SEEN", status_after="ACTIVE")
-    con.commit()
+    with transaction(con):
+        con.execute("UPDATE my_orders SET status='ACTIVE', updated_at=datetime('now') WHERE my_order_id=?", (my_order_id,))
+        append_order_event(con, my_order_id, "SEEN", status_after="ACTIVE")
 
 
 def update_order_fill(con, my_order_id: int, qty_delta: int) -> None:
-    con.execute("""
-        UPDATE my_orders SET
-          qty_filled = qty_filled + ?,
-          status = CASE WHEN qty_filled + ? >= qty_requested THEN 'FILLED'
-                        WHEN qty_filled + ? > 0 THEN 'PARTIAL'
-                        ELSE status END,
-          updated_at = datetime('now')
-        WHERE my_order_id = ?
-    """, (qty_delta, qty_delta, qty_delta, my_order_id))
-    cur = con.execute("SELECT status FROM my_orders WHERE my_order_id=?", (my_order_id,))
-    status_after = cur.fetchone()[0]
-    append_order_event(con, my_order_id, "FILL", qty_delta=qty_delta, status_after=status_after)
-    con.commit()
+    with transaction(con):
+        con.execute("""
+            UPDATE my_orders SET
+              qty_filled = qty_filled + ?,
+              status = CASE WHEN qty_filled + ? >= qty_requested THEN 'FILLED'
+                            WHEN qty_filled + ? > 0 THEN 'PARTIAL'
+                            ELSE status END,
+              updated_at = datetime('now')
+            WHERE my_order_id = ?
+        """, (qty_delta, qty_delta, qty_delta, my_order_id))
+        cur = con.execute("SELECT status FROM my_orders WHERE my_order_id=?", (my_order_id,))
+        status_after = cur.fetchone()[0]
+        append_order_event(con, my_order_id, "FILL", qty_delta=qty_delta, status_after=status_after)
 
 
 def set_order_closed(con, my_order_id: int, status: str, details: dict | None = None) -> None:
-    con.execute("UPDATE my_orders SET status=?, updated_at=datetime('now') WHERE my_order_id=?",
-                (status, my_order_id))
-    append_order_event(con, my_order_id, "CLOSE", status_after=status,
-                       details=json.dumps(details, ensure_ascii=False) if details else None)
-    con.commit()
+    with transaction(con):
+        con.execute("UPDATE my_orders SET status=?, updated_at=datetime('now') WHERE my_order_id=?",
+                    (status, my_order_id))
+        append_order_event(con, my_order_id, "CLOSE", status_after=status,
+                           details=json.dumps(details, ensure_ascii=False) if details else None)
 
 
 def mark_order_seen_now(con, my_order_id: int) -> None:
     con.execute("UPDATE my_orders SET last_seen_at=datetime('now'), updated_at=datetime('now') WHERE my_order_id=?",
                 (my_order_id,))
-    con.commit()
+    _commit(con)
 
 
 def append_order_event(con, my_order_id: int, event: str, qty_delta: int | None = None,
                        status_after: str | None = None, details: str | None = None) -> None:
     con.execute("""INSERT INTO order_events (my_order_id, event, qty_delta, status_after, details)
                    VALUES (?,?,?,?,?)""", (my_order_id, event, qty_delta, status_after, details))
-    con.commit()
+    _commit(con)
 
 
 def insert_my_order_snapshot(con, row: dict) -> None:
-    con.execute("""
-        INSERT INTO my_orders_snapshots (ts, item_name, side, price, qty_remaining, settlement)
-        VALUES (datetime('now'),?,?,?,?,?)
-    """, (row["item_name"], row["side"], row["price"], row.get("qty_remaining"), row.get("settlement")))
-    con.commit()
+    con.execute(_MY_ORDER_SNAPSHOT_SQL, (
+        _now_sql(), row["item_name"], row["side"], row["price"], row.get("qty_remaining"), row.get("settlement"),
+        now_ms(), row.get("canonical_item_id"),
+    ))
+    _commit(con)
 
 
 # ---------- INVENTORY ----------
@@ -212,7 +680,7 @@ def upsert_inventory(con, *, item_name: str, location: str = "unknown", qty: int
           qty = excluded.qty,
           updated_at = datetime('now')
     """, (item_name, location, qty))
-    con.commit()
+    _commit(con)
 
 
 def bump_inventory(con, *, item_name: str, location: str = "unknown", qty_delta: int) -> None:
@@ -223,4 +691,4 @@ def bump_inventory(con, *, item_name: str, location: str = "unknown", qty_delta:
           qty = inventory.qty + ?,
           updated_at = datetime('now')
     """, (item_name, location, qty_delta, qty_delta))
-    con.commit()
+    _commit(con)
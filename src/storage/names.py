@@ -0,0 +1,223 @@
+"""Resolve OCR'd item names to the ``items`` catalog.
+
+Names are reduced to a normalized key (accents stripped, case-folded,
+punctuation dropped, spaces collapsed). Lookup then tries, in order:
+
+1. the exact key (a dict hit);
+2. a SymSpell-style fuzzy match: every catalog key is indexed under its
+   deletes up to :data:`MAX_DISTANCE`, so a misread only needs the query's own
+   deletes looked up, and the few candidates are confirmed with a bounded
+   Levenshtein distance;
+3. a unique prefix of at least :data:`MIN_PREFIX` characters (names cut off
+   by the column or a partial read).
+
+A lookup that ties between two items is ambiguous and returns ``None``.
+Results are memoized, so repeated reads of a page cost a dict lookup.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+MAX_DISTANCE = 2
+# fração do tamanho do nome aceita como erro (nomes curtos toleram 1 edição)
+MAX_RATIO = 0.25
+MIN_PREFIX = 4
+MEMO_SIZE = 50_000
+# intervalo mínimo entre verificações de mudança no catálogo
+REFRESH_S = 5.0
+
+_NON_WORD = re.compile(r"[^\w ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(text: str | None) -> str:
+    """Comparison key of an item name (``"  Ferro-Bruto "`` → ``"ferro bruto"``)."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text.casefold()).replace("_", " ")
+    return _SPACES.sub(" ", text).strip()
+
+
+def levenshtein(a: str, b: str, max_dist: int | None = None) -> int:
+    """Edit distance between ``a`` and ``b``; stops at ``max_dist + 1`` when given."""
+    # prefixo/sufixo comuns não custam nada: um erro de OCR vira uma tabela 1x1
+    i, n = 0, min(len(a), len(b))
+    while i < n and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    j = 0
+    while j < len(a) and j < len(b) and a[-1 - j] == b[-1 - j]:
+        j += 1
+    if j:
+        a, b = a[:-j], b[:-j]
+    if len(a) < len(b):
+        a, b = b, a
+    if max_dist is not None and len(a) - len(b) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if max_dist is not None and min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+def _deletes(key: str, depth: int) -> Set[str]:
+    """``key`` and every string obtained by deleting up to ``depth`` characters."""
+    out = {key}
+    frontier = {key}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))} - out
+        out |= frontier
+    return out
+
+
+class NameMatch(NamedTuple):
+    item_id: int
+    name: str
+    distance: int  # 0 = exato; -1 = por prefixo
+
+
+class NameIndex:
+    """In-memory index of ``(item_id, name)`` pairs."""
+
+    def __init__(self, items: Iterable[Tuple[int, str]], max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._exact: Dict[str, Tuple[int, str]] = {}
+        for item_id, name in items:
+            key = normalize_name(name)
+            if key:
+                self._exact.setdefault(key, (int(item_id), name))
+        self._keys: List[str] = sorted(self._exact)
+        self._deletes: Dict[str, List[str]] = {}
+        for key in self._keys:
+            for d in _deletes(key, max_distance):
+                self._deletes.setdefault(d, []).append(key)
+        self._memo: Dict[str, Optional[NameMatch]] = {}
+
+    @classmethod
+    def from_db(cls, con, max_distance: int = MAX_DISTANCE) -> "NameIndex":
+        try:
+            rows = con.execute("SELECT item_id, name FROM items").fetchall()
+        except sqlite3.OperationalError:  # banco sem catálogo ainda
+            rows = []
+        return cls(rows, max_distance)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def resolve(self, text: str | None) -> Optional[NameMatch]:
+        """Catalog item for ``text`` (an OCR read), or ``None`` when unknown/ambiguous."""
+        if not text or not self._keys:
+            return None
+        try:
+            return self._memo[text]
+        except KeyError:
+            pass
+        key = normalize_name(text)
+        match = self._lookup(key) if key else None
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[text] = match
+        return match
+
+    def _lookup(self, key: str) -> Optional[NameMatch]:
+        hit = self._exact.get(key)
+        if hit is not None:
+            return NameMatch(hit[0], hit[1], 0)
+
+        allowed = min(self.max_distance, max(1, int(len(key) * MAX_RATIO)))
+        best: Optional[str] = None
+        best_d, tie = allowed + 1, False
+        seen: Set[str] = set()
+        queried: Set[str] = set()
+        frontier = {key}
+        # uma profundidade de deletes por vez: todo nome a distância <= depth
+        # já apareceu, então um achado nessa distância encerra a busca
+        for depth in range(1, allowed + 1):
+            frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))} | frontier
+            for d in frontier - queried:
+                for cand in self._deletes.get(d, ()):
+                    if cand in seen:
+                        continue
+                    seen.add(cand)
+                    dist = levenshtein(key, cand, allowed)
+                    if dist < best_d:
+                        best, best_d, tie = cand, dist, False
+                    elif dist == best_d:
+                        tie = True
+            queried |= frontier
+            if best_d <= depth:
+                if tie:
+                    return None
+                item_id, name = self._exact[best]
+                return NameMatch(item_id, name, best_d)
+
+        if len(key) >= MIN_PREFIX:
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i].startswith(key):
+                if i + 1 == len(self._keys) or not self._keys[i + 1].startswith(key):
+                    item_id, name = self._exact[self._keys[i]]
+                    return NameMatch(item_id, name, -1)
+        return None
+
+
+# ---------- índice do catálogo, compartilhado no processo ----------
+_INDEX: Optional[NameIndex] = None
+_INDEX_SIG: Optional[tuple] = None
+_INDEX_CHECKED = 0.0
+_INDEX_LOCK = threading.Lock()
+
+
+def catalog_index(con=None) -> NameIndex:
+    """The process's index of ``items``, rebuilt when the catalog changes.
+
+    Without ``con`` a pooled read-only connection is used (this also works
+    in OCR worker processes). Changes are checked at most every
+    :data:`REFRESH_S` seconds.
+    """
+    global _INDEX, _INDEX_CHECKED
+    with _INDEX_LOCK:
+        if _INDEX is not None and time.monotonic() - _INDEX_CHECKED < REFRESH_S:
+            return _INDEX
+        if con is None:
+            from .db import read_connection
+
+            try:
+                with read_connection() as ro:
+                    _refresh(ro)
+            except sqlite3.OperationalError:  # banco ainda não criado
+                if _INDEX is None:
+                    _INDEX = NameIndex(())
+        else:
+            _refresh(con)
+        _INDEX_CHECKED = time.monotonic()
+        return _INDEX
+
+
+def _refresh(con) -> None:
+    global _INDEX, _INDEX_SIG
+    try:
+        sig = tuple(con.execute("SELECT COUNT(*), MAX(item_id), MAX(updated_at) FROM items").fetchone())
+    except sqlite3.OperationalError:
+        sig = None
+    if _INDEX is None or sig != _INDEX_SIG:
+        _INDEX = NameIndex.from_db(con)
+        _INDEX_SIG = sig
+
+
+def resolve_item(text: str | None, con=None) -> Optional[NameMatch]:
+    """Shortcut for ``catalog_index(con).resolve(text)``."""
+    return catalog_index(con).resolve(text)
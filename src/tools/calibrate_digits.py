@@ -0,0 +1,61 @@
+"""Aprende os glyphs de dígitos da fonte do jogo a partir de células de preço.
+
+Uso: ``python -m src.tools.calibrate_digits`` — selecione uma célula de preço,
+digite o valor exibido e repita até cobrir os dígitos 0-9 (e o separador).
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+from PIL import ImageGrab
+
+from ..capture.window import get_window_rect
+from ..ocr.digits import learn_glyphs
+
+BASE = Path(__file__).resolve().parents[2]
+CFG_DIR = BASE / "config"
+CFG_OCR = CFG_DIR / "ocr.yaml"
+CFG_CAPTURE = CFG_DIR / "capture.yaml"
+
+
+def _glyphs_dir() -> Path:
+    ocr_cfg = yaml.safe_load(open(CFG_OCR, "r", encoding="utf-8")) or {}
+    path = Path((ocr_cfg.get("numeric") or {}).get("glyphs_dir", "config/glyphs"))
+    return path if path.is_absolute() else BASE / path
+
+
+def main():
+    cap = yaml.safe_load(open(CFG_CAPTURE, "r", encoding="utf-8"))
+    title = (cap.get("window_title_contains") or "").strip()
+    wnd = get_window_rect(title)
+    if not wnd:
+        raise SystemExit("Janela não encontrada. Ajuste capture.yaml.")
+    glyphs_dir = _glyphs_dir()
+    known = {p.stem for p in glyphs_dir.glob("*.png")} if glyphs_dir.exists() else set()
+
+    while True:
+        x, y, w, h = wnd["x"], wnd["y"], wnd["w"], wnd["h"]
+        img = np.array(ImageGrab.grab(bbox=(x, y, x + w, y + h)))
+        frame = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        r = cv2.selectROI("Selecione UMA célula de preço (ENTER, ESC encerra)", frame, fromCenter=False, showCrosshair=True)
+        cv2.destroyAllWindows()
+        if r[2] <= 0 or r[3] <= 0:
+            break
+        rx, ry, rw, rh = (int(v) for v in r)
+        crop = img[ry : ry + rh, rx : rx + rw]
+        text = input("Valor exibido na célula (ex.: 1.234,56): ").strip()
+        saved = learn_glyphs(crop, text, glyphs_dir)
+        if not saved:
+            print("Segmentação não bateu com o texto digitado; tente um recorte mais justo.")
+            continue
+        known.update(saved)
+        missing = [d for d in "0123456789" if d not in known]
+        print(f"Glyphs salvos: {''.join(saved)}  •  faltando: {''.join(missing) or 'nenhum'}")
+
+    print(f"Templates em {glyphs_dir}")
+
+
+if __name__ == "__main__":
+    main()
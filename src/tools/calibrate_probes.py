@@ -0,0 +1,55 @@
+"""Captura snippets de referência para os probes de prontidão.
+
+Uso: ``python -m src.tools.calibrate_probes`` — deixe a tela no estado
+esperado (ex.: aba BUY aberta), informe o anchor e o rótulo (ex.:
+``header_row`` + ``buy``) e o recorte do anchor é salvo como
+``<anchor>@<rótulo>.png`` em ``probes_dir``. ``wait_header_contains`` usa
+``header_row@<texto>`` quando existir.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import yaml
+from PIL import ImageGrab
+
+from ..capture.calibrate import relative_rect
+from ..capture.probes import probe_name, probes_dir, save_reference
+from ..capture.window import get_window_rect
+
+BASE = Path(__file__).resolve().parents[2]
+CFG_DIR = BASE / "config"
+CFG_UI = CFG_DIR / "ui_profiles.yaml"
+CFG_CAPTURE = CFG_DIR / "capture.yaml"
+
+
+def main():
+    cap = yaml.safe_load(open(CFG_CAPTURE, "r", encoding="utf-8"))
+    title = (cap.get("window_title_contains") or "").strip()
+    wnd = get_window_rect(title)
+    if not wnd:
+        raise SystemExit("Janela não encontrada. Ajuste capture.yaml.")
+    ui = yaml.safe_load(open(CFG_UI, "r", encoding="utf-8"))
+    anchors = next(iter(ui["profiles"].values()))["anchors"]
+
+    while True:
+        anchor = input("Anchor (ENTER = header_row, 'q' encerra): ").strip() or "header_row"
+        if anchor == "q":
+            break
+        if anchor not in anchors:
+            print(f"Anchor '{anchor}' não existe no ui_profiles.yaml")
+            continue
+        label = input("Rótulo do estado (ex.: buy, sell): ").strip()
+        input("Deixe a tela no estado desejado e pressione ENTER...")
+
+        x, y, w, h = wnd["x"], wnd["y"], wnd["w"], wnd["h"]
+        img = np.array(ImageGrab.grab(bbox=(x, y, x + w, y + h)).convert("RGB"))
+        rx, ry, rw, rh = relative_rect(anchors[anchor], (w, h))
+        path = save_reference(img[ry : ry + rh, rx : rx + rw], probe_name(anchor, label))
+        print(f"Snippet salvo em {path}")
+
+    print(f"Referências em {probes_dir()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,7 @@ OPTIONAL_ANCHORS = [
 ]
 REQUIRED_COLUMNS = ["name", "price", "qty"]
 BUY_PANEL_COLUMNS = ["price", "qty"]  # se calibrar buy_panel_zone
+NUMERIC_COLUMNS = {"price", "qty"}  # lidas pelo reconhecedor só de dígitos
 
 
 # ---------- helpers de captura/UX ----------
@@ -222,6 +223,8 @@ def main(profile: str = ""):
                 raise SystemExit(f"Coluna obrigatória '{cname}' não definida.")
             rx, ry, rw, rh = r
             cols[cname] = {"x": round(rx / lw, 5), "w": round(rw / lw, 5)}
+            if cname in NUMERIC_COLUMNS:
+                cols[cname]["kind"] = "numeric"
         if need_resnap:
             # volta ao início do laço para tirar outro print da tela inteira
             continue
@@ -250,6 +253,8 @@ def main(profile: str = ""):
                     continue
                 rx, ry, rw, rh = r
                 buy_panel_cols[cname] = {"x": round(rx / bw, 5), "w": round(rw / bw, 5)}
+                if cname in NUMERIC_COLUMNS:
+                    buy_panel_cols[cname]["kind"] = "numeric"
             if need_resnap2:
                 continue
             break
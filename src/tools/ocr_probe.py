@@ -6,7 +6,7 @@ from PIL import ImageGrab
 import numpy as np
 
 from ..capture.window import get_window_rect
-from ..ocr.engine import OCREngine, load_ocr_config
+from ..ocr.engine import get_engine
 
 CFG_DIR = Path(__file__).resolve().parents[2] / "config"
 CFG_OCR = CFG_DIR / "ocr.yaml"
@@ -28,7 +28,8 @@ def main():
         return
     rx, ry, rw, rh = r
     crop = frame[int(ry) : int(ry + rh), int(rx) : int(rx + rw)]
-    eng = OCREngine(load_ocr_config(str(CFG_OCR)))
+    eng = get_engine(str(CFG_OCR))
+    print(f"Engine carregado em {eng.load_time_s:.2f}s")
     txt, conf = eng.text_and_conf(crop)
     print(f"OCR: '{txt}' (conf={conf:.2f})")
 
@@ -7,7 +7,7 @@ def setup_logging():
     logging.basicConfig(stream=sys.stdout, level=logging.INFO)
     structlog.configure(
         processors=[
-            structlog.processors.add_timestamp,
+            structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.JSONRenderer(),
         ],
         wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
@@ -1,8 +1,171 @@
+"""Sleeps with jitter and hot-path timing spans.
+
+Spans are off by default and then cost one global check (``span`` returns a
+shared no-op object; ``timed`` calls straight through). Turn them on with
+``enable_timing()``, the ``--timing`` CLI option or ``MARKET_TIMING=1``::
+
+    with span("ocr.batch.text"):
+        ...
+
+    @timed("parse.price")
+    def parse_price(...): ...
+
+Durations are aggregated per name into a fixed log-scale histogram;
+:func:`drain_metrics` returns (and resets) the aggregates, logs them as
+structlog JSON and is what ``end_run`` stores in the ``metrics`` table.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+import functools
+import os
 import random
+import threading
 import time
+from typing import Dict, List
+
+import structlog
 
 
 def sleep_ms(ms: int, jitter: float = 0.25) -> None:
     j = ms * jitter
     dur = max(0.0, (ms - j) + random.random() * (2 * j))
     time.sleep(dur / 1000.0)
+
+
+# ---------- spans ----------
+_ENABLED = os.environ.get("MARKET_TIMING", "").lower() in ("1", "true", "yes")
+
+# limites superiores dos buckets em ms: 0.01 ms .. ~84 s, dobrando a cada bucket
+BUCKETS_MS = tuple(0.01 * 2**i for i in range(24))
+
+
+class _Hist:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (capped at the observed max)."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return min(BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max, self.max)
+        return self.max
+
+
+_HISTS: Dict[str, _Hist] = {}
+_LOCK = threading.Lock()
+
+
+def _record(name: str, ms: float) -> None:
+    with _LOCK:
+        hist = _HISTS.get(name)
+        if hist is None:
+            hist = _HISTS[name] = _Hist()
+        hist.add(ms)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Context manager timing the enclosed block under ``name``."""
+    if not _ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: str | None = None):
+    """Decorator timing every call of the function (``name`` defaults to its qualname)."""
+
+    def deco(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, (time.perf_counter() - t0) * 1000.0)
+
+        return wrapper
+
+    return deco
+
+
+def enable_timing(enabled: bool = True) -> None:
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+def timing_enabled() -> bool:
+    return _ENABLED
+
+
+def drain_metrics(log: bool = True) -> List[Dict]:
+    """Return the aggregates collected so far (one dict per span name) and reset them."""
+    global _HISTS
+    with _LOCK:
+        hists, _HISTS = _HISTS, {}
+    out = [
+        {
+            "name": name,
+            "count": h.count,
+            "total_ms": round(h.total, 3),
+            "min_ms": round(h.min, 4),
+            "max_ms": round(h.max, 4),
+            "p50_ms": round(h.quantile(0.50), 4),
+            "p95_ms": round(h.quantile(0.95), 4),
+            "p99_ms": round(h.quantile(0.99), 4),
+        }
+        for name, h in sorted(hists.items())
+    ]
+    if log and out:
+        logger = structlog.get_logger("timing")
+        for row in out:
+            logger.info("span", **row)
+    return out
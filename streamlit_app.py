@@ -1,11 +1,16 @@
+import csv
+import hashlib
+import io
 from pathlib import Path
-import sqlite3
 import subprocess
 import sys
+import time
 
 import pandas as pd
 import streamlit as st
 
+from src.storage.db import read_connection
+
 # --- Config de página deve vir primeiro ---
 st.set_page_config(page_title="Offline Market Bot — Nível 0", layout="wide")
 st.title("📊 Offline Market Bot — Nível 0 (Coleta)")
@@ -24,15 +29,94 @@ def _run_bg(args: list[str]) -> None:
         st.error(f"Falha ao iniciar processo: {e}")
 
 @st.cache_data(ttl=5)
-def _read_sql(query: str) -> pd.DataFrame:
-    con = sqlite3.connect(
-        f"file:{DB.as_posix()}?mode=ro&cache=shared", uri=True, check_same_thread=False
-    )
-    con.execute("PRAGMA busy_timeout=2500")
-    try:
-        return pd.read_sql(query, con)
-    finally:
-        con.close()
+def _read_sql(query: str, params: tuple = ()) -> pd.DataFrame:
+    # conexões read-only reaproveitadas entre reruns (pool em src.storage.db)
+    with read_connection() as con:
+        return pd.read_sql(query, con, params=params)
+
+TIME_WINDOWS_MS = {
+    "Última hora": 3_600_000,
+    "24 horas": 86_400_000,
+    "7 dias": 7 * 86_400_000,
+    "30 dias": 30 * 86_400_000,
+    "Tudo": None,
+}
+PAGE_SIZES = [50, 100, 250, 1000]
+
+
+def _since_ms(window_label: str) -> int | None:
+    window = TIME_WINDOWS_MS[window_label]
+    if window is None:
+        return None
+    # arredonda "agora" ao TTL do cache para reaproveitar resultados entre reruns
+    now = int(time.time() * 1000) // 5000 * 5000
+    return now - window
+
+
+def _like(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _where(clauses: list[tuple[str, object]]) -> tuple[str, tuple]:
+    """Monta ``WHERE`` parametrizado a partir de ``(sql, valor)``; valores ``None`` são ignorados."""
+    active = [(sql, val) for sql, val in clauses if val not in (None, "")]
+    if not active:
+        return "", ()
+    return " WHERE " + " AND ".join(sql for sql, _ in active), tuple(val for _, val in active)
+
+
+def _pager(key: str, total: int) -> tuple[int, int]:
+    """Controles de paginação; retorna ``(limit, offset)``."""
+    c1, c2, c3 = st.columns([1, 1, 2])
+    with c1:
+        page_size = st.selectbox("Linhas por página", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    with c2:
+        page = st.number_input("Página", 1, pages, 1, key=f"{key}_page")
+    with c3:
+        st.caption(f"{total} linhas • {pages} página(s)")
+    return page_size, (int(page) - 1) * page_size
+
+
+def _csv_export(query: str, params: tuple, chunk_size: int = 5000) -> bytes:
+    """Gera o CSV lendo o cursor em blocos (sem montar um DataFrame com tudo).
+
+    Os blocos são codificados direto no buffer de bytes, mas o arquivo final
+    fica inteiro em memória: o ``st.download_button`` precisa do conteúdo
+    completo, então não há streaming até o navegador.
+    """
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    with read_connection() as con:
+        cur = con.execute(query, params)
+        writer.writerow([d[0] for d in cur.description])
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+    text.flush()
+    data = buf.getvalue()
+    text.detach()
+    return data
+
+
+def _export_button(key: str, label: str, query: str, params: tuple, filename: str) -> None:
+    """Só gera o CSV quando pedido (não a cada rerun).
+
+    O CSV preparado vale para a consulta/filtros com que foi gerado: se eles
+    mudam, o botão de download some até preparar de novo.
+    """
+    sig = hashlib.sha1(repr((query, params)).encode()).hexdigest()
+    if st.button(f"Preparar {label}", key=f"{key}_prep"):
+        st.session_state[f"{key}_csv"] = (sig, _csv_export(query, params))
+    prepared = st.session_state.get(f"{key}_csv")
+    if prepared is not None and prepared[0] == sig:
+        st.download_button(label, prepared[1], filename, "text/csv", key=f"{key}_dl")
+    elif prepared is not None:
+        st.session_state.pop(f"{key}_csv", None)
 
 def _refresh_now():
     st.cache_data.clear()
@@ -122,62 +206,164 @@ if not DB.exists():
     st.stop()
 
 # --- UI principal ---
-tab1, tab2, tab3, tab4 = st.tabs(
-    ["📈 Snapshots", "🧾 Ações (log)", "📚 Items", "📑 Orders"]
+tab1, tab_book, tab_sig, tab2, tab3, tab4, tab5 = st.tabs(
+    ["📈 Snapshots", "📒 Book", "💡 Sinais", "🧾 Ações (log)", "📚 Items", "📑 Orders", "⏱️ Métricas"]
 )
 
 with tab1:
-    df = _read_sql(
-        """
-        SELECT timestamp, source_view, item_name, price, qty_visible, page_index, scroll_pos, confidence
-        FROM prices_snapshots
-        ORDER BY datetime(timestamp) DESC
-        """
-    )
-    top = st.container()
     left, right = st.columns([2, 1])
 
     with left:
-        cols1 = st.columns(2)
+        cols1 = st.columns(3)
         with cols1[0]:
             item_filter = st.text_input("Filtrar por item (contém):", "")
         with cols1[1]:
             view = st.selectbox("Lista", ["TODAS", "BUY_LIST", "SELL_LIST"])
+        with cols1[2]:
+            window = st.selectbox("Período", list(TIME_WINDOWS_MS), index=1, key="snap_window")
 
-        if item_filter:
-            df = df[df["item_name"].str.contains(item_filter, case=False, na=False)]
-        if view != "TODAS":
-            df = df[df["source_view"] == view]
+    where, params = _where(
+        [
+            ("item_name LIKE ? ESCAPE '\\'", _like(item_filter) if item_filter else None),
+            ("source_view = ?", None if view == "TODAS" else view),
+            ("ts_ms >= ?", _since_ms(window)),
+        ]
+    )
+    totals = _read_sql(
+        f"SELECT COUNT(*) AS n, MAX(timestamp) AS last_ts FROM prices_snapshots{where}", params
+    )
+    total = int(totals["n"].iloc[0])
+    select = f"""
+        SELECT timestamp, source_view, item_name, price, qty_visible, page_index, scroll_pos, confidence
+        FROM prices_snapshots{where}
+        ORDER BY ts_ms DESC
+    """
 
+    with left:
+        limit, offset = _pager("snap", total)
+        df = _read_sql(select + " LIMIT ? OFFSET ?", params + (limit, offset))
         st.dataframe(df, use_container_width=True)
 
     with right:
-        st.metric("Linhas coletadas (filtro aplicado)", len(df))
-        if not df.empty:
-            st.metric("Última captura", str(df["timestamp"].max()))
-        st.download_button(
-            "Exportar CSV",
-            df.to_csv(index=False).encode("utf-8"),
-            "nivel0_prices.csv",
-            "text/csv",
-        )
+        st.metric("Linhas coletadas (filtro aplicado)", total)
+        if total:
+            st.metric("Última captura", str(totals["last_ts"].iloc[0]))
+        _export_button("snap", "Exportar CSV", select, params, "nivel0_prices.csv")
 
-with tab2:
+with tab_book:
+    # tabelas materializadas (src/storage/aggregates.py): uma linha por item/lista
     try:
-        df_a = _read_sql(
+        df_b = _read_sql(
             """
-            SELECT ts, run_id, action, success, notes, details
-            FROM actions_log
-            ORDER BY datetime(ts) DESC
+            SELECT i.item_name,
+                   a.best_price AS best_ask, a.depth_qty AS ask_depth,
+                   b.best_price AS best_bid, b.depth_qty AS bid_depth,
+                   a.best_price - b.best_price AS spread,
+                   MAX(COALESCE(a.ts_ms, 0), COALESCE(b.ts_ms, 0)) AS ts_ms
+            FROM (SELECT DISTINCT item_name FROM book_latest) i
+            LEFT JOIN book_latest a ON a.item_name = i.item_name AND a.source_view = 'BUY_LIST'
+            LEFT JOIN book_latest b ON b.item_name = i.item_name AND b.source_view = 'SELL_LIST'
+            ORDER BY i.item_name
             """
         )
-        st.dataframe(df_a, use_container_width=True)
-        st.download_button(
-            "Exportar Log (CSV)",
-            df_a.to_csv(index=False).encode("utf-8"),
-            "actions_log.csv",
-            "text/csv",
+    except Exception:
+        df_b = pd.DataFrame()
+    if df_b.empty:
+        st.info("Sem agregados ainda. Rode um scan (ou `python -m src.main rebuild-aggregates`).")
+    else:
+        df_b["visto_em"] = pd.to_datetime(df_b["ts_ms"], unit="ms")
+        book_filter = st.text_input("Filtrar item (contém):", "", key="book_filter")
+        shown = df_b[df_b["item_name"].str.contains(book_filter, case=False, regex=False)] if book_filter else df_b
+        st.caption("BUY_LIST = ofertas de venda (menor preço = ask); SELL_LIST = ordens de compra (maior = bid)")
+        st.dataframe(shown.drop(columns=["ts_ms"]), use_container_width=True)
+
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            book_item = st.selectbox("Item", shown["item_name"].tolist(), key="book_item")
+        with c2:
+            book_view = st.selectbox("Lista", ["BUY_LIST", "SELL_LIST"], key="book_view")
+        with c3:
+            bucket = st.selectbox("Intervalo", ["5m", "1h", "1d"], index=1, key="book_bucket")
+        df_c = _read_sql(
+            f"""
+            SELECT bucket_ms, open, high, low, close, depth_qty, samples
+            FROM book_ohlc_{bucket}
+            WHERE item_name = ? AND source_view = ?
+            ORDER BY bucket_ms DESC
+            LIMIT 500
+            """,
+            (book_item, book_view),
         )
+        if df_c.empty:
+            st.info("Sem histórico para esse item/lista.")
+        else:
+            df_c["ts"] = pd.to_datetime(df_c["bucket_ms"], unit="ms")
+            st.line_chart(df_c.set_index("ts")[["low", "close", "high"]])
+            st.dataframe(df_c.drop(columns=["bucket_ms"]), use_container_width=True)
+
+with tab_sig:
+    # tabela signals (src/analysis/signals.py), recalculada pelo job/comando `signals`
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        sig_kind = st.selectbox("Tipo", ["flip", "refine"], key="sig_kind")
+    with c2:
+        sig_margin = st.number_input("Margem mínima (%)", -100.0, 1000.0, 0.0, 1.0, key="sig_margin")
+    with c3:
+        sig_limit = st.number_input("Mostrar", 10, 1000, 100, 10, key="sig_limit")
+    with c4:
+        if st.button("Recalcular sinais"):
+            _run_bg([sys.executable, "-m", "src.main", "signals", "--top", "0"])
+    try:
+        df_sig = _read_sql(
+            """
+            SELECT item_name, refined, buy_price, sell_price, net_spread, margin, tradable_qty,
+                   expected_profit, score, detail, book_ts_ms, computed_ms
+            FROM signals
+            WHERE kind = ? AND margin >= ?
+            ORDER BY score DESC
+            LIMIT ?
+            """,
+            (sig_kind, sig_margin / 100.0, int(sig_limit)),
+        )
+    except Exception:
+        df_sig = pd.DataFrame()
+    if df_sig.empty:
+        st.info("Sem sinais ainda. Rode `python -m src.main signals` (ou um job `kind: signals`).")
+    else:
+        st.caption(
+            "flip: compra no bid (SELL_LIST) e revende no ask (BUY_LIST), após taxas; "
+            "refine: vender o refinado vs. vender o bruto, por unidade bruta. Taxas em config/signals.yaml"
+        )
+        df_sig["margin"] = (df_sig["margin"] * 100).round(2)
+        df_sig["book_em"] = pd.to_datetime(df_sig["book_ts_ms"], unit="ms")
+        df_sig["calculado_em"] = pd.to_datetime(df_sig["computed_ms"], unit="ms")
+        drop = ["book_ts_ms", "computed_ms"] + (["refined", "detail"] if sig_kind == "flip" else [])
+        st.dataframe(df_sig.drop(columns=drop).rename(columns={"margin": "margin_%"}), use_container_width=True)
+        st.bar_chart(df_sig.head(25).set_index("item_name")["expected_profit"])
+
+with tab2:
+    try:
+        c1, c2 = st.columns(2)
+        with c1:
+            action_filter = st.text_input("Filtrar ação (contém):", "")
+        with c2:
+            window_a = st.selectbox("Período", list(TIME_WINDOWS_MS), index=1, key="actions_window")
+        where_a, params_a = _where(
+            [
+                ("action LIKE ? ESCAPE '\\'", _like(action_filter) if action_filter else None),
+                ("ts_ms >= ?", _since_ms(window_a)),
+            ]
+        )
+        total_a = int(_read_sql(f"SELECT COUNT(*) AS n FROM actions_log{where_a}", params_a)["n"].iloc[0])
+        select_a = f"""
+            SELECT ts, run_id, action, success, notes, details
+            FROM actions_log{where_a}
+            ORDER BY ts_ms DESC
+        """
+        limit_a, offset_a = _pager("actions", total_a)
+        df_a = _read_sql(select_a + " LIMIT ? OFFSET ?", params_a + (limit_a, offset_a))
+        st.dataframe(df_a, use_container_width=True)
+        _export_button("actions", "Exportar Log (CSV)", select_a, params_a, "actions_log.csv")
     except Exception:
         st.info(
             "Ainda não há `actions_log` (rode um scan/watchlist depois do update do schema)."
@@ -219,7 +405,7 @@ with tab4:
             SELECT my_order_id, item_name, side, price, qty_requested, qty_filled,
                    status, placed_at, last_seen_at, settlement
             FROM my_orders
-            ORDER BY datetime(placed_at) DESC
+            ORDER BY placed_at DESC
             """
         )
         if not df_o.empty:
@@ -228,18 +414,37 @@ with tab4:
             df_o["fill_ratio"] = qty_filled.divide(qty_requested)
         st.dataframe(df_o, use_container_width=True)
         st.subheader("My Orders (snapshots OCR)")
+        # cresce a cada reconciliação: filtrada e paginada no SQLite
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            order_item = st.text_input("Filtrar por item (contém):", "", key="orders_item")
+        with c2:
+            order_side = st.selectbox("Lado", ["TODOS", "BUY", "SELL"], key="orders_side")
+        with c3:
+            window_o = st.selectbox("Período", list(TIME_WINDOWS_MS), index=1, key="orders_window")
+        where_s, params_s = _where(
+            [
+                ("item_name LIKE ? ESCAPE '\\'", _like(order_item) if order_item else None),
+                ("side = ?", None if order_side == "TODOS" else order_side),
+                ("ts_ms >= ?", _since_ms(window_o)),
+            ]
+        )
         try:
-            df_s = _read_sql(
-                """
-                SELECT ts, item_name, side, price, qty_remaining
-                FROM my_orders_snapshots
-                ORDER BY datetime(ts) DESC
-                """
+            total_s = int(
+                _read_sql(f"SELECT COUNT(*) AS n FROM my_orders_snapshots{where_s}", params_s)["n"].iloc[0]
             )
         except Exception:
             st.info("Ainda não há tabela `my_orders_snapshots` (execute OCR de My Orders).")
         else:
+            select_s = f"""
+                SELECT ts, item_name, side, price, qty_remaining
+                FROM my_orders_snapshots{where_s}
+                ORDER BY ts_ms DESC
+            """
+            limit_s, offset_s = _pager("orders", total_s)
+            df_s = _read_sql(select_s + " LIMIT ? OFFSET ?", params_s + (limit_s, offset_s))
             st.dataframe(df_s, use_container_width=True)
+            _export_button("orders", "Exportar snapshots (CSV)", select_s, params_s, "my_orders_snapshots.csv")
         if st.button("Reconciliar agora"):
             _run_bg(
                 [
@@ -255,3 +460,49 @@ with tab4:
             )
     except Exception:
         st.info("Ainda não há tabela `my_orders` (importe ou gere dados de pedidos).")
+
+with tab5:
+    try:
+        df_runs = _read_sql(
+            """
+            SELECT m.run_id, r.mode, r.notes, MAX(m.ts_ms) AS ts_ms, SUM(m.total_ms) AS total_ms
+            FROM metrics m LEFT JOIN runs r ON r.run_id = m.run_id
+            GROUP BY m.run_id
+            ORDER BY ts_ms DESC
+            LIMIT 50
+            """
+        )
+    except Exception:
+        df_runs = pd.DataFrame()
+    if df_runs.empty:
+        st.info("Sem métricas ainda. Rode um comando com `python -m src.main --timing ...`.")
+    else:
+        labels = {
+            f"run {r.run_id} • {r.mode or ''} {r.notes or ''}".strip(): int(r.run_id)
+            for r in df_runs.itertuples()
+        }
+        run_id = labels[st.selectbox("Run", list(labels))]
+        df_m = _read_sql(
+            """
+            SELECT name, count, total_ms, p50_ms, p95_ms, p99_ms, max_ms
+            FROM metrics WHERE run_id = ?
+            ORDER BY total_ms DESC
+            """,
+            (run_id,),
+        )
+        st.caption("Tempo total por estágio (ms) — onde o run gastou o tempo")
+        st.bar_chart(df_m.set_index("name")["total_ms"])
+        st.dataframe(df_m, use_container_width=True)
+
+        name = st.selectbox("Estágio (histórico)", df_m["name"].tolist())
+        df_h = _read_sql(
+            """
+            SELECT ts_ms, p50_ms, p95_ms, p99_ms
+            FROM metrics WHERE name = ?
+            ORDER BY ts_ms DESC
+            LIMIT 200
+            """,
+            (name,),
+        )
+        df_h["ts"] = pd.to_datetime(df_h["ts_ms"], unit="ms")
+        st.line_chart(df_h.set_index("ts")[["p50_ms", "p95_ms", "p99_ms"]])